@@ -0,0 +1,3 @@
+"""Benchmarks of the commands on generated address books and notebooks.
+
+Run them from the repository root with python -m benchmarks."""
@@ -0,0 +1,52 @@
+"""Arguments of the benchmarked commands.
+
+Every command of commands/contacts and commands/notes has a case that builds the
+command of an iteration. Fixture contacts and notes are split into eight parts:
+changing commands use their own part of the first half, so each of them always
+finds its target, and reading commands use the untouched second half."""
+
+from typing import Callable
+from benchmarks.fixtures import contact_name, contact_phone, note_title, note_ticket
+
+PARTS = 8
+
+Case = Callable[[int, int], list[str]]
+"""Function that builds the command of an iteration for a fixture of a size"""
+
+def target(part: int, iteration: int, size: int) -> int:
+    """Number of the fixture contact or note used by an iteration in the part"""
+    part_size = size // PARTS
+    return part * part_size + iteration % part_size
+
+def max_iterations(size: int) -> int:
+    """Number of iterations after which changing commands would reuse their targets"""
+    return size // PARTS
+
+CONTACT_CASES: dict[str, Case] = {
+    "add": lambda i, size: ["add", f"Bench{i}", contact_phone(2 * size + i)],
+    "add-address": lambda i, size: ["add-address", contact_name(target(0, i, size)), "12", "Sadova", "St,", "Lviv"],
+    "add-birthday": lambda i, size: ["add-birthday", contact_name(target(0, i, size)), "15.06.1990"],
+    "add-email": lambda i, size: ["add-email", contact_name(target(1, i, size)), f"bench{i}@example.com"],
+    "birthdays": lambda i, size: ["birthdays", "7"],
+    "change": lambda i, size: ["change", contact_name(target(0, i, size)), "phone", contact_phone(size + i)],
+    "delete": lambda i, size: ["delete", contact_name(target(1, i, size)), "address"],
+    "all": lambda i, size: ["all", "--limit", "20", "--after", contact_name(target(4, i, size))],
+    "show-birthday": lambda i, size: ["show-birthday", contact_name(target(5, i * 5 + 1, size))],
+    "phone": lambda i, size: ["phone", contact_name(target(5, i, size))],
+    "wipe": lambda i, size: ["wipe", "name", contact_name(target(2, i, size))],
+    "search": lambda i, size: ["search", contact_name(target(6, i, size))],
+}
+"""Cases of the contacts commands, by command word"""
+
+NOTE_CASES: dict[str, Case] = {
+    "add-note": lambda i, size: ["add-note", f"bench-note-{i}", "call", "the", "customer", "about", "the", "invoice"],
+    "note-rename": lambda i, size: ["note-rename", note_title(target(2, i, size)), f"{note_title(target(2, i, size))}-renamed"],
+    "note-delete": lambda i, size: ["note-delete", note_title(target(3, i, size))],
+    "note-update": lambda i, size: ["note-update", note_title(target(0, i, size)), f"release-plan-{i}"],
+    "delete-tags": lambda i, size: ["delete-tags", note_title(target(1, i, size)), "work"],
+    "add-tags": lambda i, size: ["add-tags", note_title(target(1, i, size)), "bench"],
+    "get-note": lambda i, size: ["get-note", note_title(target(4, i, size))],
+    "note-search": lambda i, size: ["note-search", "keyword", note_ticket(target(5, i, size))],
+    "all-notes": lambda i, size: ["all-notes", "--limit", "20", "--after", note_title(target(6, i, size))],
+}
+"""Cases of the notes commands, by command word"""
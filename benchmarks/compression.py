@@ -0,0 +1,79 @@
+"""Compare the codecs of the saved files by size, save time and load time.
+
+Run it from the repository root with python -m benchmarks.compression. Every codec
+saves the same generated address book and notebook into its own temporary folder."""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from storage.address_book import AddressBook
+from storage.note_book import NoteBook
+from storage.compression import CODECS
+from benchmarks.fixtures import SCALES, address_book_fixture, note_book_fixture
+
+def measure(storage, load_data, file_path: Path, codec: str | None) -> dict:
+    """Save the storage with the codec, load it back and get the size and the durations
+
+    Args:
+        storage: the address book or the notebook to save
+        load_data: load_data of its class
+        file_path (Path): the file to save to
+        codec (str | None): the codec, None for plain pickles
+
+    Returns:
+        dict: size of the file in KB and save and load times in milliseconds"""
+    storage.codec = codec
+    started = time.perf_counter()
+    err = storage.save_data(file_path)
+    saved = time.perf_counter()
+    if err:
+        raise RuntimeError(err)
+    loaded, err = load_data(file_path)
+    if err:
+        raise RuntimeError(err)
+    if len(loaded) != len(storage):
+        raise RuntimeError(f"{file_path.name} loaded {len(loaded)} items of {len(storage)}")
+    return {"size_kb": file_path.stat().st_size / 1024, "save_ms": (saved - started) * 1000,
+            "load_ms": (time.perf_counter() - saved) * 1000}
+
+def run_scale(size: int, seed: int = 0) -> dict:
+    """Save and load the fixtures of the size with every codec
+
+    Returns:
+        dict: results of every storage by codec, and the size of the body file of the notebook"""
+    storages = {"address_book": (address_book_fixture(size, seed), AddressBook.load_data),
+                "note_book": (note_book_fixture(size, seed), NoteBook.load_data)}
+    results = {name: {} for name in storages}
+    # one folder for all codecs, as the notebook reads its bodies from the body file of the previous save
+    with tempfile.TemporaryDirectory() as folder:
+        for codec in (None, *CODECS):
+            for name, (storage, load_data) in storages.items():
+                file_path = Path(folder) / f"{name}-{codec or 'none'}.pickle"
+                results[name][codec or "none"] = measure(storage, load_data, file_path, codec)
+        bodies_kb = storages["note_book"][0].body_store.size() / 1024
+    return {"storages": results, "bodies_kb": bodies_kb}
+
+def print_scale(scale: str, result: dict):
+    """Print the results of a scale as a table, with the size relative to plain pickles"""
+    print(f"\n{scale}: note bodies take {result['bodies_kb']:.0f} KB in the body file, which is not compressed")
+    print(f"{'file':<14}{'codec':<8}{'size KB':>12}{'ratio':>8}{'save ms':>10}{'load ms':>10}")
+    for name, codecs in result["storages"].items():
+        plain = codecs["none"]["size_kb"]
+        for codec, stats in codecs.items():
+            print(f"{name:<14}{codec:<8}{stats['size_kb']:>12.0f}{stats['size_kb'] / plain:>8.2f}"
+                  f"{stats['save_ms']:>10.1f}{stats['load_ms']:>10.1f}")
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compression", description="Benchmark the codecs")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1k", "100k"],
+                        help="sizes of the fixtures to run, 1m needs several GB of memory")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated fixtures")
+    args = parser.parse_args(argv)
+    for scale in args.scale:
+        print_scale(scale, run_scale(SCALES[scale], args.seed))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Generated address books and notebooks of a given size for the benchmarks."""
+
+import random
+from datetime import date, datetime, timedelta
+from storage.address_book import AddressBook, Record
+from storage.note_book import NoteBook, Note
+from storage.snapshot import RecordValues
+from storage.transfer import batches
+
+FIRST_NAMES = ("Olena", "Andrii", "Maria", "Taras", "Iryna", "Dmytro", "Sofia", "Oleksandr", "Anna", "Mykola",
+               "Kateryna", "Serhii", "Yulia", "Ivan", "Natalia", "Petro", "Oksana", "Bohdan", "Viktoria", "Roman")
+LAST_NAMES = ("Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Oliinyk", "Shevchuk",
+              "Polishchuk", "Lysenko", "Marchenko", "Rudenko", "Savchenko", "Petrenko", "Moroz", "Melnyk")
+STREETS = ("Khreshchatyk", "Sadova", "Shevchenka", "Lesi Ukrainky", "Franka", "Zelena", "Naberezhna", "Soborna")
+CITIES = ("Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Poltava", "Vinnytsia", "Chernihiv")
+DOMAINS = ("example.com", "mail.com", "post.ua", "work.org")
+WORDS = ("meeting", "release", "deploy", "review", "budget", "call", "invoice", "draft", "plan", "report",
+         "customer", "server", "backup", "travel", "design", "sprint", "contract", "hiring", "demo", "update")
+TAGS = ("work", "home", "urgent", "ideas", "todo", "later", "finance", "travel", "family", "old")
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+"""Number of contacts and notes of each benchmark scale"""
+
+def contact_name(number: int) -> str:
+    """Name of the generated contact with the number, unique for every number"""
+    return f"{FIRST_NAMES[number % len(FIRST_NAMES)]}{LAST_NAMES[number // len(FIRST_NAMES) % len(LAST_NAMES)]}{number}"
+
+def contact_phone(number: int) -> str:
+    """Phone of the generated contact with the number, unique for every number below 10^9"""
+    return f"0{number * 7919 % 1_000_000_000:09d}"
+
+def note_title(number: int) -> str:
+    """Title of the generated note with the number"""
+    return f"note-{number:07d}"
+
+def note_ticket(number: int) -> str:
+    """Word that only the body of the generated note with the number contains"""
+    return f"TCK{number}"
+
+def address_book_fixture(size: int, seed: int = 0) -> AddressBook:
+    """Generate an in-memory address book with the number of contacts.
+    Contacts whose number is not divisible by 5 have a birthday, even ones have an email,
+    those divisible by 3 have an address and every tenth has a second phone."""
+    rng = random.Random(seed)
+    address_book = AddressBook()
+    first_birthday = date(1950, 1, 1).toordinal()
+    def values(number: int) -> RecordValues:
+        first, last = FIRST_NAMES[number % len(FIRST_NAMES)], LAST_NAMES[number // len(FIRST_NAMES) % len(LAST_NAMES)]
+        phones = [contact_phone(number)]
+        if number % 10 == 1:
+            phones.append(f"+38{contact_phone(number + 1)}")
+        email = f"{first.lower()}.{last.lower()}{number}@{rng.choice(DOMAINS)}" if number % 2 == 0 else None
+        address = f"{rng.randint(1, 200)} {rng.choice(STREETS)} St, {rng.choice(CITIES)}" if number % 3 == 0 else None
+        birthday = first_birthday + rng.randrange(20000) if number % 5 else 0
+        return RecordValues(contact_name(number), phones, email, address, birthday)
+    for batch in batches(range(size)):
+        address_book.add_records([Record.from_values(values(number)) for number in batch])
+    address_book.index_names()
+    return address_book
+
+def note_book_fixture(size: int, seed: int = 0) -> NoteBook:
+    """Generate an in-memory notebook with the number of notes of a few sentences and tags each"""
+    rng = random.Random(seed)
+    note_book = NoteBook()
+    start = datetime(2020, 1, 1)
+    def note(number: int) -> Note:
+        words = rng.choices(WORDS, k=rng.randint(8, 30))
+        body = " ".join(words) + f" {note_ticket(number)}"
+        return Note(note_title(number), start + timedelta(minutes=number), body, rng.sample(TAGS, rng.randint(0, 3)))
+    for batch in batches(range(size)):
+        note_book.add_notes([note(number) for number in batch])
+    return note_book
@@ -0,0 +1,150 @@
+"""Run the benchmarks of the commands and compare them with a saved baseline."""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tracemalloc
+from pathlib import Path
+from statistics import quantiles
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from commands.event import EventType
+from commands.handlers import build_handler
+from commands.invalid_input import invalid_input
+from commands.contacts import commands as contacts_commands
+from commands.notes import commands as note_commands
+from storage.rw_lock import ReadWriteLock
+from benchmarks.cases import CONTACT_CASES, NOTE_CASES, max_iterations
+from benchmarks.fixtures import SCALES, address_book_fixture, note_book_fixture
+
+BASELINE = Path(__file__).parent / "baseline.json"
+"""Default file of the baseline results"""
+
+THRESHOLD = 1.25
+"""Ratio to the baseline latency above which a command is reported as a regression"""
+
+NOISE_US = 5.0
+"""Latency differences in microseconds that are too small to be reported as a regression"""
+
+def percentiles(samples: list[float]) -> dict:
+    """Get the p50 and p99 of the latencies in microseconds"""
+    cuts = quantiles(samples, n=100, method="inclusive")
+    return {"p50_us": round(cuts[49], 2), "p99_us": round(cuts[98], 2)}
+
+def run_scale(size: int, iterations: int, seed: int = 0) -> dict:
+    """Build the fixtures of the size and run every command the number of times through build_handler
+
+    Args:
+        size (int): number of contacts and notes of the fixtures
+        iterations (int): number of timed runs of every command
+        seed (int): seed of the generated fixtures
+
+    Returns:
+        dict: build time, peak memory and results of every command"""
+    started = time.perf_counter()
+    address_book = address_book_fixture(size, seed)
+    note_book = note_book_fixture(size, seed)
+    result = {"build_s": round(time.perf_counter() - started, 2),
+              "fixture_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              "commands": {}}
+
+    commands = contacts_commands(address_book) | note_commands(note_book)
+    cases = CONTACT_CASES | NOTE_CASES
+    missing = set(commands) - set(cases)
+    if missing:
+        raise ValueError(f"Commands without a benchmark case: {', '.join(sorted(missing))}")
+    lock = ReadWriteLock()
+    fallback = build_handler(invalid_input)
+    for word, command in commands.items():
+        handler = build_handler(command.load(), lock)
+        case = cases[word]
+        samples, errors = [], 0
+        for i in range(iterations):
+            args = case(i, size)
+            start = time.perf_counter_ns()
+            event = handler(args, fallback)
+            samples.append((time.perf_counter_ns() - start) / 1000)
+            errors += event.type == EventType.ERROR
+        tracemalloc.start()
+        handler(case(iterations, size), fallback)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result["commands"][word] = percentiles(samples) | {"peak_alloc_kb": round(peak / 1024, 1), "errors": errors}
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+def run(scales: list[str], iterations: int, seed: int = 0) -> dict:
+    """Run every scale in a fresh process, so that the peak memory of a scale does not include the previous ones"""
+    results = {"python": platform.python_version(), "machine": platform.machine(),
+               "iterations": iterations, "scales": {}}
+    for scale in scales:
+        size = SCALES[scale]
+        if iterations + 1 > max_iterations(size):
+            raise ValueError(f"At most {max_iterations(size) - 1} iterations can be run at the {scale} scale")
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            results["scales"][scale] = executor.submit(run_scale, size, iterations, seed).result()
+        print_scale(scale, results["scales"][scale])
+    return results
+
+def print_scale(scale: str, result: dict):
+    """Print the results of a scale as a table"""
+    print(f"\n{scale}: fixtures built in {result['build_s']} s, peak RSS {result['peak_rss_kb'] / 1024:.0f} MB")
+    print(f"{'command':<16}{'p50 µs':>12}{'p99 µs':>12}{'peak KB':>12}{'errors':>8}")
+    for word, stats in result["commands"].items():
+        print(f"{word:<16}{stats['p50_us']:>12}{stats['p99_us']:>12}{stats['peak_alloc_kb']:>12}{stats['errors']:>8}")
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list[str]:
+    """Find the commands that got slower than in the baseline
+
+    Args:
+        results (dict): results of this run
+        baseline (dict): results of the baseline run
+        threshold (float): ratio to the baseline latency above which a command is reported
+
+    Returns:
+        list[str]: descriptions of the regressions"""
+    regressions = []
+    for scale, result in results["scales"].items():
+        base_commands = baseline.get("scales", {}).get(scale, {}).get("commands", {})
+        for word, stats in result["commands"].items():
+            base = base_commands.get(word)
+            if base is None:
+                continue
+            for key in ("p50_us", "p99_us"):
+                if stats[key] > base[key] * threshold and stats[key] - base[key] > NOISE_US:
+                    regressions.append(f"{scale} {word} {key}: {base[key]} -> {stats[key]} "
+                                       f"({stats[key] / base[key]:.2f}x)")
+    return regressions
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the commands")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1k", "100k"],
+                        help="sizes of the fixtures to run, 1m needs several GB of memory")
+    parser.add_argument("--iterations", type=int, default=100, help="timed runs of every command")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated fixtures")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="file of the baseline results")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="ratio to the baseline latency reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.scale, args.iterations, args.seed)
+    if args.save:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save to create it")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if not regressions:
+        print("\n✅ No regressions against the baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
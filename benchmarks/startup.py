@@ -0,0 +1,102 @@
+"""Measure how fast the assistant starts and check it against a time budget.
+
+Run it from the repository root with python -m benchmarks.startup. Every run uses
+a fresh data folder in a temporary home directory."""
+
+import os
+import pty
+import sys
+import time
+import select
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parent.parent
+"""Folder of main.py"""
+
+BUDGET_MS = 100.0
+"""Time in milliseconds in which the prompt and a one-command script must be done"""
+
+PROMPT = b"Enter command"
+
+REPO_MODULES = ("main", "processor", "handler", "server", "commands", "storage")
+"""Top-level modules of the repository, whose import times are reported"""
+
+def environment(home: str) -> dict:
+    """Environment of the started assistant, with the data folder in the home directory"""
+    return os.environ | {"HOME": home, "PYTHONDONTWRITEBYTECODE": "1"}
+
+def time_to_prompt(home: str) -> float:
+    """Start the assistant in a terminal and measure the milliseconds until it asks for a command"""
+    master, slave = pty.openpty()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=environment(home),
+                               stdin=slave, stdout=slave, stderr=slave)
+    os.close(slave)
+    output = b""
+    try:
+        while PROMPT not in output:
+            ready, _, _ = select.select([master], [], [], 10)
+            if not ready:
+                raise TimeoutError("The assistant did not ask for a command in 10 s")
+            output += os.read(master, 4096)
+        elapsed = (time.perf_counter() - started) * 1000
+        os.write(master, b"exit\n")
+        process.wait(10)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        os.close(master)
+    return elapsed
+
+def time_script(home: str) -> float:
+    """Run a one-command script and measure the milliseconds until the assistant exits"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "-"], cwd=ROOT, env=environment(home), input=b"hello\n",
+                   stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - started) * 1000
+
+def import_times() -> list[tuple[str, float]]:
+    """Import main with -X importtime and get the cumulative import milliseconds of the modules of the repository"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                            env=os.environ | {"PYTHONDONTWRITEBYTECODE": "1"}, capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        module = module.strip()
+        if module.split(".")[0] in REPO_MODULES:
+            times.append((module, int(cumulative) / 1000))
+    return sorted(times, key=lambda item: item[1], reverse=True)
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="Benchmark the startup")
+    parser.add_argument("--runs", type=int, default=5, help="number of starts, the median is checked")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="budget in milliseconds")
+    args = parser.parse_args(argv)
+
+    prompts, scripts = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as home:
+            prompts.append(time_to_prompt(home))
+        with tempfile.TemporaryDirectory() as home:
+            scripts.append(time_script(home))
+
+    print(f"{'module':<40}{'import ms':>10}")
+    for module, milliseconds in import_times():
+        print(f"{module:<40}{milliseconds:>10.1f}")
+    results = {"time to prompt": median(prompts), "one-command script": median(scripts)}
+    print()
+    failed = False
+    for name, milliseconds in results.items():
+        within = milliseconds <= args.budget
+        failed |= not within
+        print(f"{'✅' if within else '❌'} {name}: {milliseconds:.1f} ms (budget {args.budget:.0f} ms)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
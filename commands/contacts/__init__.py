@@ -1,29 +1,22 @@
-from .add_address import add_address
-from .add_contact import add_contact
-from .add_birthday import add_birthday
-from .add_email import add_email
-from .birthdays import birthdays
-from .change_contact import change_contact
-from .delete import delete_field
-from .show_all import show_all
-from .show_birthday import show_birthday
-from .show_phone import show_phone
-from .wipe_contact import wipe_contact
-from .search import search
+from commands.types import LazyCommand
 from storage.address_book import AddressBook
 
+COMMANDS = {
+    "add-address": ("add_address", "add_address"),
+    "add": ("add_contact", "add_contact"),
+    "add-birthday": ("add_birthday", "add_birthday"),
+    "add-email": ("add_email", "add_email"),
+    "birthdays": ("birthdays", "birthdays"),
+    "change": ("change_contact", "change_contact"),
+    "delete": ("delete", "delete_field"),
+    "all": ("show_all", "show_all"),
+    "show-birthday": ("show_birthday", "show_birthday"),
+    "phone": ("show_phone", "show_phone"),
+    "wipe": ("wipe_contact", "wipe_contact"),
+    "search": ("search", "search"),
+}
+"""Modules and factories of the contacts commands, by command word"""
+
 def commands(address_book: AddressBook) :
-    return [
-        add_address(address_book),
-        add_contact(address_book),
-        add_birthday(address_book),
-        add_email(address_book),
-        birthdays(address_book),
-        change_contact(address_book),
-        delete_field(address_book),
-        show_all(address_book),
-        show_birthday(address_book),
-        show_phone(address_book),
-        wipe_contact(address_book),
-        search(address_book)
-    ]
\ No newline at end of file
+    return {word: LazyCommand(f"{__name__}.{module}", factory, (address_book,))
+            for word, (module, factory) in COMMANDS.items()}
@@ -1,7 +1,7 @@
 """This module contains the 'add' command. It adds a new contact to the storage."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.address_book import AddressBook
@@ -44,4 +44,4 @@ def add_address(address_book: AddressBook) -> Command:
         record.add_address(address)
         return Event(EventType.PRINT, {"print": f"✅ Address for {command[0]} added."})
 
-    return lambda: (select, validate, action)
+    return writes(lambda: (select, validate, action))
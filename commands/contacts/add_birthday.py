@@ -1,7 +1,7 @@
 """This module contains the 'add-birthday' command. It adds a birthday to a contact."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.address_book import AddressBook, Record, Phone, Birthday
@@ -48,4 +48,4 @@ def add_birthday(address_book: AddressBook) -> Command:
         record.add_birthday(command[1])
         return Event(EventType.PRINT, {"print": f"✅ Birthday for {command[0]} added."})
     
-    return lambda: (select, valifate, action)
+    return writes(lambda: (select, valifate, action))
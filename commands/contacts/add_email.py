@@ -1,7 +1,7 @@
 """This module contains the 'add' command. It adds a new contact to the storage."""
 import re
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.address_book import AddressBook, Email
@@ -49,4 +49,4 @@ def add_email(address_book: AddressBook) -> Command:
         record.add_email(command[1])
         return Event(EventType.PRINT, {"print": f"✅ Email for {command[0]} added."})
 
-    return lambda: (select, validate, action)
+    return writes(lambda: (select, validate, action))
@@ -3,7 +3,7 @@
 
 from datetime import datetime
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import EventType, Event
 from commands.errors import InvalidArgumentsError, input_error
 from storage.address_book import AddressBook, Record
@@ -41,7 +41,7 @@ def birthdays(address_book: AddressBook) -> Command:
         )
         return Event(EventType.PRINT, {"print": info_to_print})  # Event is used to return the action result to the processor
 
-    return lambda: (select, validate, action)  
+    return reads(lambda: (select, validate, action), address_book.reads_change_indexes)  
     # Return the 'birthdays' command function. It works as a 'command factory'.
     # 'select' function is used to check if the input command is 'birthdays', otherwise return False.
     # 'validate' function is used to check if the input command is valid, otherwise raise an error.
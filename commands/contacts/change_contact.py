@@ -1,7 +1,7 @@
 """Module with the 'change' command."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import EventType, Event
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.address_book import AddressBook, Phone, Email, Address, Birthday
@@ -78,4 +78,4 @@ def change_contact(address_book: AddressBook) -> Command:
 
         return Event(EventType.PRINT, {"print": f"✅ Contact {name} changed."})
 
-    return lambda: (select, validate, action)
\ No newline at end of file
+    return writes(lambda: (select, validate, action))
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Module with the 'delete' command."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import EventType, Event
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.address_book import AddressBook
@@ -46,7 +46,7 @@ def delete_field(address_book: AddressBook) -> Command:
 
         match field_type:
             case "phone":
-                record.phones.clear()  # Delete all phones
+                record.delete_phones()  # Delete all phones
             case "email":
                 record.delete_email()
             case "address":
@@ -56,4 +56,4 @@ def delete_field(address_book: AddressBook) -> Command:
 
         return Event(EventType.PRINT, {"print": f"🚮 {field_type.capitalize()} for contact {name} deleted."})
 
-    return lambda: (select, validate, action)
\ No newline at end of file
+    return writes(lambda: (select, validate, action))
\ No newline at end of file
@@ -1,15 +1,20 @@
-"""This module contains the 'show_birthday' command."""
+"""This module contains the 'search' command."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import EventType, Event
 from commands.errors import input_error, MissingArgumentsError, InvalidArgumentsError
 from storage.address_book import AddressBook
 
+FUZZY_FLAG = "--fuzzy"
+
+FUZZY_DISTANCE = 2
+"""Default largest edit distance of the names found by a fuzzy search"""
+
 def search(address_book: AddressBook) -> Command:
-    """Returns the 'show-birthday' command"""
+    """Returns the 'search' command"""
     def select(command: list[str]) -> bool:
-        """Check if the command is 'phone'."""
+        """Check if the command is 'search'."""
         return len(command) > 0 and (command[0] == "search")
 
     @input_error
@@ -18,27 +23,41 @@ def search(address_book: AddressBook) -> Command:
         
         Args:
             command (list[str]): The command to validate."""
-        if len(command) == 0:
+        if len(command) == 0 or command == [FUZZY_FLAG]:
             raise MissingArgumentsError("name")
 
+        if command[0] == FUZZY_FLAG:
+            if len(command) > 3:
+                raise InvalidArgumentsError("search --fuzzy command takes a name and an optional maximum distance.")
+            if len(command) == 3 and not command[2].isdigit():
+                raise InvalidArgumentsError("maximum distance must be a non-negative integer number.")
+            return (True, None)
+
         if len(command) > 1:
-            raise InvalidArgumentsError("show_birthday command takes only one argument.")
+            raise InvalidArgumentsError("search command takes only one argument.")
 
         return (True, None)
 
     def action(command: list[str]) -> Event:
-        """Print the birthday of the contact with the given name.
+        """Print the contacts whose name contains the given text, or with --fuzzy the contacts
+        whose name is within the maximum edit distance of the given name, nearest first.
         
         Args:
-            command (list[str]): The command to execute. First element is the name of the contact.
+            command (list[str]): The command to execute. First element is the part of the name to search for,
+                or --fuzzy followed by the name and the optional maximum distance.
             
         Returns:
-            Event: The event with the type 'PRINT' and the birthday of the contact."""
+            Event: The event with the type 'PRINT' and the matching contacts."""
+        if command[0] == FUZZY_FLAG:
+            max_distance = int(command[2]) if len(command) == 3 else FUZZY_DISTANCE
+            names = [name for _, name in address_book.find_similar_names(command[1], max_distance)]
+        else:
+            names = address_book.find_names(command[0])
         info_to_print = "\n".join(
-            [str(record) for record in address_book.values() if (command[0] in str(record.name))]
+            [str(address_book.find(name)) for name in names]
         )
         if not info_to_print:
             info_to_print = f"🔍 No contacts found."
         return Event(EventType.PRINT, {"print": info_to_print})
 
-    return lambda: (select, validate, action)
\ No newline at end of file
+    return reads(lambda: (select, validate, action), address_book.reads_change_indexes)
\ No newline at end of file
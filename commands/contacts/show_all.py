@@ -1,9 +1,10 @@
 """Module for the 'all' command."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import EventType, Event
-from commands.errors import InvalidArgumentsError, input_error
+from commands.errors import input_error
+from commands.pagination import parse_page_options, render_page
 from storage.address_book import AddressBook
 
 def show_all(address_book: AddressBook) -> Command:
@@ -14,16 +15,18 @@ def show_all(address_book: AddressBook) -> Command:
 
     @input_error
     def validate(command: list[str]) -> Tuple[bool, Event]:
-        """Check if the command has no arguments."""
-        if len(command) >= 1:
-            raise InvalidArgumentsError("all command does not take any arguments.")
+        """Check if the command has only the --limit and --after options."""
+        parse_page_options(command)
         return (True, None)
 
-    def action(_: list[str]) -> Event:
-        """Print all contacts in the storage."""
-        info_to_print = "\n".join(
-            [str(record) for record in address_book.values()]
-        ) if len(address_book.values()) > 0 else "No contacts found."
-        return Event(EventType.PRINT, {"print": info_to_print})
+    def action(command: list[str]) -> Event:
+        """Print the contacts in the storage sorted by name, a page at a time if --limit is given.
+        
+        Args:
+            command (list[str]): The options of the command."""
+        options = parse_page_options(command)
+        info_to_print = render_page(address_book.iter_records(options.after), options,
+                                    lambda record: record.name_value, str, "all")
+        return Event(EventType.PRINT, {"print": info_to_print or "No contacts found."})
 
-    return lambda: (select, validate, action)
+    return reads(lambda: (select, validate, action))
@@ -1,7 +1,7 @@
 """This module contains the 'show_birthday' command."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import EventType, Event
 from commands.errors import input_error, MissingArgumentsError, InvalidArgumentsError
 from storage.address_book import AddressBook
@@ -43,4 +43,4 @@ def show_birthday(address_book: AddressBook) -> Command:
         record = address_book.find(command[0])
         return Event(EventType.PRINT, {"print": "🎂 " + str(record.birthday)})
 
-    return lambda: (select, validate, action)
\ No newline at end of file
+    return reads(lambda: (select, validate, action), address_book.reads_change_indexes)
\ No newline at end of file
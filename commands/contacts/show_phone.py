@@ -2,7 +2,7 @@
 It returns the 'phone' command, which prints the phone number of the contact with the given name."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import EventType, Event
 from commands.errors import input_error, MissingArgumentsError, InvalidArgumentsError
 from storage.address_book import AddressBook
@@ -41,4 +41,4 @@ def show_phone(address_book: AddressBook) -> Command:
         record = address_book.find(command[0])
         return Event(EventType.PRINT, {"print": "\n".join(map(str, record.phones))})
 
-    return lambda: (select, validate, action)
\ No newline at end of file
+    return reads(lambda: (select, validate, action), address_book.reads_change_indexes)
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Module with the 'wipe' command."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import EventType, Event
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.address_book import AddressBook
@@ -43,4 +43,4 @@ def wipe_contact(address_book: AddressBook) -> Command:
 
         return Event(EventType.PRINT, {"print": f"🚮 Contact {name} wiped from address book."})
 
-    return lambda: (select, validate, action)
\ No newline at end of file
+    return writes(lambda: (select, validate, action))
\ No newline at end of file
@@ -1,8 +1,7 @@
 """This module contains the Event class and EventType enum. """
 
-from dataclasses import dataclass
 from enum import Enum
-from typing import Dict
+from typing import Dict, NamedTuple
 
 class EventType(Enum):
     """The type of event that can be returned by a command."""
@@ -11,8 +10,7 @@ class EventType(Enum):
     PRINT = 2 # The program should print a message and continue
     ERROR = 3 # The program should print an error message and continue
 
-@dataclass
-class Event():
+class Event(NamedTuple):
     """The event returned by a command."""
     type: EventType
     payload: Dict[str, str]
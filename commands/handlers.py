@@ -1,30 +1,89 @@
 """This module contains functions for building handlers from commands."""
 
-from commands.types import Command, Handler, Dependencies
+from time import perf_counter_ns
+from commands.types import Command, Handler, HandlerRegistry, Dependencies, Access, LazyCommand, command_access
 from commands.exit import exit
 from commands.invalid_input import invalid_input
 from commands.hello import hello
-from commands.help import help_command
+from commands.metrics import Histogram, Metrics, CommandMetrics
 from commands.contacts import commands as contacts_commands
 from commands.notes import commands as note_commands
+from commands.transfer import commands as transfer_commands
+from storage.rw_lock import ReadWriteLock
+from handler import compose_handlers
 
-def build_handler(command: Command) -> Handler:
-    """Builds a handler from a command."""
+def timed(function, histogram: Histogram):
+    """Wrap a stage of a command to record its duration in the histogram."""
+    def run(command: list[str]):
+        start = perf_counter_ns()
+        try:
+            return function(command)
+        finally:
+            histogram.record(perf_counter_ns() - start)
+    return run
+
+def lazy_handler(command: LazyCommand, lock: ReadWriteLock = None, metrics: CommandMetrics = None) -> Handler:
+    """Builds a handler that imports the module of the command the first time it is called."""
+    handler = None
+    def cmd(command_words: list[str], next_command: Command):
+        nonlocal handler
+        if handler is None:
+            handler = build_handler(command.load(), lock, metrics)
+        return handler(command_words, next_command)
+    return cmd
+
+def build_handler(command: Command | LazyCommand, lock: ReadWriteLock = None, metrics: CommandMetrics = None) -> Handler:
+    """Builds a handler from a command.
+
+    With a lock, the command is validated and executed while holding it for reading
+    or writing, as the command declares, so checks of the validation still hold
+    when the action runs. With metrics, the duration of every stage is recorded.
+    A lazy command is only loaded when the handler is first called."""
+    if isinstance(command, LazyCommand):
+        return lazy_handler(command, lock, metrics)
     select, validate, action = command()
+    if metrics is not None:
+        select = timed(select, metrics.stages["select"])
+        validate = timed(validate, metrics.stages["validate"])
+        action = timed(action, metrics.stages["action"])
+    hold = None
+    if lock is not None:
+        def hold():
+            """Hold the lock for reading or writing, as the command uses the storages at the moment"""
+            return lock.read() if command_access(command) == Access.READ else lock.write()
     def cmd(command: str, next_command: Command):
         if select(command):
-            valid, event = validate(command[1:])
-            return action(command[1:]) if valid else event
+            if hold is None:
+                valid, event = validate(command[1:])
+                return action(command[1:]) if valid else event
+            with hold():
+                valid, event = validate(command[1:])
+                return action(command[1:]) if valid else event
         
         return next_command
     return cmd
 
-def get_handlers(dependencies: Dependencies):
-    """Returns a list of handlers."""
-    utility_commands = [
-        exit,
-        help_command(),
-        hello,
-        invalid_input,
-    ]
-    return list(map(build_handler, note_commands(dependencies.note_book) + contacts_commands(dependencies.address_book) + utility_commands))
\ No newline at end of file
+def get_handlers(dependencies: Dependencies) -> HandlerRegistry:
+    """Returns the registry of handlers keyed by command word.
+    The handlers share one lock, so they can be called from many threads and
+    alongside the background saves,
+    and record the durations of the commands for the 'stats' command.
+    The 'profile' command runs other commands through the registry itself.
+    Command modules are imported when their command is first used, to keep the startup fast."""
+    metrics = Metrics()
+    utility_commands = {
+        "exit": exit,
+        "close": exit,
+        "help": LazyCommand("commands.help", "help_command"),
+        "hello": hello,
+        "stats": LazyCommand("commands.stats", "stats_command", (metrics, dependencies)),
+    }
+    commands = note_commands(dependencies.note_book) | contacts_commands(dependencies.address_book) | \
+        transfer_commands(dependencies.address_book, dependencies.note_book) | utility_commands
+    lock = dependencies.lock if dependencies.lock is not None else ReadWriteLock()
+    handlers = {word: build_handler(command, lock, metrics.command(word)) for word, command in commands.items()}
+    registry = HandlerRegistry(handlers, build_handler(invalid_input))
+    # the profiled command takes the lock itself, so 'profile' must not hold it
+    profile = LazyCommand("commands.profile", "profile_command", (compose_handlers(registry), dependencies.data_folder))
+    handlers["profile"] = build_handler(profile, None, metrics.command("profile"))
+    return registry
\ No newline at end of file
@@ -57,7 +57,10 @@ wipe name [contact_name] - delete the entire contact record.
 phone [contact_name] - show phone number(s) of a contact.
 
 6. Showing all contacts:
-show all - show all contacts.
+all - show all contacts sorted by name.
+all --limit [number] --after [contact_name] - show a page of contacts that come after the contact.
+search [text] - show contacts whose name contains the text.
+search --fuzzy [contact_name] [max_distance] - show contacts whose name differs by at most [max_distance] letters (2 by default), closest first.
 
 7. Adding a birthday:
 add-birthday [contact_name] [birthday] - add a birthday to a contact in format YYYY-MM-DD.
@@ -78,7 +81,8 @@ rename-note [old_title] [new_title] - rename a note by title.
 update-note [note_title] [note_body] - update a note by title.
 
 13. Show all notes:
-show-notes - show all notes.
+all-notes - show all notes sorted by title.
+all-notes --limit [number] --after [note_title] - show a page of notes that come after the note.
 
 14. Delete a note:
 delete-note [note_title] - delete a note by title.
@@ -95,10 +99,30 @@ delete-tags [note_title] [tags] - delete a tag from a note.
 18. Search notes by keyword:
 note-search keyword [keyword] - search notes by keyword.
 
-19. Search notes by tag:
-note-search tag [tag] - search notes by tag.
+19. Search notes by tags or by a query:
+note-search tag [tags] - search notes that have all of the tags.
+note-search tag --any [tags] - search notes that have any of the tags.
+note-search query [query] - search notes by tag:, title: and body: terms joined by AND, OR, NOT and parentheses,
+    e.g. note-search query tag:work AND (body:deploy OR title:release) NOT tag:old
 
-20. Save data and exit the bot program:
+20. Import contacts or notes from a JSONL or CSV file:
+import contacts [file] - import contacts, the columns are name, phones, birthday, email and address.
+import notes [file] - import notes, the columns are title, datetime, body and tags.
+Phones and tags are lists in JSONL and are separated with ; in CSV.
+
+21. Export contacts or notes to a JSONL or CSV file:
+export contacts [file] - export all contacts.
+export notes [file] - export all notes.
+
+22. Show statistics:
+stats - show how many times each command ran and how long it took, and the number of contacts and notes.
+
+23. Profile a command:
+profile [command] - run the command with cProfile and save the .pstats file to the data folder.
+profile --memory [command] - run the command with tracemalloc and save the allocations snapshot to the data folder.
+Set PYCASTER_PROFILE to cpu or memory to profile every command.
+
+24. Save data and exit the bot program:
 exit or close - exit the program .
 """
 
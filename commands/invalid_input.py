@@ -10,5 +10,5 @@ def action(_: list[str]) -> Event:
 
 def invalid_input() -> Tuple[CommandValidator, CommandAction]:
     """Returns the 'invalid_input' command.
-    Should always be the last command in the list of commands to handle invalid input."""
+    Used as the fallback of the handler registry to handle invalid input."""
     return (lambda _: True), (lambda _: (True, None)), action
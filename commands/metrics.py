@@ -0,0 +1,76 @@
+"""This module contains the latency histograms of the commands."""
+
+STAGES = ("select", "validate", "action")
+"""Stages of a command that are timed"""
+
+SUB_BUCKETS = 8
+"""Buckets per power of two of a histogram, so a bucket spans at most 1/8 of its values"""
+
+class Histogram:
+    """Histogram of durations in nanoseconds with log-linear buckets.
+
+    Recording a duration only increments one counter, so it can be done for every
+    command. Percentiles are estimated at the middle of their bucket, within 1/16
+    of the real value. Concurrent readers may rarely lose a count, which is fine
+    for statistics."""
+    def __init__(self):
+        self.counts: list[int] = []
+        self.count = 0
+        self.total = 0
+
+    @staticmethod
+    def bucket(value: int) -> int:
+        """Get the index of the bucket of the value"""
+        if value < 2 * SUB_BUCKETS:
+            return max(value, 0)
+        shift = value.bit_length() - 4
+        return shift * SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def bucket_middle(index: int) -> float:
+        """Get the value in the middle of the bucket"""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return (index % SUB_BUCKETS + SUB_BUCKETS + 0.5) * (1 << shift)
+
+    def record(self, value: int):
+        """Count a duration in nanoseconds"""
+        index = self.bucket(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def mean(self) -> float:
+        """Get the mean duration in nanoseconds"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Get the duration in nanoseconds that the given percent of the durations do not exceed"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bucket_middle(index)
+        return self.bucket_middle(len(self.counts) - 1)
+
+class CommandMetrics:
+    """Histograms of the stages of one command"""
+    def __init__(self):
+        self.stages = {stage: Histogram() for stage in STAGES}
+
+class Metrics:
+    """Histograms of all commands, by command word"""
+    def __init__(self):
+        self.commands: dict[str, CommandMetrics] = {}
+
+    def command(self, word: str) -> CommandMetrics:
+        """Get the histograms of the command, creating them on first use"""
+        if word not in self.commands:
+            self.commands[word] = CommandMetrics()
+        return self.commands[word]
@@ -1,23 +1,19 @@
-from .add_note import add_note
-from .note_rename import note_rename
-from .note_delete import note_delete
-from .note_update import note_update
-from .get_note import get_note
-from .delete_tags import delete_tags
-from .add_tags import add_tags
-from .note_search import note_search
-from .all_notes import all_notes
+from commands.types import LazyCommand
 from storage.note_book import NoteBook
 
+COMMANDS = {
+    "add-note": ("add_note", "add_note"),
+    "note-rename": ("note_rename", "note_rename"),
+    "note-delete": ("note_delete", "note_delete"),
+    "note-update": ("note_update", "note_update"),
+    "delete-tags": ("delete_tags", "delete_tags"),
+    "add-tags": ("add_tags", "add_tags"),
+    "get-note": ("get_note", "get_note"),
+    "note-search": ("note_search", "note_search"),
+    "all-notes": ("all_notes", "all_notes"),
+}
+"""Modules and factories of the notes commands, by command word"""
+
 def commands(note_book: NoteBook):
-    return [
-            add_note(note_book),
-            note_rename(note_book),
-            note_delete(note_book),
-            note_update(note_book),
-            delete_tags(note_book),
-            add_tags(note_book),
-            get_note(note_book),
-            note_search(note_book),
-            all_notes(note_book)
-        ]
\ No newline at end of file
+    return {word: LazyCommand(f"{__name__}.{module}", factory, (note_book,))
+            for word, (module, factory) in COMMANDS.items()}
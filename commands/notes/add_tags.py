@@ -2,7 +2,7 @@
 
 from typing import Tuple
 from datetime import datetime
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.note_book import NoteBook, Note
@@ -46,4 +46,4 @@ def add_tags(note_book: NoteBook) -> Command:
             note.add_tag(tag)
         
         return Event(EventType.PRINT, {"print": f'✅ Tags added to the note "{title}".'})
-    return lambda: (select, validate, action)
+    return writes(lambda: (select, validate, action))
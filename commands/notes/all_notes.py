@@ -1,9 +1,10 @@
 """This module contains the 'all-notes' command. It retrieves notes from the storage by tags or keyword."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import Event, EventType
-from commands.errors import InvalidArgumentsError, input_error
+from commands.errors import input_error
+from commands.pagination import parse_page_options, render_page
 from storage.note_book import NoteBook
 
 def all_notes(note_book: NoteBook) -> Command:
@@ -18,24 +19,24 @@ def all_notes(note_book: NoteBook) -> Command:
 
     @input_error
     def validate(command: list[str]) -> Tuple[bool, Event]:
-        """Check if the command has no arguments.
+        """Check if the command has only the --limit and --after options.
         
         Args:
             command (list[str]): The command to validate."""
-        match len(command):
-            case 0:
-                return (True, None)
-            case _:
-                raise InvalidArgumentsError("all-notes command takes no arguments.")
+        parse_page_options(command)
+        return (True, None)
 
-    def action(_: list[str]) -> Event:
-        """Retrieves all notes."""
+    def action(command: list[str]) -> Event:
+        """Retrieves the notes sorted by title, a page at a time if --limit is given.
+        Bodies are read without filling the body cache of the notebook.
         
-        if len(note_book.values()) == 0:
-            return Event(EventType.PRINT, {"print": "No notes found."})
-        
-        notes = "\n".join(str(note) for note in note_book.values())
+        Args:
+            command (list[str]): The options of the command."""
+        options = parse_page_options(command)
+        notes = render_page(note_book.iter_notes(options.after), options,
+                            lambda note: note.title, lambda note: note.to_string(note.read_body(cache=False)),
+                            "all-notes")
         
-        return Event(EventType.PRINT, {"print": str(notes)})
+        return Event(EventType.PRINT, {"print": notes or "No notes found."})
 
-    return lambda: (select, validate, action)
+    return reads(lambda: (select, validate, action))
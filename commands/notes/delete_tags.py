@@ -1,7 +1,7 @@
 """This module contains the 'delete-tags' command. It adds a new note to the storage."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.note_book import NoteBook
@@ -44,5 +44,5 @@ def delete_tags(note_book: NoteBook) -> Command:
         for tag in tags:
             note.remove_tag(tag)
         
-        return Event(EventType.PRINT, {"print": f'✅ Tags added to the note "{title}".'})
-    return lambda: (select, validate, action)
+        return Event(EventType.PRINT, {"print": f'✅ Tags removed from the note "{title}".'})
+    return writes(lambda: (select, validate, action))
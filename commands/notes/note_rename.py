@@ -2,7 +2,7 @@
 
 from typing import Tuple
 from datetime import datetime
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.note_book import NoteBook
@@ -47,4 +47,4 @@ def note_rename(note_book: NoteBook) -> Command:
 
         return Event(EventType.PRINT, {"print": f'✅ Note "{command[0]}" renamed.'})
 
-    return lambda: (select, validate, action)
+    return writes(lambda: (select, validate, action))
@@ -1,10 +1,11 @@
-"""This module contains the 'note-search' command. It retrieves notes from the storage by tags or keyword."""
+"""This module contains the 'note-search' command. It retrieves notes from the storage by tags, keyword or query."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, reads
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.note_book import NoteBook, Note
+from storage.note_query import parse
 
 def note_search(note_book: NoteBook) -> Command:
     """Returns the 'note-search' command"""
@@ -18,31 +19,47 @@ def note_search(note_book: NoteBook) -> Command:
 
     @input_error
     def validate(command: list[str]) -> Tuple[bool, Event]:
-        """Check if the command has at least one argument.
+        """Check if the command has at least one argument, and that a query can be parsed.
         
         Args:
             command (list[str]): The command to validate."""
+        if len(command) > 1 and command[0] == "query":
+            try:
+                parse(" ".join(command[1:]))
+            except ValueError as e:
+                raise InvalidArgumentsError(f"{e} in the query.")
+            return (True, None)
         match len(command):
             case 0:
                 raise MissingArgumentsError("type and search term")
             case 1:
                 raise MissingArgumentsError("search term")
             case 2:
-                if command[0] not in ["tag", "keyword"]:
-                    raise InvalidArgumentsError("First argument must be 'tag' or 'keyword'.")
+                if command[0] not in ["tag", "keyword", "query"]:
+                    raise InvalidArgumentsError("First argument must be 'tag', 'keyword' or 'query'.")
+                if command[0] == "tag" and command[1] == "--any":
+                    raise MissingArgumentsError("tags")
                 return (True, None)
             case _:
-                raise InvalidArgumentsError("note-search command takes at most two arguments.")
+                if command[0] != "tag":
+                    raise InvalidArgumentsError("note-search keyword command takes only one search term.")
+                return (True, None)
 
     def action(command: list[str]) -> Event:
-        """Retrieves notes with the given tags or keyword.
+        """Retrieves notes with the given tags, keyword or query.
         
         Args:
-            command (list[str]): The command to execute. First argument is the type of search, the rest are tag or keyword."""
+            command (list[str]): The command to execute. First argument is the type of search, the rest are keyword, tags or query.
+            Tags are matched all at once, or any of them if the first tag is '--any'.
+            A query joins tag:, title: and body: terms with AND, OR, NOT and parentheses."""
         
         search_result = []
         if command[0] == "tag":
-            search_result = note_book.search_by_tag(command[1])
+            match_all = command[1] != "--any"
+            tags = command[1:] if match_all else command[2:]
+            search_result = note_book.search_by_tags(tags, match_all)
+        elif command[0] == "query":
+            search_result = note_book.search_by_query(" ".join(command[1:]))
         else :
             keyword = " ".join(command[1:])
             search_result = note_book.search_by_keyword(keyword)
@@ -51,4 +68,4 @@ def note_search(note_book: NoteBook) -> Command:
         
         return Event(EventType.PRINT, {"print": str(notes)})
 
-    return lambda: (select, validate, action)
+    return reads(lambda: (select, validate, action))
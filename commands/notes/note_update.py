@@ -1,7 +1,7 @@
 """This module contains the 'add' command. It adds a new contact to the storage."""
 
 from typing import Tuple
-from commands.types import Command
+from commands.types import Command, writes
 from commands.event import Event, EventType
 from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
 from storage.note_book import NoteBook
@@ -44,4 +44,4 @@ def note_update(note_book: NoteBook) -> Command:
 
         return Event(EventType.PRINT, {"print": f'✅ Note "{command[0]}" updated.'})
 
-    return lambda: (select, validate, action)
+    return writes(lambda: (select, validate, action))
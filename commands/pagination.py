@@ -0,0 +1,64 @@
+"""Options and rendering of the commands that list contacts or notes page by page."""
+
+from itertools import islice
+from typing import Callable, Iterator, NamedTuple
+from commands.errors import MissingArgumentsError, InvalidArgumentsError
+
+class PageOptions(NamedTuple):
+    """The options of a paginated command."""
+    limit: int | None
+    """The maximum number of items to show, None to show all items."""
+    after: str | None
+    """The key of the last item of the previous page, None to start from the first item."""
+
+def parse_page_options(command: list[str]) -> PageOptions:
+    """Parse the --limit [number] and --after [cursor] options.
+    The cursor takes all arguments up to the next option, so it may contain spaces.
+
+    Args:
+        command (list[str]): The arguments of the command."""
+    limit, after = None, None
+    i = 0
+    while i < len(command):
+        match command[i]:
+            case "--limit":
+                if i + 1 == len(command):
+                    raise MissingArgumentsError("limit")
+                if not command[i + 1].isdigit() or int(command[i + 1]) == 0:
+                    raise InvalidArgumentsError(f"Limit must be a positive number: {command[i + 1]}")
+                limit = int(command[i + 1])
+                i += 2
+            case "--after":
+                end = i + 1
+                while end < len(command) and command[end] != "--limit":
+                    end += 1
+                if end == i + 1:
+                    raise MissingArgumentsError("cursor")
+                after = " ".join(command[i + 1:end])
+                i = end
+            case option:
+                raise InvalidArgumentsError(f"Unknown option: {option}. Use --limit [number] and --after [cursor].")
+    return PageOptions(limit, after)
+
+def render_page(items: Iterator, options: PageOptions, key: Callable, render: Callable, command: str) -> str | None:
+    """Render one page of items, reading only the items of the page from the iterator.
+
+    Args:
+        items (Iterator): The items in cursor order, starting after the cursor.
+        options (PageOptions): The options of the command.
+        key (Callable): Returns the cursor of an item.
+        render (Callable): Returns the text of an item.
+        command (str): The command that shows the next page.
+
+    Returns:
+        str | None: The text of the page, None if the page is empty."""
+    if options.limit is None:
+        text = "\n".join(render(item) for item in items)
+        return text or None
+    page = list(islice(items, options.limit + 1))
+    if not page:
+        return None
+    lines = [render(item) for item in page[:options.limit]]
+    if len(page) > options.limit:
+        lines.append(f"➡️ Next page: {command} --limit {options.limit} --after {key(page[options.limit - 1])}")
+    return "\n".join(lines)
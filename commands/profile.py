@@ -0,0 +1,114 @@
+"""Module with the 'profile' command, which runs another command under a profiler."""
+
+import re
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Tuple
+from commands.types import Command
+from commands.event import EventType, Event
+from commands.errors import input_error, MissingArgumentsError
+
+PROFILERS = {
+    "cpu": ".pstats",
+    "memory": ".allocations",
+}
+"""Extensions of the profile files by profiler. CPU profiles are written by cProfile and
+can be read with pstats, memory profiles are tracemalloc snapshots that can be read with
+tracemalloc.Snapshot.load."""
+
+TRACEMALLOC_FRAMES = 10
+"""Number of frames kept for the traceback of every allocation"""
+
+TRACEMALLOC_LOCK = threading.RLock()
+"""Held while a command runs under tracemalloc. Tracing is global to the process, so
+commands of the server that are profiled at the same time take turns: one must not
+stop tracing while another is still taking its snapshot. It is reentrant for a
+profile command that profiles another one."""
+
+def profile_path(folder: Path, word: str, profiler: str) -> Path:
+    """Get a new file in the folder for the profile of a command"""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    name = re.sub(r"[^\w-]", "_", word)
+    return folder / f"profile-{stamp}-{name}{PROFILERS[profiler]}"
+
+def run_profiled(handler: Callable[[list[str]], Event], command: list[str], profiler: str, folder: Path) -> Tuple[Event, Path]:
+    """Run a command with the profiler and write the profile to the folder
+
+    Args:
+        handler (Callable[[list[str]], Event]): the handler that runs the command
+        command (list[str]): the command
+        profiler (str): 'cpu' or 'memory'
+        folder (Path): the folder of the profile files
+
+    Returns:
+        Tuple[Event, Path]: the result of the command and the profile file"""
+    path = profile_path(folder, command[0], profiler)
+    if profiler == "cpu":
+        profile = cProfile.Profile()
+        event = profile.runcall(handler, command)
+        profile.dump_stats(path)
+        return event, path
+    with TRACEMALLOC_LOCK:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            event = handler(command)
+            tracemalloc.take_snapshot().dump(path)
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+    return event, path
+
+def profiled(handler: Callable[[list[str]], Event], profiler: str, folder: Path) -> Callable[[list[str]], Event]:
+    """Wrap a handler to profile every command, each into its own file in the folder"""
+    def run(command: list[str]) -> Event:
+        return run_profiled(handler, command, profiler, folder)[0]
+    return run
+
+def profile_command(dispatch: Callable[[list[str]], Event], folder: Path) -> Command:
+    """Returns the 'profile' command
+
+    Args:
+        dispatch (Callable[[list[str]], Event]): the handler of all commands, which runs the profiled command
+        folder (Path): the folder of the profile files"""
+    def select(command: list[str]) -> bool:
+        """Check if the command is 'profile'.
+
+        Args:
+            command (list[str]): The command to check."""
+        return len(command) > 0 and command[0] == "profile"
+
+    @input_error
+    def validate(command: list[str]) -> Tuple[bool, Event]:
+        """Check if a command to profile is given.
+
+        Args:
+            command (list[str]): The command to validate."""
+        if len(command) == 0 or command == ["--memory"]:
+            raise MissingArgumentsError("command to profile")
+        return (True, None)
+
+    def action(command: list[str]) -> Event:
+        """Run the command with cProfile, or with tracemalloc if the first argument is --memory,
+        and print its result with the file of the profile.
+
+        Args:
+            command (list[str]): The command to execute. The arguments are the command to profile."""
+        profiler = "cpu"
+        if command[0] == "--memory":
+            profiler, command = "memory", command[1:]
+        event, path = run_profiled(dispatch, [command[0].lower()] + command[1:], profiler, folder)
+        saved = f"📈 Profile saved to {path}"
+        match event.type:
+            case EventType.PRINT | EventType.END:
+                return Event(event.type, event.payload | {"print": f"{event.payload['print']}\n{saved}"})
+            case EventType.ERROR:
+                return Event(EventType.ERROR, event.payload | {"message": f"{event.payload['message']}\n{saved}"})
+            case _:
+                return Event(EventType.PRINT, {"print": saved})
+
+    return lambda: (select, validate, action)
@@ -0,0 +1,47 @@
+"""Module with the 'stats' command."""
+
+from typing import Tuple
+from commands.types import Command, Dependencies, reads
+from commands.event import EventType, Event
+from commands.errors import input_error, InvalidArgumentsError
+from commands.metrics import Metrics, STAGES
+
+def stats_command(metrics: Metrics, dependencies: Dependencies) -> Command:
+    """Returns the 'stats' command"""
+    def select(command: list[str]) -> bool:
+        """Check if the command is 'stats'.
+
+        Args:
+            command (list[str]): The command to check."""
+        return len(command) > 0 and command[0] == "stats"
+
+    @input_error
+    def validate(command: list[str]) -> Tuple[bool, Event]:
+        """Check if the command has no arguments.
+
+        Args:
+            command (list[str]): The command to validate."""
+        if len(command) > 0:
+            raise InvalidArgumentsError("stats command does not take any arguments.")
+        return (True, None)
+
+    def action(command: list[str]) -> Event:
+        """Print the number of runs and the mean, p95 and p99 durations of every stage of
+        the commands that were run, and the sizes of the address book and the notebook.
+
+        Args:
+            command (list[str]): The command to execute."""
+        lines = [f"📊 {'command':<16}{'stage':<10}{'count':>8}{'mean µs':>12}{'p95 µs':>12}{'p99 µs':>12}"]
+        for word, command_metrics in sorted(metrics.commands.items()):
+            for stage in STAGES:
+                histogram = command_metrics.stages[stage]
+                if not histogram.count:
+                    continue
+                lines.append(f"   {word:<16}{stage:<10}{histogram.count:>8}{histogram.mean() / 1000:>12.1f}"
+                             f"{histogram.percentile(95) / 1000:>12.1f}{histogram.percentile(99) / 1000:>12.1f}")
+        if len(lines) == 1:
+            lines.append("   No commands were run yet.")
+        lines.append(f"📒 Contacts: {len(dependencies.address_book)}, notes: {len(dependencies.note_book)}")
+        return Event(EventType.PRINT, {"print": "\n".join(lines)})
+
+    return reads(lambda: (select, validate, action))
@@ -0,0 +1,13 @@
+from commands.types import LazyCommand
+from storage.address_book import AddressBook
+from storage.note_book import NoteBook
+
+COMMANDS = {
+    "import": ("import_data", "import_data"),
+    "export": ("export_data", "export_data"),
+}
+"""Modules and factories of the transfer commands, by command word"""
+
+def commands(address_book: AddressBook, note_book: NoteBook):
+    return {word: LazyCommand(f"{__name__}.{module}", factory, (address_book, note_book))
+            for word, (module, factory) in COMMANDS.items()}
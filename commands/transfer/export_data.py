@@ -0,0 +1,55 @@
+"""This module contains the 'export' command. It streams contacts or notes from the storage into a JSONL or CSV file."""
+
+from typing import Tuple
+from pathlib import Path
+from commands.types import Command, reads
+from commands.event import Event, EventType
+from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
+from storage.address_book import AddressBook
+from storage.note_book import NoteBook
+from storage.transfer import FORMATS, CONTACT_FIELDS, NOTE_FIELDS, write_rows
+
+def export_data(address_book: AddressBook, note_book: NoteBook) -> Command:
+    """Returns the 'export' command"""
+    def select(command: list[str]) -> bool:
+        """Check if the command is 'export'
+        
+        Args:
+            command (list[str]): The command to check."""
+
+        return len(command) > 0 and command[0] == "export"
+
+    @input_error
+    def validate(command: list[str]) -> Tuple[bool, Event]:
+        """Check if the command has the kind of data and a file in a supported format in an existing directory.
+        
+        Args:
+            command (list[str]): The command to validate."""
+        match len(command):
+            case 0:
+                raise MissingArgumentsError("contacts or notes and file")
+            case 1:
+                raise MissingArgumentsError("file")
+            case _:
+                if command[0] not in ["contacts", "notes"]:
+                    raise InvalidArgumentsError("First argument must be 'contacts' or 'notes'.")
+                file_path = Path(" ".join(command[1:])).expanduser()
+                if file_path.suffix not in FORMATS:
+                    raise InvalidArgumentsError(f"Unsupported file format: {file_path.suffix}. Use {' or '.join(FORMATS)}.")
+                if not file_path.parent.is_dir():
+                    raise InvalidArgumentsError(f"Can't find the directory: {file_path.parent}")
+                return (True, None)
+
+    def action(command: list[str]) -> Event:
+        """Exports contacts or notes to the file.
+        
+        Args:
+            command (list[str]): The command to execute. First argument is 'contacts' or 'notes', the rest is the file path."""
+        file_path = Path(" ".join(command[1:])).expanduser()
+        if command[0] == "contacts":
+            count = write_rows(file_path, CONTACT_FIELDS, address_book.export_records())
+        else:
+            count = write_rows(file_path, NOTE_FIELDS, note_book.export_notes())
+        return Event(EventType.PRINT, {"print": f"✅ Exported {count} {command[0]} to {file_path}."})
+
+    return reads(lambda: (select, validate, action))
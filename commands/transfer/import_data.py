@@ -0,0 +1,62 @@
+"""This module contains the 'import' command. It streams contacts or notes from a JSONL or CSV file into the storage."""
+
+from typing import Tuple
+from pathlib import Path
+from commands.types import Command, writes
+from commands.event import Event, EventType
+from commands.errors import MissingArgumentsError, InvalidArgumentsError, input_error
+from storage.address_book import AddressBook
+from storage.note_book import NoteBook
+from storage.transfer import FORMATS, read_rows
+
+def import_data(address_book: AddressBook, note_book: NoteBook) -> Command:
+    """Returns the 'import' command"""
+    def select(command: list[str]) -> bool:
+        """Check if the command is 'import'
+        
+        Args:
+            command (list[str]): The command to check."""
+
+        return len(command) > 0 and command[0] == "import"
+
+    @input_error
+    def validate(command: list[str]) -> Tuple[bool, Event]:
+        """Check if the command has the kind of data and an existing file in a supported format.
+        
+        Args:
+            command (list[str]): The command to validate."""
+        match len(command):
+            case 0:
+                raise MissingArgumentsError("contacts or notes and file")
+            case 1:
+                raise MissingArgumentsError("file")
+            case _:
+                if command[0] not in ["contacts", "notes"]:
+                    raise InvalidArgumentsError("First argument must be 'contacts' or 'notes'.")
+                file_path = Path(" ".join(command[1:])).expanduser()
+                if file_path.suffix not in FORMATS:
+                    raise InvalidArgumentsError(f"Unsupported file format: {file_path.suffix}. Use {' or '.join(FORMATS)}.")
+                if not file_path.is_file():
+                    raise InvalidArgumentsError(f"File not found: {file_path}")
+                return (True, None)
+
+    def action(command: list[str]) -> Event:
+        """Imports contacts or notes from the file.
+        
+        Args:
+            command (list[str]): The command to execute. First argument is 'contacts' or 'notes', the rest is the file path."""
+        file_path = Path(" ".join(command[1:])).expanduser()
+        rows = read_rows(file_path)
+        if command[0] == "contacts":
+            report = address_book.import_records(rows)
+        else:
+            report = note_book.import_notes(rows)
+
+        message = f"✅ Imported {report.imported} {command[0]} from {file_path}."
+        if report.skipped:
+            message += f"\n⚠️ Skipped {report.skipped} lines:\n" + "\n".join(report.errors)
+            if report.skipped > len(report.errors):
+                message += "\n..."
+        return Event(EventType.PRINT, {"print": message})
+
+    return writes(lambda: (select, validate, action))
@@ -1,9 +1,13 @@
 """This module contains the types for the commands."""
 
-from typing import Callable, Tuple, NamedTuple
+from enum import Enum
+from importlib import import_module
+from pathlib import Path
+from typing import Callable, Dict, Tuple, NamedTuple
 from commands.event import Event
 from storage.address_book import AddressBook
 from storage.note_book import NoteBook
+from storage.rw_lock import ReadWriteLock
 
 CommandSelector = Callable[[list[str]], bool]
 """A function that selects a command."""
@@ -17,12 +21,64 @@ CommandAction = Callable[[list[str]], Event]
 Command = Callable[[], Tuple[CommandSelector, CommandValidator, CommandAction]]
 """A function that returns a command validator and a command action."""
 
+class Access(Enum):
+    """How a command uses the storages."""
+    READ = "read"
+    """The command only reads, so it can run together with other readers."""
+    WRITE = "write"
+    """The command changes the storages, so it runs alone."""
+
+def reads(command: Command, writes_when: Callable[[], bool] = None) -> Command:
+    """Declare that the command only reads the storages.
+    While writes_when returns True, reading changes the storages, so the command runs alone."""
+    command.access = Access.READ
+    command.writes_when = writes_when
+    return command
+
+def writes(command: Command) -> Command:
+    """Declare that the command changes the storages."""
+    command.access = Access.WRITE
+    return command
+
+def command_access(command: Command) -> Access:
+    """Get how the command uses the storages now. Commands that do not declare it are treated as writers,
+    and so are readers while their reads change the storages."""
+    access = getattr(command, "access", Access.WRITE)
+    writes_when = getattr(command, "writes_when", None)
+    if access == Access.READ and writes_when is not None and writes_when():
+        return Access.WRITE
+    return access
+
+class LazyCommand(NamedTuple):
+    """A command whose module is imported the first time the command is used."""
+    module: str
+    """The module of the command factory."""
+    factory: str
+    """The function of the module that returns the command."""
+    args: tuple = ()
+    """The arguments of the factory."""
+
+    def load(self) -> Command:
+        """Import the module and create the command."""
+        return getattr(import_module(self.module), self.factory)(*self.args)
+
 Handler = Callable[[list[str], Command], Command | Event]
 """A function that handles a command and returns a command or an event."""
 
+class HandlerRegistry(NamedTuple):
+    """A named tuple that maps command words to their handlers."""
+    handlers: Dict[str, Handler]
+    """The handlers keyed by the first word of the command."""
+    fallback: Handler
+    """The handler to use when no handler is registered for the command word."""
+
 class Dependencies(NamedTuple):
     """A named tuple that contains the external dependencies for the commands."""
     address_book: AddressBook
     """The storage to use for the contacts related commands."""
     note_book: NoteBook
     """The storage to use for the notes related commands."""
+    data_folder: Path = Path(".")
+    """The folder of the data files, where diagnostic files are written too."""
+    lock: ReadWriteLock = None
+    """The lock the commands share with the background saves, a new one if not given."""
@@ -1,24 +1,25 @@
 from commands.event import EventType, Event
-from functools import reduce
-from commands.types import Handler
+from commands.types import Handler, HandlerRegistry
 
-def compose_handlers(handlers: list[Handler]):
-    """Compose a list of handlers into a single handler.
+def compose_handlers(registry: HandlerRegistry):
+    """Compose a registry of handlers into a single handler.
+
+    The handler for a command is looked up by the command word, so the cost of
+    dispatching does not depend on the number of registered commands.
+    Commands without a registered handler go to the registry fallback.
     
     Args:
-        handlers (list[Handler]): The list of handlers to compose.
+        registry (HandlerRegistry): The registry of handlers to compose.
     
     Returns:
         Handler: The composed handler."""
-    def handler(command: list[str]) -> Event:
-        def reducer(result: Handler | Event, next: Handler):
-            if isinstance(result, Event):
-                return result
-            return result(command, next)
-        
-        handlers.append(Event(EventType.CONTINUE, {}))
+    handlers, fallback = registry
+    end_of_chain = Event(EventType.CONTINUE, {})
 
-        return reduce(reducer, handlers, lambda _, next: next)
+    def handler(command: list[str]) -> Event:
+        result = handlers.get(command[0], fallback)(command, fallback)
+        if isinstance(result, Event):
+            return result
+        return result(command, end_of_chain)
 
     return handler
-
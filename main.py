@@ -1,54 +1,176 @@
-import sys
-from pathlib import Path
-from processor import cli_processor
-from handler import compose_handlers
-from commands.handlers import get_handlers
-from commands.types import Dependencies
-from storage.address_book import AddressBook
-from storage.note_book import NoteBook
-from contextlib import contextmanager
-
-def build_processor(dependencies: Dependencies):
-    handlers = get_handlers(dependencies)
-    handler = compose_handlers(handlers)
-    return cli_processor(handler)
-
-@contextmanager
-def build_dependencies(folder: Path):
-    note_book_file = folder / 'note_book.pickle'
-    if not note_book_file.exists():
-        note_book_file.touch()
-    note_book, err = NoteBook.load_data(note_book_file) if note_book_file else (NoteBook(), None)
-    if err:
-        print(err)
-        sys.exit(1)
-    
-    address_book_file = folder / 'address_book.pickle'
-    if not address_book_file.exists():
-        address_book_file.touch()
-    address_book, err = AddressBook.load_data(address_book_file) if address_book_file else (AddressBook(), None)
-    if err:
-        print(err)
-        sys.exit(1)
-    print(f"Data has been loaded from file 💾: {address_book_file} and {note_book_file}")
-    try:
-        yield Dependencies(address_book, note_book)
-    finally:
-        note_book.save_data(note_book_file)
-        address_book.save_data(address_book_file)
-        print(f"Data has been saved to file 📓: {address_book_file} and {note_book_file}")
-
-
-def main(filename: Path):
-    with build_dependencies(filename) as dependencies:
-        processor = build_processor(dependencies)
-        processor()
-        
-
-if __name__ == "__main__":
-    default_directory = Path.home() / 'my_address_book'
-
-    if not default_directory.exists():
-        default_directory.mkdir(parents=True, exist_ok=True)
-
-    main(default_directory)
\ No newline at end of file
+import os
+import sys
+import argparse
+from pathlib import Path
+from typing import TextIO
+from processor import cli_processor, batch_processor
+from handler import compose_handlers
+from commands.handlers import get_handlers
+from commands.types import Dependencies
+from storage.address_book import AddressBook
+from storage.note_book import NoteBook
+from storage.journal import Journal
+from storage.rw_lock import ReadWriteLock
+from storage.autosave import AUTOSAVE_INTERVAL, Autosaver
+from storage.compression import CODECS
+from storage.sqlite_address_book import SqliteAddressBook
+from storage.sqlite_note_book import SqliteNoteBook
+from contextlib import contextmanager
+
+def build_command_handler(dependencies: Dependencies):
+    """Build the handler of all commands. If PYCASTER_PROFILE is set to 'cpu' or 'memory',
+    every command is profiled into a file in the data folder."""
+    handler = compose_handlers(get_handlers(dependencies))
+    profiler = os.environ.get('PYCASTER_PROFILE')
+    if not profiler:
+        return handler
+    from commands.profile import PROFILERS, profiled
+    if profiler not in PROFILERS:
+        print(f"Unknown profiler in PYCASTER_PROFILE: {profiler}. Use {' or '.join(PROFILERS)}")
+        sys.exit(1)
+    return profiled(handler, profiler, dependencies.data_folder)
+
+def build_processor(dependencies: Dependencies):
+    return cli_processor(build_command_handler(dependencies))
+
+STORAGES = {
+    '.pickle': ((AddressBook, '.pickle'), (NoteBook, '.pickle')),
+    '.sqlite': ((SqliteAddressBook, '.sqlite'), (SqliteNoteBook, '.sqlite')),
+    '.db': ((SqliteAddressBook, '.db'), (SqliteNoteBook, '.db')),
+    '.snapshot': ((AddressBook, '.snapshot'), (NoteBook, '.pickle')),
+    '.shards': ((AddressBook, '.shards'), (NoteBook, '.shards')),
+}
+"""Classes and file extensions of the address book and the notebook by the value of PYCASTER_STORAGE.
+Only the address book has a snapshot format, so the notebook is kept in a pickle next to its snapshot"""
+
+def autosave_interval() -> float:
+    """Get the seconds between background saves from PYCASTER_AUTOSAVE, 0 to turn them off"""
+    value = os.environ.get('PYCASTER_AUTOSAVE')
+    if not value:
+        return AUTOSAVE_INTERVAL
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        print(f"Invalid number of seconds in PYCASTER_AUTOSAVE: {value}")
+        sys.exit(1)
+
+def compression_codec() -> str:
+    """Get the codec of the saved files from PYCASTER_COMPRESSION, None to save plain pickles"""
+    codec = os.environ.get('PYCASTER_COMPRESSION') or None
+    if codec is not None and codec not in CODECS:
+        print(f"Unknown codec in PYCASTER_COMPRESSION: {codec}. Use {', '.join(CODECS)}")
+        sys.exit(1)
+    return codec
+
+@contextmanager
+def build_dependencies(folder: Path, extension: str = '.pickle', deferred: bool = False):
+    """Load the address book and the notebook and save them when done, compressed with the
+    codec in PYCASTER_COMPRESSION if it is set. Changes are saved in the background every
+    PYCASTER_AUTOSAVE seconds too, except for deferred batch runs"""
+    (address_book_class, address_book_extension), (note_book_class, note_book_extension) = STORAGES[extension]
+    codec = compression_codec()
+    note_book_file = folder / f'note_book{note_book_extension}'
+    misnamed_file = folder / f'note_book{extension}'
+    if not note_book_file.exists() and misnamed_file != note_book_file and misnamed_file.exists():
+        # notebooks of earlier versions were pickled under the extension of the address book
+        os.replace(misnamed_file, note_book_file)
+    if not note_book_file.exists():
+        note_book_file.touch()
+    note_book, err = note_book_class.load_data(note_book_file) if note_book_file else (note_book_class(), None)
+    if err:
+        print(err)
+        sys.exit(1)
+    err = note_book.open_journal(Journal(folder / 'note_book.journal', deferred=deferred))
+    if err:
+        print(err)
+        sys.exit(1)
+    
+    address_book_file = folder / f'address_book{address_book_extension}'
+    if not address_book_file.exists():
+        address_book_file.touch()
+    address_book, err = address_book_class.load_data(address_book_file) if address_book_file else (address_book_class(), None)
+    if err:
+        print(err)
+        sys.exit(1)
+    err = address_book.open_journal(Journal(folder / 'address_book.journal', deferred=deferred))
+    if err:
+        print(err)
+        sys.exit(1)
+    address_book.codec = note_book.codec = codec
+    print(f"Data has been loaded from file 💾: {address_book_file} and {note_book_file}")
+    lock = ReadWriteLock()
+    interval = autosave_interval()
+    autosaver = Autosaver([address_book, note_book], lock, interval) if interval and not deferred else None
+    if autosaver is not None:
+        autosaver.start()
+    try:
+        yield Dependencies(address_book, note_book, folder, lock)
+    finally:
+        if autosaver is not None:
+            autosaver.stop()
+        if note_book.is_dirty():
+            note_book.compact()
+        if address_book.is_dirty():
+            address_book.compact()
+        note_book.close()
+        address_book.close()
+        print(f"Data has been saved to file 📓: {address_book_file} and {note_book_file}")
+
+
+def main(filename: Path, extension: str = '.pickle'):
+    with build_dependencies(filename, extension) as dependencies:
+        processor = build_processor(dependencies)
+        processor()
+
+def run_script(filename: Path, script: TextIO, extension: str = '.pickle', stop_on_error: bool = True) -> int:
+    """Run the commands of a script without prompts. Changes are not journaled, the data is saved once at the end
+
+    Args:
+        filename (Path): folder of the data files
+        script (TextIO): the script
+        extension (str): extension of the data files
+        stop_on_error (bool): stop at the first failed command
+
+    Returns:
+        int: number of failed commands"""
+    sys.stdout.reconfigure(line_buffering=False)
+    with build_dependencies(filename, extension, deferred=True) as dependencies:
+        handler = build_command_handler(dependencies)
+        return batch_processor(handler, script, sys.stdout, stop_on_error)()
+
+def serve(filename: Path, address: str, extension: str = '.pickle'):
+    """Serve the commands over TCP to many clients, with the data held in memory by one process
+
+    Args:
+        filename (Path): folder of the data files
+        address (str): port or host:port to listen on
+        extension (str): extension of the data files"""
+    from server import server_processor
+    host, _, port = address.rpartition(':')
+    with build_dependencies(filename, extension) as dependencies:
+        handler = build_command_handler(dependencies)
+        server_processor(handler, host or '127.0.0.1', int(port))()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Address book and notebook assistant")
+    parser.add_argument('script', nargs='?', type=Path,
+                        help="file with commands to run without prompts, '-' to read them from stdin")
+    parser.add_argument('--keep-going', action='store_true', help="run the rest of the script after a failed command")
+    parser.add_argument('--serve', metavar='[HOST:]PORT', help="serve the commands over TCP instead of the prompt")
+    args = parser.parse_args()
+
+    default_directory = Path.home() / 'my_address_book'
+
+    if not default_directory.exists():
+        default_directory.mkdir(parents=True, exist_ok=True)
+
+    extension = os.environ.get('PYCASTER_STORAGE', '.pickle')
+    if args.serve:
+        serve(default_directory, args.serve, extension)
+    elif args.script is None and sys.stdin.isatty():
+        main(default_directory, extension)
+    elif args.script is None or str(args.script) == '-':
+        sys.exit(1 if run_script(default_directory, sys.stdin, extension, not args.keep_going) else 0)
+    else:
+        with open(args.script, 'r', encoding='utf-8', buffering=1024 * 1024) as script:
+            sys.exit(1 if run_script(default_directory, script, extension, not args.keep_going) else 0)
\ No newline at end of file
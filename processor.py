@@ -1,3 +1,4 @@
+from typing import Iterable, TextIO
 from commands.event import EventType
 from commands.types import Handler
 
@@ -24,4 +25,38 @@ def cli_processor(handler: Handler):
                     continue
                 case _:
                     continue
-    return start_processor
\ No newline at end of file
+    return start_processor
+
+def batch_processor(handler: Handler, lines: Iterable[str], output: TextIO, stop_on_error: bool = True):
+    """Starts the processor that runs the commands of a script without prompts.
+    Blank lines and lines starting with # are skipped.
+
+    Args:
+        handler (Handler): the command handler
+        lines (Iterable[str]): lines of the script
+        output (TextIO): buffered stream for the output of the commands
+        stop_on_error (bool): stop at the first failed command instead of running the rest of the script
+
+    Returns:
+        Callable[[], int]: function that runs the script and returns the number of failed commands"""
+    def start_processor() -> int:
+        errors = 0
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            event = handler(command_type_to_lowwer(line.split(" ")))
+            match event.type:
+                case EventType.PRINT:
+                    output.write(event.payload["print"] + "\n")
+                case EventType.END:
+                    output.write(event.payload["print"] + "\n")
+                    break
+                case EventType.ERROR:
+                    errors += 1
+                    output.write(f"❌ Error occurred in line {number}: {event.payload['message']}\n")
+                    if stop_on_error:
+                        break
+        output.flush()
+        return errors
+    return start_processor
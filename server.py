@@ -0,0 +1,99 @@
+import asyncio
+from commands.event import Event, EventType
+from commands.types import Handler
+from processor import command_type_to_lowwer
+
+STATUS = {
+    EventType.PRINT: "OK",
+    EventType.CONTINUE: "OK",
+    EventType.ERROR: "ERR",
+    EventType.END: "BYE",
+}
+"""Status word of the reply to an event"""
+
+def format_reply(event: Event) -> bytes:
+    """Frame the event as a reply of the line protocol: a status line with the number
+    of lines of the text, followed by the text itself.
+
+    Args:
+        event (Event): the event returned by the handler
+
+    Returns:
+        bytes: the reply"""
+    match event.type:
+        case EventType.PRINT | EventType.END:
+            text = str(event.payload["print"])
+        case EventType.ERROR:
+            text = f"❌ Error occurred: {event.payload['message']}"
+        case _:
+            text = ""
+    lines = text.split("\n") if text else []
+    return "\n".join([f"{STATUS[event.type]} {len(lines)}", *lines, ""]).encode("utf-8")
+
+class CommandServer:
+    """TCP server that runs commands sent by many clients against one handler.
+
+    Every line a client sends is a command. The reply is a status line OK, ERR or BYE
+    with the number of lines that follow it. Commands run in the worker threads of the
+    event loop, so the loop keeps serving other clients; the handler lock lets reading
+    commands run together while changes run alone. 'exit' closes the connection of the
+    client, not the server."""
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.clients = 0
+        self.address = None
+
+    async def run_command(self, line: str) -> Event:
+        """Run one command in a worker thread"""
+        command = command_type_to_lowwer(line.split(" "))
+        return await asyncio.to_thread(self.handler, command)
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Read commands from a client until it says exit or disconnects"""
+        self.clients += 1
+        try:
+            while True:
+                try:
+                    data = await reader.readline()
+                except ValueError:
+                    writer.write(format_reply(Event(EventType.ERROR, {"message": "Command is too long."})))
+                    break
+                if not data:
+                    break
+                line = data.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                event = await self.run_command(line)
+                writer.write(format_reply(event))
+                await writer.drain()
+                if event.type == EventType.END:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def serve(self, host: str, port: int, started: asyncio.Event = None):
+        """Accept clients until the task is cancelled
+
+        Args:
+            host (str): address to listen on
+            port (int): port to listen on, 0 to pick a free one
+            started (asyncio.Event): set when the server is listening"""
+        server = await asyncio.start_server(self.serve_client, host, port)
+        self.address = server.sockets[0].getsockname()
+        print(f"Serving commands on {self.address[0]}:{self.address[1]} 🌐")
+        if started is not None:
+            started.set()
+        async with server:
+            await server.serve_forever()
+
+def server_processor(handler: Handler, host: str, port: int):
+    """Starts the processor that serves commands over TCP until it is interrupted."""
+    def start_processor():
+        try:
+            asyncio.run(CommandServer(handler).serve(host, port))
+        except KeyboardInterrupt:
+            print("Server stopped 🛑")
+    return start_processor
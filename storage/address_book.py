@@ -1,28 +1,59 @@
 import re
-import pickle
+import os
+import threading
 from pathlib import Path
-from typing import Tuple
-from datetime import datetime
+from typing import Iterable, Iterator, Tuple
+from heapq import merge
+from datetime import datetime, date
+from functools import lru_cache
 from collections import UserDict
+from storage.ngram_index import NgramIndex
+from storage.bk_tree import BKTree
+from storage.birthday_index import BirthdayIndex, congratulation_calendar, upcoming_slots
+from storage.journal import Journal
+from storage.autosave import Capture, SavedState
+from storage import compression
+from storage.shards import SHARDS_SUFFIX, Shards
+from storage.snapshot import RecordValues, Snapshot, SnapshotRecords, is_snapshot, write_snapshot
+from storage.transfer import ImportReport, Row, batches, paused_gc
+from storage.sorted_keys import SortedKeys
 
 class Field:
     """Base class for fields of the record"""
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
+    def __setstate__(self, state):
+        # fields pickled before they had slots keep the value in their __dict__
+        if isinstance(state, tuple):
+            state = state[1]
+        self.value = state['value']
+
+    @classmethod
+    def from_value(cls, value):
+        """Create the field from a value that was already validated"""
+        field = cls.__new__(cls)
+        Field.__init__(field, value)
+        return field
+
     def __str__(self):
         return str(self.value)
 
 class Name(Field):
     """Class for name field of the record"""
-    pass
+    __slots__ = ()
 
 class Address(Field):
     """Class for address field of the record"""
-    pass
+    __slots__ = ()
 
 class Email(Field):
     """Class for email field of the record"""
+    __slots__ = ()
+    PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+
     def __init__(self, value):
         if not self.validate(value):
             raise ValueError('Invalid email')
@@ -38,10 +69,13 @@ class Email(Field):
         
         Returns:
             bool: True if email is valid, False otherwise"""
-        return bool(re.match(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$", value))
+        return bool(Email.PATTERN.match(value))
 
 class Phone(Field):
     """Class for phone field of the record"""
+    __slots__ = ()
+    PATTERN = re.compile(r"^(\+38)?(0\d{9})$")
+
     def __init__(self, value):
         if not self.validate(value):
             raise ValueError('Invalid phone number')
@@ -57,10 +91,39 @@ class Phone(Field):
         
         Returns:
             bool: True if phone number is valid, False otherwise"""
-        return bool(re.match(r"^(\+38)?(0\d{9})$", value))
+        return bool(Phone.PATTERN.match(value))
+
+BIRTHDAY_FORMAT = "%d.%m.%Y"
+"""Format of the birthday accepted by the Birthday field"""
+
+BIRTHDAY_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+"""Pattern of a birthday in BIRTHDAY_FORMAT, for parsing many birthdays without strptime"""
+
+@lru_cache(maxsize=1 << 16)
+def parse_birthday(value: str) -> date:
+    """Parse a birthday in BIRTHDAY_FORMAT. Results are cached, as many contacts share a birthday
+    
+    Args:
+        value: str: birthday in format DD.MM.YYYY
+        
+    Returns:
+        date: the birthday
+        
+    Raises:
+        ValueError: if the birthday is not a valid date in the format"""
+    match = BIRTHDAY_PATTERN.fullmatch(value) if isinstance(value, str) else None
+    try:
+        if match is None:
+            raise ValueError()
+        day, month, year = map(int, match.groups())
+        return date(year, month, day)
+    except ValueError:
+        raise ValueError(f"invalid birthday: {value}. Use DD.MM.YYYY") from None
 
 class Birthday(Field):
     """Class for birthday field of the record"""
+    __slots__ = ()
+
     def __init__(self, value):
         if not self.validate(value):
             raise ValueError('Invalid date format. Use DD.MM.YYYY')
@@ -82,14 +145,180 @@ class Birthday(Field):
         except ValueError:
             return False
 
+def field_property(slot: str, field_type: type) -> property:
+    """Expose the plain value kept in a slot of the record as a field object, None if it is not set"""
+    def get_field(record):
+        value = getattr(record, slot)
+        return field_type.from_value(value) if value is not None else None
+
+    def set_field(record, field):
+        setattr(record, slot, field.value if field is not None else None)
+
+    return property(get_field, set_field, doc=f"{field_type.__name__} field of the record")
+
 class Record:
-    """Class for record, which contains name and phones of the contact"""
+    """Class for record, which contains name and phones of the contact.
+
+    The record keeps plain values in slots instead of field objects, which makes it
+    several times smaller: the phones are a tuple of strings and the birthday is a
+    date ordinal, 0 if it is not set. The name, phones, birthday, email and address
+    attributes return field objects made from these values."""
+    __slots__ = ('name_value', 'phone_values', 'birthday_ordinal', 'email_value', 'address_value', 'address_book')
+
     def __init__(self, name):
-        self.name: str = Name(name)
-        self.phones: list[Phone] = []
-        self.birthday: Birthday = None
-        self.email: Email = None
-        self.address: Address = None
+        self.name_value: str = name
+        self.phone_values: tuple[str, ...] = ()
+        self.birthday_ordinal = 0
+        self.email_value: str = None
+        self.address_value: str = None
+        self.address_book: 'AddressBook' = None
+
+    name = field_property('name_value', Name)
+    email = field_property('email_value', Email)
+    address = field_property('address_value', Address)
+
+    @property
+    def phones(self) -> list[Phone]:
+        """Phone fields of the record"""
+        return [Phone.from_value(phone) for phone in self.phone_values]
+
+    @phones.setter
+    def phones(self, phones: list[Phone]):
+        self.phone_values = tuple(phone.value for phone in phones)
+
+    @property
+    def birthday(self) -> Birthday:
+        """Birthday field of the record"""
+        return Birthday.from_value(date.fromordinal(self.birthday_ordinal)) if self.birthday_ordinal else None
+
+    @birthday.setter
+    def birthday(self, birthday: Birthday):
+        self.birthday_ordinal = birthday.value.toordinal() if birthday is not None else 0
+
+    def birthday_date(self) -> date:
+        """Get the birthday as a date, None if it is not set"""
+        return date.fromordinal(self.birthday_ordinal) if self.birthday_ordinal else None
+
+    def __getstate__(self):
+        return (self.name_value, self.phone_values, self.birthday_ordinal, self.email_value, self.address_value)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # records pickled before they had slots keep field objects in their __dict__
+            state = (state['name'].value,
+                     tuple(phone.value for phone in state['phones']),
+                     state['birthday'].value.toordinal() if state['birthday'] else 0,
+                     state['email'].value if state['email'] else None,
+                     state['address'].value if state['address'] else None)
+        self.name_value, self.phone_values, self.birthday_ordinal, self.email_value, self.address_value = state
+        self.address_book = None
+
+    def to_dict(self) -> dict:
+        """Convert the record to a dictionary of JSON serializable values"""
+        return {
+            'name': self.name_value,
+            'phones': list(self.phone_values),
+            'birthday': self.birthday_date().strftime(BIRTHDAY_FORMAT) if self.birthday_ordinal else None,
+            'email': self.email_value,
+            'address': self.address_value,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> 'Record':
+        """Create a record from a dictionary made by to_dict
+        
+        Args:
+            data: dict: values of the record fields
+            
+        Returns:
+            Record: record object"""
+        record = Record(data['name'])
+        for phone in data.get('phones') or []:
+            record.add_phone(phone)
+        if data.get('birthday'):
+            record.add_birthday(data['birthday'])
+        if data.get('email'):
+            record.add_email(data['email'])
+        if data.get('address'):
+            record.add_address(data['address'])
+        return record
+
+    @staticmethod
+    def from_row(row: dict) -> 'Record':
+        """Create a record from imported values, validating them with the precompiled patterns of the fields
+        
+        Args:
+            row: dict: values of the record fields in the format of to_dict
+            
+        Returns:
+            Record: record object
+            
+        Raises:
+            ValueError: if the row has no name or has an invalid value"""
+        if type(row) is not dict:
+            raise ValueError("unreadable line")
+        get = row.get
+        name = get('name')
+        if type(name) is not str or not name:
+            raise ValueError("missing name")
+        phones = get('phones') or []
+        if type(phones) is not list:
+            raise ValueError(f"phones must be a list: {phones}")
+        match_phone = Phone.PATTERN.match
+        for phone in phones:
+            if type(phone) is not str or not match_phone(phone):
+                raise ValueError(f"invalid phone number: {phone}")
+        email = get('email') or None
+        if email is not None and not (type(email) is str and Email.PATTERN.match(email)):
+            raise ValueError(f"invalid email: {email}")
+        address = get('address') or None
+        if address is not None and type(address) is not str:
+            raise ValueError(f"invalid address: {address}")
+        birthday = get('birthday') or None
+        if birthday is not None and type(birthday) is not str:
+            # checked before the cached parser, which can't hash lists or dicts
+            raise ValueError(f"invalid birthday: {birthday}. Use DD.MM.YYYY")
+        record = Record.__new__(Record)
+        record.name_value = name
+        record.phone_values = tuple(phones) if len(phones) < 2 else tuple(dict.fromkeys(phones))
+        record.birthday_ordinal = parse_birthday(birthday).toordinal() if birthday else 0
+        record.email_value = email
+        record.address_value = address
+        record.address_book = None
+        return record
+
+    def to_values(self) -> RecordValues:
+        """Convert the record to the plain values stored in a snapshot"""
+        return RecordValues(self.name_value, list(self.phone_values), self.email_value, self.address_value,
+                            self.birthday_ordinal)
+
+    @staticmethod
+    def from_values(values: RecordValues) -> 'Record':
+        """Create a record from the plain values stored in a snapshot, which were validated before saving
+        
+        Args:
+            values: RecordValues: values of the record fields
+            
+        Returns:
+            Record: record object"""
+        record = Record.__new__(Record)
+        record.__setstate__((values.name, tuple(values.phones), values.birthday, values.email, values.address))
+        return record
+
+    def before_change(self):
+        """Tell the address book that owns the record that a field is about to change"""
+        if self.address_book is not None:
+            self.address_book.record_changing(self)
+
+    def notify(self, field: str, old_value, new_value):
+        """Notify the address book that owns the record about a changed field
+        
+        Args:
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed"""
+        if self.address_book is not None:
+            self.address_book.record_changed(self, field, old_value, new_value)
 
     def add_phone(self, phone: str) -> bool:
         """Add phone to the record
@@ -99,9 +328,12 @@ class Record:
         
         Returns:
             bool: True if phone was added, False if phone already exists"""
-        if self.find_phone(phone):
+        if phone in self.phone_values:
             return False
-        self.phones.append(Phone(phone))
+        phone_value = Phone(phone).value
+        self.before_change()
+        self.phone_values += (phone_value,)
+        self.notify('phone', None, phone)
         return True
     
     def add_birthday(self, birthday: str) -> bool:
@@ -112,18 +344,14 @@ class Record:
             
         Returns:
             bool: True if birthday was added, False if birthday is invalid"""
-        try:
-            self.birthday = Birthday(birthday)
-        except ValueError:
-            return False
-        return True
+        return self.edit_birthday(birthday)
     
     def add_address(self, address: str):
         """Add address to the record
 
         Args:
             address: str: address"""
-        self.address = Address(address)
+        self.edit_address(address)
     
     def add_email(self, email: str) -> bool:
         """Add email to the record
@@ -133,11 +361,7 @@ class Record:
             
         Returns:
             bool: True if email was added, False if email is invalid"""
-        try:
-            self.email = Email(email)
-        except ValueError:
-            return False
-        return True
+        return self.edit_email(email)
     
     def delete_phone(self, phone_number: str) -> bool:
         """Delete phone from the record
@@ -147,11 +371,19 @@ class Record:
             
         Returns:
             bool: True if phone was deleted, False if phone not found"""
-        phone = self.find_phone(phone_number)
-        if phone:
-            self.phones.remove(phone)
+        if phone_number in self.phone_values:
+            self.before_change()
+            self.phone_values = tuple(phone for phone in self.phone_values if phone != phone_number)
+            self.notify('phone', phone_number, None)
             return True
         return False
+
+    def delete_phones(self):
+        """Delete all phones from the record"""
+        self.before_change()
+        phones, self.phone_values = self.phone_values, ()
+        for phone in phones:
+            self.notify('phone', phone, None)
     
     def edit_phone(self, phone_number: str, new_phone: str) -> bool:
         """Edit phone in the record
@@ -162,9 +394,10 @@ class Record:
         
         Returns:
             bool: True if phone was edited, False if phone not found"""
-        phone = self.find_phone(phone_number)
-        if phone:
-            phone.value = new_phone
+        if phone_number in self.phone_values:
+            self.before_change()
+            self.phone_values = tuple(new_phone if phone == phone_number else phone for phone in self.phone_values)
+            self.notify('phone', phone_number, new_phone)
             return True
         return False
 
@@ -176,10 +409,7 @@ class Record:
             
         Returns:
             Phone: phone object if phone was found, None if phone not found"""
-        for phone in self.phones:
-            if phone.value == phone_number:
-                return phone
-        return None
+        return Phone.from_value(phone_number) if phone_number in self.phone_values else None
     
     def edit_birthday(self, new_birthday: str) -> bool:
         """Edit birthday in the record
@@ -190,15 +420,21 @@ class Record:
         Returns:
             bool: True if birthday was edited, False if invalid format"""
         try:
-            self.birthday = Birthday(new_birthday)
+            birthday = Birthday(new_birthday)
         except ValueError:
             return False
+        old_birthday = self.birthday_date()
+        self.before_change()
+        self.birthday_ordinal = birthday.value.toordinal()
+        self.notify('birthday', old_birthday, birthday.value)
         return True
 
     def delete_birthday(self) -> bool:
         """Delete birthday from the record"""
-        if self.birthday:
-            self.birthday = None
+        if self.birthday_ordinal:
+            self.before_change()
+            old_birthday, self.birthday_ordinal = self.birthday_date(), 0
+            self.notify('birthday', old_birthday, None)
             return True
         return False
     
@@ -210,13 +446,18 @@ class Record:
         
         Returns:
             bool: True if address was edited"""
-        self.address = Address(new_address)
+        address = Address(new_address).value
+        self.before_change()
+        old_address, self.address_value = self.address_value, address
+        self.notify('address', old_address, new_address)
         return True
 
     def delete_address(self) -> bool:
         """Delete address from the record"""
-        if self.address:
-            self.address = None
+        if self.address_value is not None:
+            self.before_change()
+            old_address, self.address_value = self.address_value, None
+            self.notify('address', old_address, None)
             return True
         return False
 
@@ -229,29 +470,198 @@ class Record:
         Returns:
             bool: True if email was edited, False if invalid format"""
         try:
-            self.email = Email(new_email)
+            email = Email(new_email)
         except ValueError:
             return False
+        self.before_change()
+        old_email, self.email_value = self.email_value, email.value
+        self.notify('email', old_email, new_email)
         return True
 
     def delete_email(self) -> bool:
         """Delete email from the record"""
-        if self.email:
-            self.email = None
+        if self.email_value is not None:
+            self.before_change()
+            old_email, self.email_value = self.email_value, None
+            self.notify('email', old_email, None)
             return True
         return False
     
     def __str__(self):
-        return f"Contact name: 📄 {self.name.value} " + \
-            (f"birthday:🎂 {self.birthday.value}, " if self.birthday else "") + \
-            (f"phones: 📱 {'; '.join(p.value for p in self.phones)} " if self.phones else "") + \
-            (f"email: 📧 {self.email.value} " if self.email else "") + \
-            (f"address: 🏡 {self.address.value} " if self.address else "")
+        return f"Contact name: 📄 {self.name_value} " + \
+            (f"birthday:🎂 {self.birthday_date()}, " if self.birthday_ordinal else "") + \
+            (f"phones: 📱 {'; '.join(self.phone_values)} " if self.phone_values else "") + \
+            (f"email: 📧 {self.email_value} " if self.email_value is not None else "") + \
+            (f"address: 🏡 {self.address_value} " if self.address_value is not None else "")
+
+SNAPSHOT_SUFFIX = ".snapshot"
+"""Suffix of the files that are saved in the snapshot format instead of pickle"""
+
+NAME_ANCHOR = "\0"
+"""Character that marks the start of a name in the name index"""
+
+NAME_SCAN_RATIO = 4
+"""A search for fewer characters than the n-grams of the name index checks every name
+instead, when its postings hold more than this fraction of the contacts"""
+
+class RecordsCapture(Capture):
+    """Records of an address book at one position of its journal.
+    An address book backed by a snapshot keeps the rows that were not materialized in the snapshot"""
+    def __init__(self, address_book: 'AddressBook'):
+        super().__init__(address_book.journal_seq, address_book.changes)
+        self.snapshot: Snapshot = None
+        self.hidden: frozenset[int] = frozenset()
+        self.dirty_shards: set[int] = None
+        if address_book.file_path.suffix == SHARDS_SUFFIX:
+            self.dirty_shards = address_book.shards_for(address_book.file_path).take_dirty()
+        if isinstance(address_book.data, SnapshotRecords):
+            with address_book.data.lock:
+                self.records = dict(address_book.data.records)
+                self.hidden = frozenset(address_book.data.hidden)
+            self.snapshot = address_book.data.snapshot
+        else:
+            self.records = dict(address_book.data)
 
 class AddressBook(UserDict):
     """Class for address book, which contains records of contacts"""
     def __init__(self):
         super().__init__()
+        self.phone_index: dict[str, str] = {}
+        self.email_index: dict[str, str] = {}
+        self.name_index = NgramIndex(endings=True)
+        self.birthday_index = BirthdayIndex()
+        self.file_path: Path = None
+        self.journal: Journal = None
+        self.journal_seq = 0
+        self.names_indexed = True
+        self.pending_names: list[str] = []
+        self.sorted_names = SortedKeys()
+        self.index_lock = threading.Lock()
+        self.name_tree: BKTree = None
+        self.changes = 0
+        self.saved_changes = 0
+        self.saving: RecordsCapture = None
+        self.background_saves = False
+        self.shards: Shards = None
+        self.codec: str = None
+
+    def __getstate__(self):
+        return {'data': dict(self.data.items()), 'journal_seq': self.journal_seq}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.data = state['data']
+        self.journal_seq = state.get('journal_seq', 0)
+        for record in self.data.values():
+            self.attach(record)
+
+    def attach(self, record: Record):
+        """Make the address book the owner of the record and index its fields
+        
+        Args:
+            record: Record: record object"""
+        record.address_book = self
+        self.sorted_names.add(record.name_value)
+        self.name_index.add(record.name_value, self.name_grams(record.name_value))
+        if self.name_tree is not None:
+            self.name_tree.add(record.name_value.lower(), record.name_value)
+        for phone in record.phone_values:
+            self.index_field(record, 'phone', None, phone)
+        if record.email_value is not None:
+            self.index_field(record, 'email', None, record.email_value)
+        if record.birthday_ordinal:
+            self.index_field(record, 'birthday', None, record.birthday_date())
+
+    def detach(self, record: Record):
+        """Remove the fields of the record from the indexes and release it
+        
+        Args:
+            record: Record: record object"""
+        for phone in record.phone_values:
+            self.index_field(record, 'phone', phone, None)
+        if record.email_value is not None:
+            self.index_field(record, 'email', record.email_value, None)
+        if record.birthday_ordinal:
+            self.index_field(record, 'birthday', record.birthday_date(), None)
+        self.name_index.remove(record.name_value, self.name_grams(record.name_value))
+        self.sorted_names.remove(record.name_value)
+        if self.name_tree is not None:
+            self.name_tree.remove(record.name_value.lower(), record.name_value)
+        record.address_book = None
+
+    def record_changing(self, record: Record):
+        """Keep the fields of the record for the save in progress, before the first change after its capture
+        
+        Args:
+            record: Record: the record that is about to change"""
+        saving = self.saving
+        if saving is not None and record not in saving.preserved:
+            saving.preserved[record] = record.__getstate__()
+
+    def record_changed(self, record: Record, field: str, old_value, new_value):
+        """Update the indexes and the journal with a changed field of the record
+        
+        Args:
+            record: Record: the changed record
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed"""
+        self.index_field(record, field, old_value, new_value)
+        self.touch(record.name_value)
+        if field == 'birthday':
+            old_value = old_value.strftime(BIRTHDAY_FORMAT) if old_value else None
+            new_value = new_value.strftime(BIRTHDAY_FORMAT) if new_value else None
+        self.log(field, record.name_value, old_value, new_value)
+
+    def index_field(self, record: Record, field: str, old_value, new_value):
+        """Keep the indexes consistent with a changed field of the record
+        
+        Args:
+            record: Record: the changed record
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed"""
+        match field:
+            case 'phone':
+                self.reindex(self.phone_index, record.name_value, old_value, new_value)
+            case 'email':
+                self.reindex(self.email_index, record.name_value, old_value, new_value)
+            case 'birthday':
+                if old_value is not None:
+                    self.birthday_index.remove(record.name_value, old_value)
+                if new_value is not None:
+                    self.birthday_index.add(record.name_value, new_value)
+
+    @staticmethod
+    def reindex(index: dict[str, str], name: str, old_value, new_value):
+        """Move the name of the contact from the old key to the new key of the index"""
+        if old_value is not None and index.get(old_value) == name:
+            del index[old_value]
+        if new_value is not None:
+            index[new_value] = name
+
+    def index_names(self):
+        """Add the names that are not indexed yet to the name index. Names of the contacts that are
+        still only in the snapshot are indexed on the first name search instead of on load, to keep
+        loading independent of the number of contacts. Names of imported contacts are indexed in one
+        pass too, skipping the contacts that were deleted since. Searches that run together
+        index the names once, under a lock."""
+        if self.names_indexed and not self.pending_names:
+            return
+        with self.index_lock:
+            if not self.names_indexed:
+                for name in self.data.snapshot_names():
+                    self.name_index.add(name, self.name_grams(name))
+                self.names_indexed = True
+            if self.pending_names:
+                for name in self.pending_names:
+                    if name in self.data:
+                        self.name_index.add(name, self.name_grams(name))
+                self.pending_names = []
+
+    def name_grams(self, name: str) -> set[str]:
+        """Get the n-grams of the name, anchored at its start so that substrings shorter than n are indexed too"""
+        return self.name_index.grams(NAME_ANCHOR * (self.name_index.n - 1) + name)
 
     def add_record(self, record: Record) -> bool:
         """Add record to the address book
@@ -261,10 +671,13 @@ class AddressBook(UserDict):
         
         Returns:
             bool: True if record was added, False if record already exists"""
-        if self.has_record(record.name.value):
+        if self.has_record(record.name_value):
             return False
 
-        self.data[record.name.value] = record
+        self.data[record.name_value] = record
+        self.attach(record)
+        self.touch(record.name_value)
+        self.log('add', record.to_dict())
         return True
     
     def delete(self, name: str) -> bool:
@@ -276,10 +689,307 @@ class AddressBook(UserDict):
         Returns:
             bool: True if record was deleted, False if record not found"""
         if self.has_record(name):
-            del self.data[name]
+            self.detach(self.data.pop(name))
+            self.touch(name)
+            self.log('delete', name)
             return True
         return False
     
+    def import_records(self, rows: Iterable[Row]) -> ImportReport:
+        """Import records in batches. Rows are validated one by one, the uniqueness of
+        names, phones and emails is checked for a whole batch, and the accepted records
+        are indexed and journaled together.
+        
+        Args:
+            rows: Iterable[Row]: line numbers and values of the records in the format of to_dict
+            
+        Returns:
+            ImportReport: numbers of imported and skipped rows"""
+        report = ImportReport()
+        from_row = Record.from_row
+        with paused_gc():
+            for batch in batches(rows):
+                records = []
+                valid_rows = {}
+                for number, row in batch:
+                    try:
+                        records.append((number, from_row(row)))
+                        valid_rows[number] = row
+                    except ValueError as e:
+                        report.reject(number, str(e))
+                accepted = self.accept_records(records, report)
+                if accepted:
+                    # the validated rows are journaled as they are, replay builds the same records from them
+                    self.add_records([record for _, record in accepted],
+                                     [valid_rows[number] for number, _ in accepted])
+                report.imported += len(accepted)
+        return report
+
+    def accept_records(self, records: list[tuple[int, Record]], report: ImportReport) -> list[tuple[int, Record]]:
+        """Check that the names, phones and emails of a batch of records are unique
+        in the address book and in the batch
+        
+        Args:
+            records: list[tuple[int, Record]]: line numbers and validated records
+            report: ImportReport: report to count the rejected records in
+            
+        Returns:
+            list[tuple[int, Record]]: line numbers and the unique records"""
+        names = [record.name_value for _, record in records]
+        phones = [phone for _, record in records for phone in record.phone_values]
+        emails = [record.email_value for _, record in records if record.email_value is not None]
+        unique_names, unique_phones, unique_emails = set(names), set(phones), set(emails)
+        taken_names, taken_phones, taken_emails = self.taken_values(unique_names, unique_phones, unique_emails)
+        if not (taken_names or taken_phones or taken_emails) and len(unique_names) == len(names) \
+                and len(unique_phones) == len(phones) and len(unique_emails) == len(emails):
+            # nothing is taken and nothing repeats, so every record is accepted
+            return list(records)
+        accepted = []
+        for number, record in records:
+            name = record.name_value
+            email = record.email_value
+            duplicate_phone = None
+            for phone in record.phone_values:
+                if phone in taken_phones:
+                    duplicate_phone = phone
+                    break
+            if name in taken_names:
+                report.reject(number, f"contact already exists: {name}")
+            elif duplicate_phone is not None:
+                report.reject(number, f"phone number already exists: {duplicate_phone}")
+            elif email is not None and email in taken_emails:
+                report.reject(number, f"email already exists: {email}")
+            else:
+                taken_names.add(name)
+                taken_phones.update(record.phone_values)
+                if email is not None:
+                    taken_emails.add(email)
+                accepted.append((number, record))
+        return accepted
+
+    def add_records(self, records: list[Record], rows: list[dict] = None):
+        """Add a batch of new records with unique fields, updating the indexes and the journal once.
+        Names are indexed on the next name search
+        
+        Args:
+            records: list[Record]: records accepted by accept_records
+            rows: list[dict]: the imported rows the records were made from, journaled instead of
+                the values of the records, None to journal the values"""
+        data = self.data
+        names = [record.name_value for record in records]
+        name_tree = self.name_tree
+        for name, record in zip(names, records):
+            data[name] = record
+            record.address_book = self
+            if name_tree is not None:
+                name_tree.add(name.lower(), name)
+        self.birthday_index.update((record.name_value, record.birthday_ordinal)
+                                   for record in records if record.birthday_ordinal)
+        if self.shards is not None:
+            for name in names:
+                self.shards.touch(name)
+        self.sorted_names.update(names)
+        self.pending_names.extend(names)
+        self.phone_index.update((phone, record.name_value) for record in records for phone in record.phone_values)
+        self.email_index.update((record.email_value, record.name_value)
+                                for record in records if record.email_value is not None)
+        self.log('import', rows if rows is not None else [record.to_values() for record in records])
+
+    def iter_records(self, after: str = None) -> Iterator[Record]:
+        """Iterate the records in name order, starting after the given name.
+        Contacts that are still only in the snapshot are decoded into records that the
+        address book does not own, so listing them does not keep them in memory.
+        
+        Args:
+            after: str: name of the last record of the previous page, None to start from the first record
+            
+        Returns:
+            Iterator[Record]: records with names greater than the cursor"""
+        records = (self.data[name] for name in self.sorted_names.after(after))
+        if isinstance(self.data, SnapshotRecords):
+            snapshot_records = (Record.from_values(values) for values in self.data.values_after(after))
+            records = merge(records, snapshot_records, key=lambda record: record.name_value)
+        return records
+
+    def export_records(self) -> Iterator[dict]:
+        """Get the values of all records one by one in the format of to_dict.
+        Contacts that are only in the snapshot are exported without materializing them"""
+        if isinstance(self.data, SnapshotRecords):
+            return (Record.from_values(values).to_dict() for values in self.snapshot_values())
+        return (record.to_dict() for record in self.data.values())
+
+    def touch(self, name: str):
+        """Mark the shard of a changed record to be rewritten, if the address book is saved in shards"""
+        if self.shards is not None:
+            self.shards.touch(name)
+
+    def shards_for(self, file_path: Path) -> Shards:
+        """Get the shards of the file. Shards of a file the address book was not loaded from are all written"""
+        if self.shards is None or self.shards.file_path != file_path:
+            self.shards = Shards(file_path)
+            self.shards.touch_all()
+        return self.shards
+
+    def log(self, operation: str, *args):
+        """Write the operation to the journal, if the address book has one
+        
+        Args:
+            operation: str: name of the operation
+            args: arguments of the operation"""
+        self.changes += 1
+        if self.journal is None:
+            return
+        self.journal_seq = self.journal.append(operation, *args)
+        if self.journal.needs_compaction() and not self.background_saves:
+            self.compact()
+
+    def apply(self, operation: str, *args):
+        """Apply an operation read from the journal
+        
+        Args:
+            operation: str: name of the operation
+            args: arguments of the operation"""
+        if operation == 'add':
+            self.add_record(Record.from_dict(args[0]))
+            return
+        if operation == 'import':
+            # imports journal the imported rows, earlier versions the values of the records
+            records = [(number, Record.from_row(values) if isinstance(values, dict)
+                        else Record.from_values(RecordValues(*values))) for number, values in enumerate(args[0], 1)]
+            self.add_records([record for _, record in self.accept_records(records, ImportReport())])
+            return
+        if operation == 'delete':
+            self.delete(args[0])
+            return
+        name, old_value, new_value = args
+        record = self.find(name)
+        match operation:
+            case 'phone' if old_value is None:
+                record.add_phone(new_value)
+            case 'phone' if new_value is None:
+                record.delete_phone(old_value)
+            case 'phone':
+                record.edit_phone(old_value, new_value)
+            case 'email' if new_value is None:
+                record.delete_email()
+            case 'email':
+                record.edit_email(new_value)
+            case 'birthday' if new_value is None:
+                record.delete_birthday()
+            case 'birthday':
+                record.edit_birthday(new_value)
+            case 'address' if new_value is None:
+                record.delete_address()
+            case 'address':
+                record.edit_address(new_value)
+
+    def open_journal(self, journal: Journal) -> str:
+        """Replay the journal on top of the loaded data and write further changes into it
+        
+        Args:
+            journal: Journal: journal of the address book
+            
+        Returns:
+            str: error message if any"""
+        try:
+            for operation, *args in journal.replay(self.journal_seq):
+                self.apply(operation, *args)
+            self.journal_seq = journal.seq
+            journal.open(self.journal_seq)
+            self.journal = journal
+            return None
+        except Exception as e:
+            return str(e)
+
+    def compact(self) -> str:
+        """Save the data to the file it was loaded from and clear the journal
+        
+        Returns:
+            str: error message if any"""
+        changes = self.changes
+        err = self.save_data(self.file_path)
+        if err is None:
+            self.saved_changes = changes
+            if self.journal is not None:
+                self.journal.clear()
+        return err
+
+    def is_dirty(self) -> bool:
+        """Check if the address book changed since it was last saved"""
+        return self.changes != self.saved_changes
+
+    def capture(self) -> 'RecordsCapture':
+        """Capture the records for a background save. Must be called while no command changes the address book
+        
+        Returns:
+            RecordsCapture: the records at the current position of the journal"""
+        self.saving = RecordsCapture(self)
+        return self.saving
+
+    def write_capture(self, capture: 'RecordsCapture') -> str:
+        """Save the captured records to the file of the address book, while commands keep changing it
+        
+        Args:
+            capture: RecordsCapture: the captured records
+            
+        Returns:
+            str: error message if any"""
+        try:
+            if capture.dirty_shards is not None:
+                payloads = self.shards.split(capture.dirty_shards, capture.records.items())
+                for payload in payloads.values():
+                    for name, record in payload.items():
+                        payload[name] = SavedState(Record, capture.state(record, record.__getstate__()))
+                self.shards.write(payloads, {'journal_seq': capture.journal_seq}, self.codec)
+                return None
+            states = {name: capture.state(record, record.__getstate__()) for name, record in capture.records.items()}
+            if self.file_path.suffix == SNAPSHOT_SUFFIX:
+                values = (RecordValues(name, list(phones), email, address, birthday)
+                          for name, phones, birthday, email, address in (states[name] for name in sorted(states)))
+                if capture.snapshot is not None:
+                    rows = (capture.snapshot.values(row) for row in range(capture.snapshot.count) if row not in capture.hidden)
+                    values = merge(rows, values, key=lambda value: value.name)
+                write_snapshot(self.file_path, values, capture.journal_seq)
+                return None
+            data = {name: SavedState(Record, state) for name, state in states.items()}
+            temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+            with open(temp_path, 'wb') as file:
+                compression.dump(SavedState(AddressBook, {'data': data, 'journal_seq': capture.journal_seq}), file, self.codec)
+            os.replace(temp_path, self.file_path)
+            return None
+        except Exception as e:
+            return str(e)
+
+    def finish_capture(self, capture: 'RecordsCapture', err: str):
+        """Stop preserving records for the capture and drop the saved entries of the journal.
+        Must be called while no command changes the address book
+        
+        Args:
+            capture: RecordsCapture: the written capture
+            err: str: error of the write, None if the capture was saved"""
+        self.saving = None
+        if err is not None and capture.dirty_shards is not None:
+            self.shards.restore_dirty(capture.dirty_shards)
+        if err is None:
+            self.saved_changes = capture.changes
+            if self.journal is not None:
+                self.journal.truncate(capture.journal_seq)
+            if capture.dirty_shards is None and self.file_path.suffix == SNAPSHOT_SUFFIX \
+                    and isinstance(self.data, SnapshotRecords):
+                self.data.swap(Snapshot(self.file_path), self.data.visible_names())
+
+    def close(self):
+        """Close the journal of the address book and the snapshot its records are backed by"""
+        if self.journal is not None:
+            self.journal.close()
+        if isinstance(self.data, SnapshotRecords):
+            self.data.close()
+
+    def reads_change_indexes(self) -> bool:
+        """Check if reading a contact can change the indexes. Contacts that are still only
+        in the snapshot are indexed when they are first read, so readers must not run together then"""
+        return isinstance(self.data, SnapshotRecords)
+
     def find(self, name: str) -> Record:
         """Find record in the address book
         
@@ -298,8 +1008,93 @@ class AddressBook(UserDict):
         
         Returns:
             bool: True if record exists, False if record not found"""
-        return self.data.get(name) is not None
+        return name in self.data
+
+    def phone_owner(self, phone: str) -> str:
+        """Find the name of the contact that has the phone, None if no contact has it"""
+        name = self.phone_index.get(phone)
+        if name is None and isinstance(self.data, SnapshotRecords):
+            name = self.data.find_by_phone(phone)
+        return name
+
+    def email_owner(self, email: str) -> str:
+        """Find the name of the contact that has the email, None if no contact has it"""
+        name = self.email_index.get(email)
+        if name is None and isinstance(self.data, SnapshotRecords):
+            name = self.data.find_by_email(email)
+        return name
+
+    def find_by_phone(self, phone: str) -> Record:
+        """Find record by phone number
+        
+        Args:
+            phone: str: phone number
+            
+        Returns:
+            Record: record object if phone was found, None if phone not found"""
+        name = self.phone_owner(phone)
+        return self.data.get(name) if name is not None else None
+
+    def find_by_email(self, email: str) -> Record:
+        """Find record by email
+        
+        Args:
+            email: str: email
+            
+        Returns:
+            Record: record object if email was found, None if email not found"""
+        name = self.email_owner(email)
+        return self.data.get(name) if name is not None else None
     
+    def find_names(self, substring: str) -> list[str]:
+        """Find names of the contacts that contain the substring
+        
+        Args:
+            substring: str: part of the name
+            
+        Returns:
+            list[str]: sorted names of the matching contacts"""
+        self.index_names()
+        names = self.name_index.candidates(substring, len(self.data) // NAME_SCAN_RATIO)
+        if names is None:
+            names = self.data.keys()
+        return sorted(name for name in names if substring in name)
+
+    def find_similar_names(self, name: str, max_distance: int) -> list[tuple[int, str]]:
+        """Find names of the contacts within an edit distance of the name, ignoring the case.
+        The BK-tree of the names is built on the first search and kept up to date from then on
+        
+        Args:
+            name: str: the name with possible typos
+            max_distance: int: the largest number of changed characters
+            
+        Returns:
+            list[tuple[int, str]]: edit distances and names of the matching contacts, nearest first"""
+        if self.name_tree is None:
+            with self.index_lock:
+                if self.name_tree is None:
+                    name_tree = BKTree()
+                    for contact in self.data.keys():
+                        name_tree.add(contact.lower(), contact)
+                    self.name_tree = name_tree
+        return self.name_tree.search(name.lower(), max_distance)
+
+    def taken_values(self, names: set[str], phones: set[str], emails: set[str]) -> tuple[set[str], set[str], set[str]]:
+        """Find which of the names, phones and emails already belong to contacts, to check a whole batch at once
+        
+        Args:
+            names: set[str]: names to check
+            phones: set[str]: phone numbers to check
+            emails: set[str]: emails to check
+            
+        Returns:
+            tuple[set[str], set[str], set[str]]: the names, phones and emails that are taken"""
+        if isinstance(self.data, SnapshotRecords):
+            return ({name for name in names if name in self.data},
+                    {phone for phone in phones if self.phone_owner(phone) is not None},
+                    {email for email in emails if self.email_owner(email) is not None})
+        return self.data.keys() & names, self.phone_index.keys() & phones, self.email_index.keys() & emails
+
     def is_email_unique(self, email: str) -> bool: 
         """Check if email is unique in the address book
         
@@ -308,10 +1103,7 @@ class AddressBook(UserDict):
             
         Returns:
             bool: True if email is unique, False if email already exists in the address book"""
-        for record in self.data.values(): 
-            if record.email and record.email.value == email: 
-                return False 
-        return True 
+        return self.email_owner(email) is None
     
     def is_phone_unique(self, phone: str) -> bool:
         """Check if phone is unique in the address book
@@ -321,10 +1113,7 @@ class AddressBook(UserDict):
             
         Returns:
             bool: True if phone is unique, False if phone already exists in the address book"""
-        for record in self.data.values():
-            if record.find_phone(phone):
-                return False
-        return True
+        return self.phone_owner(phone) is None
     
     @staticmethod
     def get_next_birthday(today, birth_date):
@@ -342,24 +1131,41 @@ class AddressBook(UserDict):
     @staticmethod
     def get_next_weekday(date):
         """If birthday is on weekend, move it to the nearest weekday of next week."""
-        if date.weekday() == 5: # Saturday
-            date = date.replace(day=date.day + 2)
-        elif date.weekday() == 6: # Sunday
-            date = date.replace(day=date.day + 1)
-        return date
-
-    def get_upcoming_birthdays(self, birthday_days:int=None):
-        """Get upcoming birthdays for the next week from the address book"""
+        return congratulation_calendar(date.year)[date.timetuple().tm_yday - 1]
+
+    def get_upcoming_birthdays(self, birthday_days:int=7):
+        """Get upcoming birthdays for the given number of days from the address book, sorted by date"""
         today = datetime.today().date()
-        upcoming_birthdays = []
-        for record in self.data.values():
-            if record.birthday is None:
-                continue
-            next_birthday = self.get_next_birthday(today, record.birthday.value)
-            if (next_birthday - today).days <= birthday_days:
-                upcoming_birthdays.append({'name': record.name, 'congratulation_date': self.get_next_weekday(next_birthday).strftime("%Y.%m.%d")})
-        return upcoming_birthdays
+        if not isinstance(self.data, SnapshotRecords):
+            upcoming = self.birthday_index.upcoming(today, birthday_days)
+        else:
+            upcoming = [(congratulation_date, name)
+                        for congratulation_date, slots in upcoming_slots(today, birthday_days)
+                        for slot in slots
+                        for name in sorted(self.birthday_index.names(slot) + self.data.birthday_names(slot))]
+        return [{'name': Name(name), 'congratulation_date': congratulation_date.strftime("%Y.%m.%d")}
+                for congratulation_date, name in upcoming]
     
+    def load_record(self, values: RecordValues) -> Record:
+        """Materialize a record of the snapshot and index its fields
+        
+        Args:
+            values: RecordValues: values of the record fields
+            
+        Returns:
+            Record: record object owned by the address book"""
+        record = Record.from_values(values)
+        self.attach(record)
+        return record
+
+    def snapshot_values(self):
+        """Get the values of all records sorted by name, without materializing the records of the snapshot"""
+        records = self.data.records if isinstance(self.data, SnapshotRecords) else self.data
+        values = (records[name].to_values() for name in sorted(records))
+        if isinstance(self.data, SnapshotRecords):
+            values = merge(self.data.snapshot_values(), values, key=lambda value: value.name)
+        return values
+
     @staticmethod
     def load_data(file_path: Path) -> Tuple['AddressBook', str]:
         """Load data from file
@@ -372,12 +1178,28 @@ class AddressBook(UserDict):
         try:
             if not file_path.parent.exists():
                 return None, f"Can't find the directory: {file_path.parent}"
-            if not file_path.exists():
-                return AddressBook(), None
-            if file_path.stat().st_size == 0:
-                return AddressBook(), None
-            with open(file_path, 'rb') as file:
-                return pickle.load(file), None
+            address_book = AddressBook()
+            if file_path.suffix == SHARDS_SUFFIX:
+                shards, state, payloads = Shards.load(file_path)
+                if state is not None:
+                    records = {name: record for payload in payloads for name, record in payload.items()}
+                    address_book.__setstate__({'data': {name: records[name] for name in sorted(records)},
+                                               'journal_seq': state['journal_seq']})
+                address_book.shards = shards
+            elif file_path.exists() and file_path.stat().st_size > 0 and is_snapshot(file_path):
+                snapshot = Snapshot(file_path)
+                try:
+                    address_book.data = SnapshotRecords(snapshot, address_book.load_record)
+                except Exception:
+                    snapshot.close()
+                    raise
+                address_book.journal_seq = snapshot.journal_seq
+                address_book.names_indexed = False
+            elif file_path.exists() and file_path.stat().st_size > 0:
+                with open(file_path, 'rb') as file:
+                    address_book = compression.load(file)
+            address_book.file_path = file_path
+            return address_book, None
         except Exception as e:
             return None, str(e)
         
@@ -390,10 +1212,53 @@ class AddressBook(UserDict):
         Returns:
             str: error message if any"""
         try:
-            if not file_path.exists():
-                file_path.touch()
-            with open(file_path, 'wb') as file:
-                pickle.dump(self, file)
+            if file_path.suffix == SNAPSHOT_SUFFIX:
+                self.save_snapshot(file_path)
+                return None
+            if file_path.suffix == SHARDS_SUFFIX:
+                self.save_shards(file_path)
+                return None
+            temp_path = file_path.with_name(file_path.name + '.tmp')
+            with open(temp_path, 'wb') as file:
+                compression.dump(self, file, self.codec)
+            os.replace(temp_path, file_path)
             return None
         except Exception as e:
-            return str(e)
\ No newline at end of file
+            return str(e)
+
+    def save_snapshot(self, file_path: Path):
+        """Write a snapshot of the records. When it replaces the snapshot the records are backed by,
+        the old one is closed before the file is replaced and the records move onto the new one
+        
+        Args:
+            file_path: Path: path of the snapshot file"""
+        records = self.data if isinstance(self.data, SnapshotRecords) and file_path == self.file_path else None
+        if records is None:
+            write_snapshot(file_path, self.snapshot_values(), self.journal_seq)
+            return
+        visible = None
+
+        def release():
+            nonlocal visible
+            visible = records.visible_names()
+            records.snapshot.close()
+
+        try:
+            write_snapshot(file_path, self.snapshot_values(), self.journal_seq, release)
+        finally:
+            if visible is not None:
+                # the old file again if it could not be replaced
+                records.swap(Snapshot(file_path), visible)
+
+    def save_shards(self, file_path: Path):
+        """Rewrite the shards of the records that changed since the last save, and the manifest
+        
+        Args:
+            file_path: Path: path of the manifest file"""
+        shards = self.shards_for(file_path)
+        dirty = shards.take_dirty()
+        try:
+            shards.write(shards.split(dirty, self.data.items()), {'journal_seq': self.journal_seq}, self.codec)
+        except Exception:
+            shards.restore_dirty(dirty)
+            raise
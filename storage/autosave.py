@@ -0,0 +1,95 @@
+import copyreg
+import threading
+from typing import Protocol
+from storage.rw_lock import ReadWriteLock
+
+AUTOSAVE_INTERVAL = 30.0
+"""Default number of seconds between background saves"""
+
+class Capture:
+    """State of a storage at one position of its journal, kept consistent while the storage changes.
+
+    Taking a capture only copies the top-level containers of the storage. Objects that
+    change afterwards are preserved by the storage the first time they change, so the
+    capture can be written while the storage keeps being used (copy on write)."""
+    def __init__(self, journal_seq: int, changes: int):
+        self.journal_seq = journal_seq
+        self.changes = changes
+        self.preserved: dict = {}
+
+    def state(self, key, live_state):
+        """Get the state an object had when the capture was taken.
+        The live state must be read before calling, so a change made in between is not missed."""
+        return self.preserved.get(key, live_state)
+
+class SavedState:
+    """Pickles as an object of the class with the given state, without making the object"""
+    __slots__ = ('cls', 'state')
+
+    def __init__(self, cls: type, state):
+        self.cls = cls
+        self.state = state
+
+    def __reduce__(self):
+        # the reconstructor that pickle itself uses for objects of plain classes
+        return copyreg._reconstructor, (self.cls, object, None), self.state
+
+class Saveable(Protocol):
+    """Storage that can be saved in the background"""
+    background_saves: bool
+    def is_dirty(self) -> bool: ...
+    def capture(self) -> Capture: ...
+    def write_capture(self, capture: Capture) -> str: ...
+    def finish_capture(self, capture: Capture, err: str): ...
+
+class Autosaver:
+    """Thread that saves changed storages periodically.
+
+    A capture of a storage is taken while the lock is held for reading, written to
+    the disk without the lock, and finished while the lock is held for writing.
+    Commands only wait for the capture and the finish, never for the writing.
+    Storages without changes since their last save are skipped."""
+    def __init__(self, storages: list[Saveable], lock: ReadWriteLock, interval: float = AUTOSAVE_INTERVAL):
+        self.storages = storages
+        self.lock = lock
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+
+    def start(self):
+        """Start saving in the background. The storages no longer compact their journals themselves"""
+        for storage in self.storages:
+            storage.background_saves = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the thread, after the save in progress if any"""
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        for storage in self.storages:
+            storage.background_saves = False
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.save_all()
+
+    def save_all(self):
+        """Save the storages that changed since their last save"""
+        for storage in self.storages:
+            if storage.is_dirty():
+                err = self.save(storage)
+                if err:
+                    print(f"❌ Autosave failed: {err}")
+
+    def save(self, storage: Saveable) -> str:
+        """Save a storage from a capture
+
+        Returns:
+            str: error message if any"""
+        with self.lock.read():
+            capture = storage.capture()
+        err = storage.write_capture(capture)
+        with self.lock.write():
+            storage.finish_capture(capture, err)
+        return err
@@ -0,0 +1,120 @@
+import calendar
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterable
+
+DAYS_IN_YEAR = 366
+"""Number of slots of the index, one per day of a leap year"""
+
+FIRST_DAY_OF_MONTH = (0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
+"""Slot of the first day of every month in a leap year"""
+
+LEAP_DAY_SLOT = FIRST_DAY_OF_MONTH[1] + 28
+"""Slot of February 29"""
+
+def birthday_slot(birthday: date) -> int:
+    """Get the slot of the index for the month and day of the birthday"""
+    return FIRST_DAY_OF_MONTH[birthday.month - 1] + birthday.day - 1
+
+@lru_cache(maxsize=4)
+def congratulation_calendar(year: int) -> tuple[date, ...]:
+    """Get congratulation dates for every day of the year.
+    Birthdays on weekend are congratulated on the next Monday.
+
+    Args:
+        year (int): the year of the calendar
+
+    Returns:
+        tuple[date, ...]: congratulation dates indexed by the day of the year starting from 0"""
+    first_day = date(year, 1, 1)
+    days = 366 if calendar.isleap(year) else 365
+    result = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        weekday = day.weekday()
+        result.append(day + timedelta(days=7 - weekday) if weekday >= 5 else day)
+    return tuple(result)
+
+def upcoming_slots(today: date, days: int) -> list[tuple[date, list[int]]]:
+    """Get the slots of the birthdays from today to today plus the given number of days.
+    In years that are not leap, birthdays on February 29 are celebrated on March 1.
+    Every slot is returned once, even if the range is longer than a year.
+
+    Args:
+        today (date): the first day of the range
+        days (int): number of days after today to include
+
+    Returns:
+        list[tuple[date, list[int]]]: congratulation date and slots of every day of the range, in order"""
+    result = []
+    visited = set()
+    day = today
+    for _ in range(min(days, DAYS_IN_YEAR - 1) + 1):
+        slots = [birthday_slot(day)]
+        if day.month == 3 and day.day == 1 and not calendar.isleap(day.year):
+            slots.insert(0, LEAP_DAY_SLOT)
+        slots = [slot for slot in slots if slot not in visited]
+        visited.update(slots)
+        if slots:
+            result.append((congratulation_calendar(day.year)[day.timetuple().tm_yday - 1], slots))
+        day += timedelta(days=1)
+    return result
+
+class BirthdayIndex:
+    """Index of names by the month and day of their birthday.
+
+    The index has a slot for every day of a leap year, so a range of upcoming
+    days is answered by visiting only the slots of these days."""
+    def __init__(self):
+        self.slots: list[set[str] | None] = [None] * DAYS_IN_YEAR
+
+    def add(self, name: str, birthday: date):
+        """Add the name to the slot of the birthday"""
+        slot = birthday_slot(birthday)
+        if self.slots[slot] is None:
+            self.slots[slot] = set()
+        self.slots[slot].add(name)
+
+    def update(self, birthdays: Iterable[tuple[str, int]]):
+        """Add many names at once, given the ordinals of their birthdays. The slot of
+        a day is computed once, as many names share a birthday"""
+        slots = self.slots
+        day_slots = {}
+        for name, ordinal in birthdays:
+            slot = day_slots.get(ordinal)
+            if slot is None:
+                slot = day_slots[ordinal] = birthday_slot(date.fromordinal(ordinal))
+            names = slots[slot]
+            if names is None:
+                names = slots[slot] = set()
+            names.add(name)
+
+    def remove(self, name: str, birthday: date):
+        """Remove the name from the slot of the birthday"""
+        slot = birthday_slot(birthday)
+        names = self.slots[slot]
+        if names is None:
+            return
+        names.discard(name)
+        if not names:
+            self.slots[slot] = None
+
+    def names(self, slot: int) -> list[str]:
+        """Get the names in the slot"""
+        return list(self.slots[slot]) if self.slots[slot] is not None else []
+
+    def upcoming(self, today: date, days: int) -> list[tuple[date, str]]:
+        """Get birthdays from today to today plus the given number of days.
+
+        Args:
+            today (date): the first day of the range
+            days (int): number of days after today to include
+
+        Returns:
+            list[tuple[date, str]]: congratulation dates and names, sorted by birthday date and name"""
+        result = []
+        for congratulation_date, slots in upcoming_slots(today, days):
+            for slot in slots:
+                if self.slots[slot] is not None:
+                    result.extend((congratulation_date, name) for name in sorted(self.slots[slot]))
+        return result
@@ -0,0 +1,153 @@
+from typing import Hashable
+
+def pattern_masks(pattern: str) -> dict[str, int]:
+    """Get the bit mask of the positions of every character of the pattern"""
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | 1 << i
+    return masks
+
+def masked_distance(masks: dict[str, int], length: int, text: str) -> int:
+    """Get the Levenshtein distance between a pattern and a text with the bit-parallel
+    algorithm of Myers and Hyyrö, which computes a whole column of the distance matrix
+    with a few operations on integers
+
+    Args:
+        masks: dict[str, int]: masks of the pattern from pattern_masks
+        length: int: length of the pattern
+        text: str: the text
+
+    Returns:
+        int: the number of inserted, deleted and replaced characters that turn the pattern into the text"""
+    if not length:
+        return len(text)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative, distance = full, 0, length
+    for char in text:
+        match = masks.get(char, 0)
+        vertical = match | negative
+        horizontal = (((match & positive) + positive) ^ positive) | match
+        plus = negative | ~(horizontal | positive)
+        minus = positive & horizontal
+        if plus & last:
+            distance += 1
+        elif minus & last:
+            distance -= 1
+        plus = (plus << 1) | 1
+        minus <<= 1
+        positive = (minus | ~(vertical | plus)) & full
+        negative = plus & vertical & full
+    return distance
+
+def edit_distance(a: str, b: str) -> int:
+    """Get the Levenshtein distance between two strings: the number of inserted, deleted
+    and replaced characters that turn one into the other"""
+    return masked_distance(pattern_masks(a), len(a), b)
+
+class BKNode:
+    """Node of a BK-tree: a key, the values stored under it and the children by their distance to the key"""
+    __slots__ = ('key', 'values', 'children')
+
+    def __init__(self, key: str):
+        self.key = key
+        self.values: set = set()
+        self.children: dict[int, 'BKNode'] = {}
+
+class BKTree:
+    """Burkhard-Keller tree of strings for searches within an edit distance.
+
+    Every child of a node is kept under its distance to the node. By the triangle
+    inequality, a key within r of the query can only be under a child whose distance
+    is within r of the distance between the query and the node, so a search computes
+    the distance to a small part of the keys. Values of removed keys are dropped, and
+    the tree is rebuilt without the empty nodes when they outnumber the others.
+    The masks of the added or searched key are made once for all the distances it is compared by."""
+    def __init__(self):
+        self.root: BKNode = None
+        self.nodes = 0
+        self.empty = 0
+
+    def add(self, key: str, value: Hashable):
+        """Add a value under the key
+
+        Args:
+            key: str: the key the distance is measured on
+            value: Hashable: the value returned by the searches that match the key"""
+        if self.root is None:
+            self.root = BKNode(key)
+            self.nodes = 1
+            self.root.values.add(value)
+            return
+        node = self.root
+        masks = pattern_masks(key)
+        while True:
+            distance = masked_distance(masks, len(key), node.key)
+            if distance == 0:
+                if not node.values:
+                    self.empty -= 1
+                break
+            child = node.children.get(distance)
+            if child is None:
+                child = node.children[distance] = BKNode(key)
+                node = child
+                self.nodes += 1
+                break
+            node = child
+        node.values.add(value)
+
+    def remove(self, key: str, value: Hashable):
+        """Remove a value from under the key, if it is there"""
+        node = self.find(key)
+        if node is None or value not in node.values:
+            return
+        node.values.discard(value)
+        if not node.values:
+            self.empty += 1
+            if self.empty * 2 > self.nodes:
+                self.rebuild()
+
+    def find(self, key: str) -> BKNode | None:
+        """Get the node of the key, None if the key was never added"""
+        node = self.root
+        masks = pattern_masks(key)
+        while node is not None:
+            distance = masked_distance(masks, len(key), node.key)
+            if distance == 0:
+                return node
+            node = node.children.get(distance)
+        return None
+
+    def rebuild(self):
+        """Build the tree again from the keys that still have values"""
+        entries = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            entries.extend((node.key, value) for value in node.values)
+            stack.extend(node.children.values())
+        self.root, self.nodes, self.empty = None, 0, 0
+        for key, value in entries:
+            self.add(key, value)
+
+    def search(self, key: str, max_distance: int) -> list[tuple[int, Hashable]]:
+        """Find the values whose keys are within the edit distance of the key
+
+        Args:
+            key: str: the key to look for
+            max_distance: int: the largest distance of a match
+
+        Returns:
+            list[tuple[int, Hashable]]: distances and values of the matches, nearest first"""
+        matches = []
+        masks = pattern_masks(key)
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = masked_distance(masks, len(key), node.key)
+            if distance <= max_distance:
+                matches.extend((distance, value) for value in node.values)
+            for child_distance, child in node.children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches)
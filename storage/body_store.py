@@ -0,0 +1,102 @@
+import os
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+CACHE_BUDGET = 16 * 1024 * 1024
+"""Default number of bytes of note bodies kept in memory by a body store"""
+
+BodyRef = tuple[int, int]
+"""Offset and length in bytes of a body in the body file"""
+
+class BodyStore:
+    """Append-only file of note bodies with an LRU cache of the bodies that were read.
+
+    Bodies are never overwritten: a changed body is appended and the space of the
+    old one is counted as garbage until the notebook writes a new body file.
+    Reads take a lock, as concurrent readers share the file position and the cache."""
+    def __init__(self, file_path: Path, garbage: int = 0, budget: int = CACHE_BUDGET):
+        self.file_path = file_path
+        self.garbage = garbage
+        self.budget = budget
+        self.cache: OrderedDict[int, tuple[str, int]] = OrderedDict()
+        self.cached_size = 0
+        self.reader = None
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def size(self) -> int:
+        """Get the size of the body file in bytes"""
+        if self.writer is not None:
+            return self.writer.tell()
+        return self.file_path.stat().st_size if self.file_path.exists() else 0
+
+    def read(self, ref: BodyRef, cache: bool = True) -> str:
+        """Read a body from the cache or the file
+
+        Args:
+            ref (BodyRef): position of the body in the file
+            cache (bool): False to read the body without keeping it in the cache, for one-off scans
+
+        Returns:
+            str: the body"""
+        with self.lock:
+            return self.read_locked(ref, cache)
+
+    def read_locked(self, ref: BodyRef, cache: bool) -> str:
+        """Read a body while holding the lock"""
+        offset, length = ref
+        cached = self.cache.get(offset)
+        if cached is not None:
+            self.cache.move_to_end(offset)
+            return cached[0]
+        if self.writer is not None:
+            self.writer.flush()
+        if self.reader is None:
+            self.reader = open(self.file_path, 'rb')
+        self.reader.seek(offset)
+        body = self.reader.read(length).decode('utf-8')
+        if cache:
+            self.cache[offset] = (body, length)
+            self.cached_size += length
+            while self.cached_size > self.budget and len(self.cache) > 1:
+                _, (_, evicted_length) = self.cache.popitem(last=False)
+                self.cached_size -= evicted_length
+        return body
+
+    def append(self, body: str) -> BodyRef:
+        """Append a body to the file
+
+        Args:
+            body (str): the body to store
+
+        Returns:
+            BodyRef: position of the body in the file"""
+        if self.writer is None:
+            self.writer = open(self.file_path, 'ab')
+        data = body.encode('utf-8')
+        offset = self.writer.tell()
+        self.writer.write(data)
+        return offset, len(data)
+
+    def release(self, ref: BodyRef):
+        """Count a stored body that is no longer used as garbage"""
+        offset, length = ref
+        self.garbage += length
+        cached = self.cache.pop(offset, None)
+        if cached is not None:
+            self.cached_size -= length
+
+    def sync(self):
+        """Write appended bodies to the disk, before a notebook file that refers to them is saved"""
+        if self.writer is not None:
+            self.writer.flush()
+            os.fsync(self.writer.fileno())
+
+    def close(self):
+        """Close the body file"""
+        for file in (self.reader, self.writer):
+            if file is not None:
+                file.close()
+        self.reader = None
+        self.writer = None
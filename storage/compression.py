@@ -0,0 +1,64 @@
+import pickle
+import struct
+from typing import BinaryIO
+
+MAGIC = b'PCZ'
+"""First bytes of a compressed file. Files without them are plain pickles"""
+
+VERSION = 1
+"""Version of the compressed format written by dump"""
+
+HEADER = struct.Struct('<3sBB')
+"""Magic, format version and codec id"""
+
+CODECS = {'zlib': 1, 'lzma': 2, 'bz2': 3}
+"""Id of every codec by name, written into the header"""
+
+CODEC_NAMES = {codec_id: name for name, codec_id in CODECS.items()}
+
+def open_stream(codec: str, file: BinaryIO, mode: str) -> BinaryIO:
+    """Open a compressed stream over the file. The modules of the codecs are imported
+    on first use, to keep the startup fast. The zlib codec writes a gzip stream, which
+    is deflate compressed by zlib with a small header and a checksum."""
+    match codec:
+        case 'zlib':
+            import gzip
+            return gzip.GzipFile(fileobj=file, mode=mode, compresslevel=6, mtime=0)
+        case 'lzma':
+            import lzma
+            return lzma.LZMAFile(file, mode)
+        case 'bz2':
+            import bz2
+            return bz2.BZ2File(file, mode)
+
+def dump(obj, file: BinaryIO, codec: str = None):
+    """Pickle the object into the file, streaming it through the codec
+
+    Args:
+        obj: the object to pickle
+        file (BinaryIO): file opened for writing
+        codec (str): 'zlib', 'lzma' or 'bz2', None to write a plain pickle"""
+    if codec is None:
+        pickle.dump(obj, file)
+        return
+    file.write(HEADER.pack(MAGIC, VERSION, CODECS[codec]))
+    with open_stream(codec, file, 'wb') as stream:
+        pickle.dump(obj, stream)
+
+def load(file: BinaryIO):
+    """Unpickle an object from a file written by dump with any codec, or from a plain pickle
+
+    Args:
+        file (BinaryIO): file opened for reading
+
+    Returns:
+        the unpickled object"""
+    header = file.read(HEADER.size)
+    if not header.startswith(MAGIC):
+        file.seek(0)
+        return pickle.load(file)
+    _, version, codec_id = HEADER.unpack(header)
+    if version != VERSION or codec_id not in CODEC_NAMES:
+        raise ValueError(f"Unsupported compressed format: version {version}, codec {codec_id}")
+    with open_stream(CODEC_NAMES[codec_id], file, 'rb') as stream:
+        return pickle.load(stream)
@@ -0,0 +1,126 @@
+import os
+import json
+from pathlib import Path
+from typing import Iterator
+
+class Journal:
+    """Append-only log of the operations applied to a storage since its last snapshot.
+
+    Every entry is a JSON list on its own line: a sequence number, the name of the
+    operation and its arguments. The storage writes the sequence number of the last
+    entry into its snapshot, so entries that are already part of the snapshot are
+    skipped on replay even if the journal was not cleared after saving.
+
+    A deferred journal only counts the operations without writing them, for batch
+    runs that save the storage once at the end. A line torn by a crash is cut off
+    before new entries are appended, so they start on a line of their own."""
+    def __init__(self, file_path: Path, compact_after: int = 10000, deferred: bool = False):
+        self.file_path = file_path
+        self.compact_after = compact_after
+        self.deferred = deferred
+        self.seq = 0
+        self.entries = 0
+        self.file = None
+        self.end: int = None
+
+    def open(self, seq: int):
+        """Open the journal for appending
+
+        Args:
+            seq: int: sequence number of the last operation already applied to the storage"""
+        self.seq = max(self.seq, seq)
+        if self.end is not None and self.file_path.exists() and self.file_path.stat().st_size > self.end:
+            os.truncate(self.file_path, self.end)
+        self.end = None
+        self.file = open(self.file_path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Close the journal file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def append(self, operation: str, *args) -> int:
+        """Append an operation to the journal
+
+        Args:
+            operation: str: name of the operation
+            args: JSON serializable arguments of the operation
+
+        Returns:
+            int: sequence number of the operation"""
+        self.seq += 1
+        if self.deferred:
+            return self.seq
+        self.entries += 1
+        self.file.write(json.dumps([self.seq, operation, *args], ensure_ascii=False) + '\n')
+        self.file.flush()
+        return self.seq
+
+    def replay(self, seq: int) -> Iterator[list]:
+        """Read operations written after the given sequence number.
+        Reading stops at the first damaged entry, which is a write interrupted by a crash,
+        and open cuts the file off at the end of the last whole entry.
+
+        Args:
+            seq: int: sequence number of the last operation already applied to the storage
+
+        Returns:
+            Iterator[list]: operations as lists of the operation name and its arguments"""
+        self.seq = max(self.seq, seq)
+        if not self.file_path.exists():
+            return
+        self.end = 0
+        with open(self.file_path, 'rb') as file:
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entry_seq, *entry = json.loads(line)
+                except ValueError:
+                    break
+                self.end += len(line)
+                self.entries += 1
+                self.seq = max(self.seq, entry_seq)
+                if entry_seq > seq:
+                    yield entry
+
+    def needs_compaction(self) -> bool:
+        """Check if the journal has grown enough to be folded into a new snapshot"""
+        return self.entries >= self.compact_after
+
+    def truncate(self, seq: int):
+        """Drop the entries up to the sequence number, after they have been saved into a snapshot
+        while later entries were being written
+
+        Args:
+            seq: int: sequence number of the last operation included in the snapshot"""
+        if seq >= self.seq:
+            self.clear()
+            return
+        reopen = self.file is not None
+        self.close()
+        temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+        kept = 0
+        with open(self.file_path, 'r', encoding='utf-8') as file, open(temp_path, 'w', encoding='utf-8') as temp:
+            for line in file:
+                try:
+                    entry_seq = json.loads(line)[0]
+                except ValueError:
+                    break
+                if entry_seq > seq:
+                    temp.write(line)
+                    kept += 1
+        temp_path.replace(self.file_path)
+        self.entries = kept
+        if reopen:
+            self.open(self.seq)
+
+    def clear(self):
+        """Drop all entries, after they have been saved into a snapshot"""
+        reopen = self.file is not None
+        self.close()
+        self.file_path.write_bytes(b'')
+        self.entries = 0
+        if reopen:
+            self.open(self.seq)
@@ -0,0 +1,149 @@
+from collections.abc import Hashable
+
+class NgramIndex:
+    """Inverted index from character n-grams of texts to the keys of the texts.
+
+    The index answers substring queries with a set of candidate keys: every key
+    whose text contains the substring is a candidate, but a candidate may still
+    have to be checked against the text itself.
+
+    An index of texts padded at their start with n - 1 anchor characters can also
+    keep the n-grams by their endings. Every substring shorter than n then ends
+    some n-gram of every text that contains it, so short substrings are answered
+    by the index as well.
+
+    A frozen copy of the index can be taken for a background save. While it is
+    kept, postings are copied the first time they change after the freeze."""
+    def __init__(self, n: int = 3, endings: bool = False):
+        self.n = n
+        self.postings: dict[str, set] = {}
+        self.copied: set[str] = None
+        self.endings: dict[str, set[str]] = {} if endings else None
+
+    def __getstate__(self):
+        return {'n': self.n, 'postings': self.postings, 'endings': self.endings is not None}
+
+    def __setstate__(self, state):
+        self.n = state['n']
+        self.postings = state['postings']
+        self.copied = None
+        self.endings = None
+        if state.get('endings'):
+            self.endings = {}
+            for gram in self.postings:
+                self.add_endings(gram)
+
+    def freeze(self) -> 'NgramIndex':
+        """Get a copy of the index that keeps its current postings while the index changes.
+        Only the mapping is copied now, the postings are copied on write until thaw is called"""
+        frozen = NgramIndex(self.n)
+        frozen.postings = dict(self.postings)
+        self.copied = set()
+        return frozen
+
+    def thaw(self):
+        """Stop copying the postings on write, after the frozen copy is no longer used"""
+        self.copied = None
+
+    def copy_postings(self, grams: set[str]):
+        """Copy the postings of the n-grams that are still shared with the frozen copy"""
+        for gram in grams - self.copied:
+            keys = self.postings.get(gram)
+            if keys is not None:
+                self.postings[gram] = set(keys)
+        self.copied |= grams
+
+    def grams(self, *texts: str) -> set[str]:
+        """Get the n-grams of the texts
+
+        Args:
+            texts: str: texts to split, already normalized by the caller
+
+        Returns:
+            set[str]: n-grams of all texts"""
+        n = self.n
+        return {text[i:i + n] for text in texts for i in range(len(text) - n + 1)}
+
+    def add(self, key: Hashable, grams: set[str]):
+        """Add the key to the postings of the n-grams
+
+        Args:
+            key: Hashable: key of the text
+            grams: set[str]: n-grams of the text"""
+        if self.copied is not None:
+            self.copy_postings(grams)
+        for gram in grams:
+            keys = self.postings.get(gram)
+            if keys is None:
+                keys = self.postings[gram] = set()
+                if self.endings is not None:
+                    self.add_endings(gram)
+            keys.add(key)
+
+    def remove(self, key: Hashable, grams: set[str]):
+        """Remove the key from the postings of the n-grams
+
+        Args:
+            key: Hashable: key of the text
+            grams: set[str]: n-grams of the text"""
+        if self.copied is not None:
+            self.copy_postings(grams)
+        for gram in grams:
+            keys = self.postings.get(gram)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+                if self.endings is not None:
+                    self.remove_endings(gram)
+
+    def add_endings(self, gram: str):
+        """Keep a new n-gram under every ending shorter than n"""
+        for i in range(1, self.n):
+            self.endings.setdefault(gram[i:], set()).add(gram)
+
+    def remove_endings(self, gram: str):
+        """Drop an n-gram that no longer has postings from under its endings"""
+        for i in range(1, self.n):
+            grams = self.endings.get(gram[i:])
+            if grams is not None:
+                grams.discard(gram)
+                if not grams:
+                    del self.endings[gram[i:]]
+
+    def update(self, key: Hashable, old_grams: set[str], new_grams: set[str]):
+        """Move the key from the old n-grams to the new ones, touching only the difference
+
+        Args:
+            key: Hashable: key of the text
+            old_grams: set[str]: n-grams of the previous text
+            new_grams: set[str]: n-grams of the new text"""
+        self.remove(key, old_grams - new_grams)
+        self.add(key, new_grams - old_grams)
+
+    def candidates(self, substring: str, limit: int = None) -> set | None:
+        """Get the keys of the texts that may contain the substring
+
+        Args:
+            substring: str: normalized substring to look for
+            limit: int: largest number of postings to gather for a substring shorter than n,
+                above it checking that many texts one by one is cheaper, None for no limit
+
+        Returns:
+            set | None: candidate keys, None if the substring is empty, or shorter than n and
+            the index does not keep the endings of the n-grams or has more postings than the limit"""
+        if len(substring) < self.n:
+            if self.endings is None or not substring:
+                return None
+            postings = [self.postings[gram] for gram in self.endings.get(substring, ())]
+            if limit is not None and sum(map(len, postings)) > limit:
+                return None
+            return set().union(*postings)
+        postings = sorted((self.postings.get(gram, set()) for gram in self.grams(substring)), key=len)
+        result = set(postings[0])
+        for keys in postings[1:]:
+            if not result:
+                break
+            result &= keys
+        return result
@@ -1,18 +1,156 @@
-import pickle
+import os
+import sys
 from pathlib import Path
 from typing import Tuple
+from datetime import datetime as DateTime
 from collections import UserDict
+from storage.ngram_index import NgramIndex
+from storage.journal import Journal
+from storage.autosave import Capture, SavedState
+from storage.body_store import BodyStore, BodyRef
+from storage import compression, note_query
+from storage.shards import SHARDS_SUFFIX, Shards
+from storage.transfer import ImportReport, batches
+from storage.sorted_keys import SortedKeys
+
+def intern_tags(tags):
+    """Get the tags as a tuple of interned strings"""
+    return tuple(sys.intern(tag) for tag in tags)
 
 class Note: 
-    """Class for note, which contains note title, date and time when a note was created, note body, and tags"""
+    """Class for note, which contains note title, date and time when a note was created, note body, and tags.
+    Tags are kept in a tuple of interned strings, so notes with the same tags share them."""
+    __slots__ = ('title', 'datetime', '_body', 'body_ref', 'tags', 'note_book')
+
     def __init__(self, title, datetime, body, tags=None):
         self.title = title
         self.datetime = datetime
-        self.body = body
-        self.tags = tags if tags is not None else []
+        self._body = body
+        self.body_ref: BodyRef = None
+        self.tags: tuple[str, ...] = intern_tags(tags or ())
+        self.note_book: 'NoteBook' = None
+
+    def __getstate__(self):
+        return {'title': self.title, 'datetime': self.datetime, '_body': self._body,
+                'body_ref': self.body_ref, 'tags': self.tags}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = state[1]
+        # notes pickled before bodies were saved separately keep the body itself
+        self._body = state['body'] if 'body' in state else state['_body']
+        self.body_ref = state.get('body_ref')
+        self.title = state['title']
+        self.datetime = state['datetime']
+        self.tags = intern_tags(state['tags'])
+        self.note_book = None
+
+    @property
+    def body(self):
+        """Body of the note. A body that was saved to the body file of the notebook is read on demand"""
+        return self.read_body()
+
+    @body.setter
+    def body(self, body):
+        self.before_change()
+        if self.body_ref is not None and self.note_book is not None:
+            self.note_book.release_body(self.body_ref)
+        self._body = body
+        self.body_ref = None
+
+    def read_body(self, cache=True):
+        """Get the body of the note
+        
+        Args:
+            cache: bool: False to read a saved body without keeping it in the cache of the notebook
+            
+        Returns:
+            str: the body
+        """
+        if self._body is not None:
+            return self._body
+        return self.note_book.load_body(self.body_ref, cache)
+
+    def to_dict(self, cache=True):
+        """Convert the note to a dictionary of JSON serializable values
+        
+        Args:
+            cache: bool: False to read a saved body without keeping it in the cache of the notebook
+        """
+        return {
+            'title': self.title,
+            'datetime': self.datetime.isoformat(),
+            'body': self.read_body(cache),
+            'tags': list(self.tags),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Create a note from a dictionary made by to_dict
+        
+        Args:
+            data: dict: values of the note fields
+            
+        Returns:
+            Note: the note
+        """
+        return Note(data['title'], DateTime.fromisoformat(data['datetime']), data['body'], list(data.get('tags') or []))
+
+    @staticmethod
+    def from_row(row):
+        """Create a note from imported values, validating them
+        
+        Args:
+            row: dict: values of the note fields in the format of to_dict, the creation time is now if it is missing
+            
+        Returns:
+            Note: the note
+            
+        Raises:
+            ValueError: if the row has no title or has an invalid value
+        """
+        if not isinstance(row, dict):
+            raise ValueError("unreadable line")
+        title = row.get('title')
+        if not isinstance(title, str) or not title:
+            raise ValueError("missing title")
+        body = row.get('body') or ''
+        if not isinstance(body, str):
+            raise ValueError(f"invalid body of the note {title}")
+        created = row.get('datetime')
+        if created and not isinstance(created, str):
+            raise ValueError(f"invalid date and time: {created}")
+        try:
+            created = DateTime.fromisoformat(created) if created else DateTime.now()
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid date and time: {created}") from None
+        tags = row.get('tags') or []
+        if not isinstance(tags, list) or not all(isinstance(tag, str) and tag for tag in tags):
+            raise ValueError(f"invalid tags: {tags}")
+        return Note(title, created, body, list(dict.fromkeys(tags)))
+
+    def before_change(self):
+        """Tell the notebook that owns the note that a field is about to change"""
+        if self.note_book is not None:
+            self.note_book.note_changing(self)
+
+    def notify(self, field, old_value, new_value):
+        """Notify the notebook that owns the note about a changed field
+        
+        Args:
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed
+        """
+        if self.note_book is not None:
+            self.note_book.note_changed(self, field, old_value, new_value)
 
     def __str__(self):
-        return f'📒 {self.title}\nCreated: {self.datetime}\n{self.body}\nTags: {", ".join(self.tags)}'
+        return self.to_string(self.body)
+
+    def to_string(self, body):
+        """Format the note with the given body"""
+        return f'📒 {self.title}\nCreated: {self.datetime}\n{body}\nTags: {", ".join(self.tags)}'
     
     def change_title(self, title):
         """Change the title of the note
@@ -20,6 +158,7 @@ class Note:
         Args:
             title: str: new title of the note
         """
+        self.before_change()
         self.title = title
 
     def change_body(self, body):
@@ -28,7 +167,9 @@ class Note:
         Args:
             body: str: new body of the note
         """
+        old_body = self.body
         self.body = body
+        self.notify('body', old_body, body)
     
     def add_tag(self, tag):
         """Add a tag to the note
@@ -37,7 +178,9 @@ class Note:
             tag: str: the tag to add
         """
         if tag not in self.tags:
-            self.tags.append(tag)
+            self.before_change()
+            self.tags += (sys.intern(tag),)
+            self.notify('tag', None, tag)
     
     def remove_tag(self, tag):
         """Remove a tag from the note
@@ -46,11 +189,344 @@ class Note:
             tag: str: the tag to remove
         """
         if tag in self.tags:
-            self.tags.remove(tag)
+            self.before_change()
+            self.tags = tuple(other for other in self.tags if other != tag)
+            self.notify('tag', tag, None)
+
+class NotesCapture(Capture):
+    """Notes and indexes of a notebook at one position of its journal"""
+    def __init__(self, note_book):
+        super().__init__(note_book.journal_seq, note_book.changes)
+        self.notes = dict(note_book.data)
+        self.text_index = note_book.text_index.freeze()
+        self.tag_index = dict(note_book.tag_index)
+        self.copied_tags: set[str] = set()
+        self.bodies_generation = note_book.bodies_generation
+        self.bodies = None
+        self.garbage = 0
+        self.dirty_shards: set[int] = None
+        if note_book.file_path.suffix == SHARDS_SUFFIX:
+            self.dirty_shards = note_book.shards_for(note_book.file_path).take_dirty()
+        if note_book.body_store is not None:
+            self.bodies = note_book.body_store.file_path.name
+            self.garbage = note_book.body_store.garbage
+
+    def shards_state(self):
+        """Get the state of the notebook that is kept in the manifest of its shards"""
+        state = {'journal_seq': self.journal_seq, 'bodies_generation': self.bodies_generation}
+        if self.bodies is not None:
+            state['bodies'], state['garbage'] = self.bodies, self.garbage
+        return state
 
 class NoteBook(UserDict):
     def __init__(self):
         super().__init__()
+        self.text_index = NgramIndex()
+        self.tag_index: dict[str, set[str]] = {}
+        self.file_path: Path = None
+        self.journal: Journal = None
+        self.journal_seq = 0
+        self.body_store: BodyStore = None
+        self.bodies_generation = 0
+        self.sorted_titles = SortedKeys()
+        self.changes = 0
+        self.saved_changes = 0
+        self.saving: NotesCapture = None
+        self.background_saves = False
+        self.shards: Shards = None
+        self.codec: str = None
+
+    def __getstate__(self):
+        state = {'data': self.data, 'journal_seq': self.journal_seq,
+                 'text_index': self.text_index, 'tag_index': self.tag_index,
+                 'bodies_generation': self.bodies_generation}
+        if self.body_store is not None:
+            state['bodies'] = self.body_store.file_path.name
+            state['garbage'] = self.body_store.garbage
+        return state
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.data = state['data']
+        self.journal_seq = state.get('journal_seq', 0)
+        if 'text_index' not in state:
+            for note in self.data.values():
+                self.attach(note)
+            return
+        self.text_index = state['text_index']
+        self.tag_index = state['tag_index']
+        self.bodies_generation = state['bodies_generation']
+        if 'bodies' in state:
+            self.body_store = BodyStore(Path(state['bodies']), state['garbage'])
+        self.sorted_titles = SortedKeys(self.data)
+        for note in self.data.values():
+            note.note_book = self
+
+    def text_grams(self, title, body):
+        """Get the n-grams of the searchable text of a note"""
+        return self.text_index.grams(title.lower(), body.lower())
+
+    def attach(self, note):
+        """Make the notebook the owner of the note and index its text and tags
+        
+        Args:
+            note: Note: the note to index
+        """
+        note.note_book = self
+        self.sorted_titles.add(note.title)
+        self.index_note(note)
+
+    def detach(self, note):
+        """Remove the text and tags of the note from the indexes and release it
+        
+        Args:
+            note: Note: the note to remove from the indexes
+        """
+        self.unindex_note(note)
+        self.sorted_titles.remove(note.title)
+        # the note keeps its body, the copy in the body file becomes garbage
+        note.body = note.body
+        note.note_book = None
+
+    def index_note(self, note):
+        """Add the text and tags of the note to the indexes"""
+        self.text_index.add(note.title, self.text_grams(note.title, note.body))
+        for tag in note.tags:
+            self.index_tag(note.title, tag)
+
+    def unindex_note(self, note):
+        """Remove the text and tags of the note from the indexes"""
+        self.text_index.remove(note.title, self.text_grams(note.title, note.body))
+        for tag in note.tags:
+            self.unindex_tag(note.title, tag)
+
+    def load_body(self, ref, cache=True):
+        """Read a saved body of a note from the body file
+        
+        Args:
+            ref: BodyRef: position of the body in the body file
+            cache: bool: False to read the body without keeping it in the cache
+            
+        Returns:
+            str: the body
+        """
+        return self.body_store.read(ref, cache)
+
+    def release_body(self, ref):
+        """Mark a saved body of a note as replaced"""
+        if self.body_store is not None:
+            self.body_store.release(ref)
+
+    def note_changing(self, note):
+        """Keep the fields of the note for the save in progress, before the first change after its capture
+        
+        Args:
+            note: Note: the note that is about to change
+        """
+        saving = self.saving
+        if saving is not None and note not in saving.preserved:
+            saving.preserved[note] = note.__getstate__()
+
+    def note_changed(self, note, field, old_value, new_value):
+        """Update the indexes and the journal with a changed field of the note
+        
+        Args:
+            note: Note: the changed note
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed
+        """
+        match field:
+            case 'body':
+                self.text_index.update(note.title,
+                                       self.text_grams(note.title, old_value),
+                                       self.text_grams(note.title, new_value))
+            case 'tag':
+                if old_value is not None and old_value.lower() not in (tag.lower() for tag in note.tags):
+                    self.unindex_tag(note.title, old_value)
+                if new_value is not None:
+                    self.index_tag(note.title, new_value)
+        self.touch(note.title)
+        if field == 'body':
+            self.log('body', note.title, new_value)
+        else:
+            self.log(field, note.title, old_value, new_value)
+
+    def index_tag(self, title, tag):
+        """Add the title of a note to the tag index"""
+        self.tag_titles(tag.lower()).add(title)
+
+    def unindex_tag(self, title, tag):
+        """Remove the title of a note from the tag index"""
+        if tag.lower() not in self.tag_index:
+            return
+        titles = self.tag_titles(tag.lower())
+        titles.discard(title)
+        if not titles:
+            del self.tag_index[tag.lower()]
+
+    def tag_titles(self, tag):
+        """Get the titles of the tag in the tag index for a change. The titles are copied
+        the first time they change while a save in progress keeps the tag index as it was"""
+        titles = self.tag_index.get(tag)
+        if titles is None:
+            titles = self.tag_index[tag] = set()
+        elif self.saving is not None and tag not in self.saving.copied_tags:
+            titles = self.tag_index[tag] = set(titles)
+            self.saving.copied_tags.add(tag)
+        return titles
+
+    def touch(self, title):
+        """Mark the shard of a changed note to be rewritten, if the notebook is saved in shards"""
+        if self.shards is not None:
+            self.shards.touch(title)
+
+    def shards_for(self, file_path):
+        """Get the shards of the file. Shards of a file the notebook was not loaded from are all written"""
+        if self.shards is None or self.shards.file_path != file_path:
+            self.shards = Shards(file_path)
+            self.shards.touch_all()
+        return self.shards
+
+    def log(self, operation, *args):
+        """Write the operation to the journal, if the notebook has one
+        
+        Args:
+            operation: str: name of the operation
+            args: arguments of the operation
+        """
+        self.changes += 1
+        if self.journal is None:
+            return
+        self.journal_seq = self.journal.append(operation, *args)
+        if self.journal.needs_compaction() and not self.background_saves:
+            self.compact()
+
+    def apply(self, operation, *args):
+        """Apply an operation read from the journal
+        
+        Args:
+            operation: str: name of the operation
+            args: arguments of the operation
+        """
+        match operation:
+            case 'add':
+                self.add_note(Note.from_dict(args[0]))
+            case 'import':
+                self.import_notes(enumerate(args[0], 1))
+            case 'remove':
+                self.remove_note(args[0])
+            case 'rename':
+                self.rename_note(args[0], args[1])
+            case 'body':
+                self.update_note_body(args[0], args[1])
+            case 'tag' if args[1] is not None:
+                self.data[args[0]].remove_tag(args[1])
+            case 'tag':
+                self.data[args[0]].add_tag(args[2])
+
+    def open_journal(self, journal):
+        """Replay the journal on top of the loaded notes and write further changes into it
+        
+        Args:
+            journal: Journal: journal of the notebook
+            
+        Returns:
+            str: error message if any
+        """
+        try:
+            for operation, *args in journal.replay(self.journal_seq):
+                self.apply(operation, *args)
+            self.journal_seq = journal.seq
+            journal.open(self.journal_seq)
+            self.journal = journal
+            return None
+        except Exception as e:
+            return str(e)
+
+    def compact(self):
+        """Save the notes to the file they were loaded from and clear the journal
+        
+        Returns:
+            str: error message if any
+        """
+        changes = self.changes
+        err = self.save_data(self.file_path)
+        if err is None:
+            self.saved_changes = changes
+            if self.journal is not None:
+                self.journal.clear()
+        return err
+
+    def is_dirty(self):
+        """Check if the notebook changed since it was last saved"""
+        return self.changes != self.saved_changes
+
+    def capture(self):
+        """Capture the notes and the indexes for a background save. Must be called while no command changes the notebook
+        
+        Returns:
+            NotesCapture: the notes at the current position of the journal
+        """
+        self.saving = NotesCapture(self)
+        return self.saving
+
+    def write_capture(self, capture):
+        """Save the captured notes to the file of the notebook, while commands keep changing it.
+        The body file is left as it is: bodies that are not in it yet are saved in the notebook
+        file, and are moved to the body file by the next compaction
+        
+        Args:
+            capture: NotesCapture: the captured notes
+            
+        Returns:
+            str: error message if any
+        """
+        try:
+            if capture.dirty_shards is not None:
+                payloads = self.shards.split(capture.dirty_shards, capture.notes.items())
+                for payload in payloads.values():
+                    for title, note in payload.items():
+                        payload[title] = SavedState(Note, capture.state(note, note.__getstate__()))
+                self.shards.write(payloads, capture.shards_state(), self.codec)
+                return None
+            state = {'data': {title: SavedState(Note, capture.state(note, note.__getstate__()))
+                              for title, note in capture.notes.items()},
+                     'journal_seq': capture.journal_seq, 'text_index': capture.text_index,
+                     'tag_index': capture.tag_index, 'bodies_generation': capture.bodies_generation}
+            if capture.bodies is not None:
+                state['bodies'], state['garbage'] = capture.bodies, capture.garbage
+            temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+            with open(temp_path, 'wb') as file:
+                compression.dump(SavedState(NoteBook, state), file, self.codec)
+            os.replace(temp_path, self.file_path)
+            return None
+        except Exception as e:
+            return str(e)
+
+    def finish_capture(self, capture, err):
+        """Stop copying on write for the capture and drop the saved entries of the journal.
+        Must be called while no command changes the notebook
+        
+        Args:
+            capture: NotesCapture: the written capture
+            err: str: error of the write, None if the capture was saved
+        """
+        self.saving = None
+        self.text_index.thaw()
+        if err is not None and capture.dirty_shards is not None:
+            self.shards.restore_dirty(capture.dirty_shards)
+        if err is None:
+            self.saved_changes = capture.changes
+            if self.journal is not None:
+                self.journal.truncate(capture.journal_seq)
+
+    def close(self):
+        """Close the journal and the body file of the notebook"""
+        if self.journal is not None:
+            self.journal.close()
+        if self.body_store is not None:
+            self.body_store.close()
 
     def add_note(self, note):
         """Add a new note to the notebook. Title must be unique.
@@ -64,8 +540,86 @@ class NoteBook(UserDict):
         if note.title in self.data:
             return False
         self.data[note.title] = note
+        self.attach(note)
+        self.touch(note.title)
+        self.log('add', note.to_dict())
         return True
 
+    def import_notes(self, rows):
+        """Import notes in batches. Rows are validated one by one, the uniqueness of titles
+        is checked for a whole batch, and the accepted notes are indexed and journaled together.
+        
+        Args:
+            rows: Iterable[Row]: line numbers and values of the notes in the format of Note.to_dict
+            
+        Returns:
+            ImportReport: numbers of imported and skipped rows
+        """
+        report = ImportReport()
+        for batch in batches(rows):
+            notes = []
+            for number, row in batch:
+                try:
+                    notes.append((number, Note.from_row(row)))
+                except ValueError as e:
+                    report.reject(number, str(e))
+            accepted = self.accept_notes(notes, report)
+            if accepted:
+                self.add_notes(accepted)
+            report.imported += len(accepted)
+        return report
+
+    def accept_notes(self, notes, report):
+        """Check that the titles of a batch of notes are unique in the notebook and in the batch
+        
+        Args:
+            notes: list[tuple[int, Note]]: line numbers and validated notes
+            report: ImportReport: report to count the rejected notes in
+            
+        Returns:
+            list[Note]: the unique notes
+        """
+        titles = set()
+        accepted = []
+        for number, note in notes:
+            if note.title in titles or note.title in self:
+                report.reject(number, f"note already exists: {note.title}")
+            else:
+                titles.add(note.title)
+                accepted.append(note)
+        return accepted
+
+    def add_notes(self, notes):
+        """Add a batch of new notes with unique titles, writing them to the journal at once
+        
+        Args:
+            notes: list[Note]: notes accepted by accept_notes
+        """
+        for note in notes:
+            self.data[note.title] = note
+            self.attach(note)
+            self.touch(note.title)
+        self.log('import', [note.to_dict() for note in notes])
+
+    def iter_notes(self, after=None):
+        """Iterate the notes in title order, starting after the given title
+        
+        Args:
+            after: str: title of the last note of the previous page, None to start from the first note
+            
+        Returns:
+            Iterator[Note]: notes with titles greater than the cursor
+        """
+        return (self.data[title] for title in self.sorted_titles.after(after))
+
+    def export_notes(self):
+        """Get the values of all notes one by one in the format of Note.to_dict, without filling the body cache
+        
+        Returns:
+            Iterator[dict]: values of the notes
+        """
+        return (note.to_dict(cache=False) for note in self.data.values())
+
     def remove_note(self, title):
         """Remove a note from the notebook by its title.
         
@@ -77,7 +631,9 @@ class NoteBook(UserDict):
         """
         if title not in self.data:
             return False
-        del self.data[title]
+        self.detach(self.data.pop(title))
+        self.touch(title)
+        self.log('remove', title)
         return True
     
     def rename_note(self, old_title, new_title):
@@ -94,8 +650,16 @@ class NoteBook(UserDict):
             return False
         if new_title in self.data:
             return False
-        self.data[new_title] = self.data.pop(old_title)
-        self.data[new_title].change_title(new_title)
+        note = self.data.pop(old_title)
+        self.unindex_note(note)
+        self.sorted_titles.remove(old_title)
+        note.change_title(new_title)
+        self.data[new_title] = note
+        self.sorted_titles.add(new_title)
+        self.index_note(note)
+        self.touch(old_title)
+        self.touch(new_title)
+        self.log('rename', old_title, new_title)
         return True
     
     def update_note_body(self, title, body):
@@ -130,7 +694,17 @@ class NoteBook(UserDict):
         Returns:
             list: a list of string representations of all notes
         """
-        return [str(note) for note in self.data.values()]
+        return list(self.stream_notes())
+
+    def stream_notes(self):
+        """Format the notes one by one. Saved bodies are read without filling the cache,
+        so listing the notebook does not evict the bodies that are in use.
+        
+        Returns:
+            Iterator[str]: string representations of all notes
+        """
+        for note in self.data.values():
+            yield note.to_string(note.read_body(cache=False))
 
     def search_by_keyword(self, keyword):
         """Search for notes containing the keyword in their title, body, or tags.
@@ -141,10 +715,15 @@ class NoteBook(UserDict):
         Returns:
             list: a list of string representations of notes containing the keyword
         """
-        return [str(note) for note in self.data.values() 
-                if keyword.lower() in note.body.lower() 
-                or keyword.lower() in note.title.lower()
-                or keyword.lower() in [tag.lower() for tag in note.tags]]
+        keyword = keyword.lower()
+        titles = self.text_index.candidates(keyword)
+        if titles is None:
+            titles = self.data.keys()
+        found = {title for title in titles
+                 if keyword in title.lower()
+                 or keyword in self.data[title].body.lower()}
+        found |= self.tag_index.get(keyword, set())
+        return [str(note) for note in sorted((self.data[title] for title in found), key=lambda note: note.datetime)]
 
     def search_by_tag(self, tag):
         """Search for notes containing a specific tag.
@@ -155,7 +734,90 @@ class NoteBook(UserDict):
         Returns:
             list: a list of string representations of notes containing the tag
         """
-        return [str(note) for note in self.data.values() if tag.lower() in [t.lower() for t in note.tags]]
+        return self.search_by_tags([tag])
+
+    def find_titles_by_tags(self, tags, match_all=True):
+        """Find titles of notes by a set of tags, ignoring case.
+        
+        Args:
+            tags: list: the tags to search for
+            match_all: bool: True to find notes that have all tags, False to find notes that have any of them
+            
+        Returns:
+            set: titles of the matching notes
+        """
+        postings = sorted((self.tag_index.get(tag.lower(), set()) for tag in tags), key=len)
+        if not postings:
+            return set()
+        if not match_all:
+            return set().union(*postings)
+        titles = set(postings[0])
+        for other in postings[1:]:
+            if not titles:
+                break
+            titles &= other
+        return titles
+
+    def search_by_tags(self, tags, match_all=True):
+        """Search for notes by a set of tags.
+        
+        Args:
+            tags: list: the tags to search for
+            match_all: bool: True to find notes that have all tags, False to find notes that have any of them
+            
+        Returns:
+            list: a list of string representations of the matching notes
+        """
+        titles = self.find_titles_by_tags(tags, match_all)
+        return [str(note) for note in sorted((self.data[title] for title in titles), key=lambda note: note.datetime)]
+
+    def all_titles(self):
+        """Get the titles of all notes
+        
+        Returns:
+            Collection[str]: the titles, live view of the notebook
+        """
+        return self.data.keys()
+
+    def text_candidates(self, text):
+        """Find the notes whose title or body may contain the text, with the n-gram index
+        
+        Args:
+            text: str: the lower case text
+            
+        Returns:
+            set: titles of the candidate notes, None if the text is too short for the index
+        """
+        return self.text_index.candidates(text)
+
+    def find_titles_by_query(self, query):
+        """Find titles of notes by a query of terms joined by AND, OR, NOT and parentheses.
+        
+        Args:
+            query: str: the query, e.g. tag:work AND (body:deploy OR title:release) NOT tag:old
+            
+        Returns:
+            set: titles of the matching notes
+            
+        Raises:
+            ValueError: if the query is not valid
+        """
+        return note_query.find_titles(self, query)
+
+    def search_by_query(self, query):
+        """Search for notes by a query of terms joined by AND, OR, NOT and parentheses.
+        
+        Args:
+            query: str: the query, see find_titles_by_query
+            
+        Returns:
+            list: a list of string representations of the matching notes
+            
+        Raises:
+            ValueError: if the query is not valid
+        """
+        titles = self.find_titles_by_query(query)
+        return [str(note) for note in sorted((self.data[title] for title in titles), key=lambda note: note.datetime)]
 
     @staticmethod
     def load_data(file_path: Path) -> Tuple['NoteBook', str]:
@@ -169,17 +831,54 @@ class NoteBook(UserDict):
         try:
             if not file_path.parent.exists():
                 return None, f"Can't find the directory: {file_path.parent}"
-            if not file_path.exists():
-                return NoteBook(), None
-            if file_path.stat().st_size == 0:
-                return NoteBook(), None
-            with open(file_path, 'rb') as file:
-                return pickle.load(file), None
+            note_book = NoteBook()
+            if file_path.suffix == SHARDS_SUFFIX:
+                note_book = NoteBook.load_shards(file_path)
+            elif file_path.exists() and file_path.stat().st_size > 0:
+                with open(file_path, 'rb') as file:
+                    note_book = compression.load(file)
+            if note_book.body_store is not None:
+                note_book.body_store.file_path = file_path.with_name(note_book.body_store.file_path.name)
+            note_book.file_path = file_path
+            return note_book, None
         except Exception as e:
             return None, str(e)
         
+    @staticmethod
+    def load_shards(file_path: Path) -> 'NoteBook':
+        """Load the notes from a sharded file. The shards keep only the notes, so the indexes are
+        built from them, and the notes are ordered by their creation time
+        
+        Args:
+            file_path: Path: the manifest file
+            
+        Returns:
+            NoteBook: the notebook
+        """
+        note_book = NoteBook()
+        shards, state, payloads = Shards.load(file_path)
+        note_book.shards = shards
+        if state is None:
+            return note_book
+        note_book.journal_seq = state['journal_seq']
+        note_book.bodies_generation = state['bodies_generation']
+        if 'bodies' in state:
+            note_book.body_store = BodyStore(file_path.with_name(state['bodies']), state['garbage'])
+        notes = sorted((note for payload in payloads for note in payload.values()),
+                       key=lambda note: (note.datetime.timestamp(), note.title))
+        note_book.data = {note.title: note for note in notes}
+        note_book.sorted_titles = SortedKeys(note_book.data)
+        for note in notes:
+            note.note_book = note_book
+            note_book.text_index.add(note.title, note_book.text_grams(note.title, note.read_body(cache=False)))
+            for tag in note.tags:
+                note_book.index_tag(note.title, tag)
+        return note_book
+
     def save_data(self, file_path: Path) -> str:
-        """Save data to file
+        """Save data to file. Bodies are kept in a body file next to it: new and changed
+        bodies are appended to it, and it is rewritten when it is mostly garbage.
+        A sharded file only rewrites the shards of the changed notes.
         
         Args:
             file_path: str: file path
@@ -187,10 +886,66 @@ class NoteBook(UserDict):
         Returns:
             str: error message if any"""
         try:
-            if not file_path.exists():
-                file_path.touch()
-            with open(file_path, 'wb') as file:
-                pickle.dump(self, file)
+            old_store = self.body_store
+            if (old_store is None
+                    or old_store.file_path != self.body_file(file_path, self.bodies_generation)
+                    or old_store.garbage > old_store.size() // 2):
+                self.write_bodies(file_path)
+            else:
+                for note in self.data.values():
+                    if note.body_ref is None:
+                        note.body_ref = old_store.append(note._body)
+                        note._body = None
+                        self.touch(note.title)
+            self.body_store.sync()
+            if file_path.suffix == SHARDS_SUFFIX:
+                self.save_shards(file_path)
+            else:
+                temp_path = file_path.with_name(file_path.name + '.tmp')
+                with open(temp_path, 'wb') as file:
+                    compression.dump(self, file, self.codec)
+                os.replace(temp_path, file_path)
+            if old_store is not None and old_store is not self.body_store and file_path == self.file_path:
+                old_store.close()
+                old_store.file_path.unlink(missing_ok=True)
             return None
         except Exception as e:
-            return str(e)
\ No newline at end of file
+            return str(e)
+
+    @staticmethod
+    def body_file(file_path: Path, generation: int) -> Path:
+        """Get the path of the body file of the given generation for the notebook file"""
+        return file_path.with_name(f"{file_path.stem}.{generation}.bodies")
+
+    def write_bodies(self, file_path: Path):
+        """Write the bodies of all notes to a new body file and switch the notes to it
+        
+        Args:
+            file_path: Path: path of the notebook file
+        """
+        self.bodies_generation += 1
+        store = BodyStore(self.body_file(file_path, self.bodies_generation))
+        store.file_path.unlink(missing_ok=True)
+        refs = [(note, store.append(note.read_body(cache=False))) for note in self.data.values()]
+        for note, ref in refs:
+            note._body = None
+            note.body_ref = ref
+        self.body_store = store
+        if self.shards is not None:
+            self.shards.touch_all()
+
+    def save_shards(self, file_path: Path):
+        """Rewrite the shards of the notes that changed since the last save, and the manifest
+        
+        Args:
+            file_path: Path: path of the manifest file
+        """
+        shards = self.shards_for(file_path)
+        dirty = shards.take_dirty()
+        state = {'journal_seq': self.journal_seq, 'bodies_generation': self.bodies_generation,
+                 'bodies': self.body_store.file_path.name, 'garbage': self.body_store.garbage}
+        try:
+            shards.write(shards.split(dirty, self.data.items()), state, self.codec)
+        except Exception:
+            shards.restore_dirty(dirty)
+            raise
\ No newline at end of file
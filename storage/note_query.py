@@ -0,0 +1,254 @@
+import re
+from typing import NamedTuple, Protocol, Collection
+
+FIELDS = ('tag', 'title', 'body')
+"""Fields a term can be limited to, as in tag:work. A term without a field matches the title, body or a tag"""
+
+OPERATORS = ('AND', 'OR', 'NOT')
+"""Operators of a query. They are upper case, so the same words in lower case are search terms"""
+
+TOKEN = re.compile(r'\s*(?:(\()|(\))|((?:[^\s()"]+:)?"[^"]*")|([^\s()"]+))')
+"""Parenthesis, term with a quoted phrase or plain word"""
+
+class Term(NamedTuple):
+    """Search term: a tag equal to the value, or a title or body that contains it, ignoring case"""
+    field: str | None
+    value: str
+
+class And(NamedTuple):
+    """Notes that match all of the operands"""
+    operands: tuple
+
+class Or(NamedTuple):
+    """Notes that match any of the operands"""
+    operands: tuple
+
+class Not(NamedTuple):
+    """Notes that do not match the operand"""
+    operand: object
+
+def tokenize(query: str) -> list[str | Term]:
+    """Split a query into parentheses, operators and terms
+
+    Raises:
+        ValueError: if a quote is not closed or a term is empty"""
+    if query.count('"') % 2:
+        raise ValueError("unclosed quote")
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = TOKEN.match(query, position)
+        if match is None:
+            raise ValueError(f"unexpected quote at '{query[position:].strip()}'")
+        position = match.end()
+        opening, closing, quoted, word = match.groups()
+        token = opening or closing or quoted or word
+        if token in ('(', ')') or token in OPERATORS:
+            tokens.append(token)
+            continue
+        field, separator, value = token.partition(':')
+        if not separator or field.lower() not in FIELDS:
+            field, value = None, token
+        if value.startswith('"'):
+            value = value[1:-1]
+        if not value:
+            raise ValueError(f"empty search term '{token}'")
+        tokens.append(Term(field and field.lower(), value.lower()))
+    return tokens
+
+class Parser:
+    """Recursive descent parser of queries. NOT binds tighter than AND, and AND tighter
+    than OR. Terms next to each other are joined by AND, so a NOT ... after a term excludes notes.
+
+        query := or
+        or := and (OR and)*
+        and := unary ([AND] unary)*
+        unary := NOT unary | ( or ) | term"""
+    def __init__(self, tokens: list[str | Term]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("empty query")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected '{self.peek()}'" if isinstance(self.peek(), str) else "unexpected term")
+        return node
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.take()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def parse_and(self):
+        operands = [self.parse_unary()]
+        while self.peek() not in (None, ')', 'OR'):
+            if self.peek() == 'AND':
+                self.take()
+            operands.append(self.parse_unary())
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def parse_unary(self):
+        token = self.take()
+        if token == 'NOT':
+            return Not(self.parse_unary())
+        if token == '(':
+            node = self.parse_or()
+            if self.take() != ')':
+                raise ValueError("missing ')'")
+            return node
+        if isinstance(token, Term):
+            return token
+        raise ValueError("query ends after an operator" if token is None else f"unexpected '{token}'")
+
+def parse(query: str):
+    """Parse a query such as tag:work AND (body:deploy OR title:release) NOT tag:old
+
+    Returns:
+        Term | And | Or | Not: the tree of the query
+
+    Raises:
+        ValueError: if the query is not valid"""
+    return Parser(tokenize(query)).parse()
+
+class QuerySource(Protocol):
+    """Notebook a query is evaluated on"""
+    def all_titles(self) -> Collection[str]: ...
+    def find_titles_by_tags(self, tags: list[str], match_all: bool = True) -> set[str]: ...
+    def text_candidates(self, text: str) -> set[str] | None: ...
+    def find_note_by_title(self, title: str): ...
+
+class QueryPlanner:
+    """Evaluates a query tree on the indexes of a notebook.
+
+    Every node is evaluated within the titles that can still match, so a term only
+    checks the notes left by the operands before it. Operands of AND are ordered by
+    the size of their postings, smallest first, and the evaluation stops as soon as
+    nothing is left. Tag terms are answered by the tag index alone, title and body
+    terms by the n-gram candidates checked against the notes, and only a term that no
+    index can answer, shorter than an n-gram, scans the titles it is evaluated within.
+    Excluded operands are subtracted last, from the smallest set."""
+    def __init__(self, source: QuerySource):
+        self.source = source
+        self.postings: dict[Term, set[str] | None] = {}
+        self.notes: dict = {}
+        self.titles: Collection[str] = None
+
+    def universe(self) -> Collection[str]:
+        """Get the titles of all notes, read once per query"""
+        if self.titles is None:
+            self.titles = self.source.all_titles()
+        return self.titles
+
+    def term_postings(self, term: Term) -> set[str] | None:
+        """Get the titles the indexes give for a term: exact for a tag, candidates for a
+        title or body, None if the term has to be checked on every note"""
+        if term not in self.postings:
+            postings = set()
+            if term.field != 'tag':
+                postings = self.source.text_candidates(term.value)
+            if postings is not None and term.field in (None, 'tag'):
+                postings |= self.source.find_titles_by_tags([term.value])
+            self.postings[term] = postings
+        return self.postings[term]
+
+    def estimate(self, node) -> int:
+        """Estimate the number of titles a node matches, to order the operands of AND"""
+        match node:
+            case Term():
+                postings = self.term_postings(node)
+                return len(self.universe()) if postings is None else len(postings)
+            case And(operands):
+                positive = [self.estimate(operand) for operand in operands if not isinstance(operand, Not)]
+                return min(positive, default=len(self.universe()))
+            case Or(operands):
+                return min(sum(self.estimate(operand) for operand in operands), len(self.universe()))
+            case Not():
+                return len(self.universe())
+
+    def note(self, title: str):
+        if title not in self.notes:
+            self.notes[title] = self.source.find_note_by_title(title)
+        return self.notes[title]
+
+    def matches(self, term: Term, title: str) -> bool:
+        """Check a term against a note"""
+        note = self.note(title)
+        if note is None:
+            return False
+        if term.field in (None, 'tag') and any(tag.lower() == term.value for tag in note.tags):
+            return True
+        if term.field in (None, 'title') and term.value in note.title.lower():
+            return True
+        return term.field in (None, 'body') and term.value in note.read_body(cache=False).lower()
+
+    def evaluate(self, node, within: set[str] = None) -> set[str]:
+        """Get the titles that match a node
+
+        Args:
+            node: Term | And | Or | Not: the node to evaluate
+            within: set[str]: titles the result is limited to, None for all titles
+
+        Returns:
+            set[str]: the matching titles"""
+        match node:
+            case Term():
+                postings = self.term_postings(node)
+                if postings is None:
+                    return {title for title in (self.universe() if within is None else within)
+                            if self.matches(node, title)}
+                titles = postings if within is None else postings & within
+                if node.field == 'tag':
+                    return set(titles)
+                return {title for title in titles if self.matches(node, title)}
+            case And(operands):
+                positive = sorted((operand for operand in operands if not isinstance(operand, Not)), key=self.estimate)
+                result = within
+                for operand in positive:
+                    result = self.evaluate(operand, result)
+                    if not result:
+                        return set()
+                if result is within:
+                    # only excluded operands: copy, as the titles belong to the caller
+                    result = set(self.universe() if within is None else within)
+                for operand in operands:
+                    if isinstance(operand, Not):
+                        result -= self.evaluate(operand.operand, result)
+                        if not result:
+                            break
+                return result
+            case Or(operands):
+                result = set()
+                for operand in sorted(operands, key=self.estimate):
+                    rest = None if within is None else within - result
+                    result |= self.evaluate(operand, rest)
+                return result
+            case Not(operand):
+                result = set(self.universe() if within is None else within)
+                return result - self.evaluate(operand, result)
+
+def find_titles(source: QuerySource, query: str) -> set[str]:
+    """Find the titles of the notes that match a query
+
+    Args:
+        source: QuerySource: the notebook
+        query: str: the query, see parse
+
+    Returns:
+        set[str]: titles of the matching notes
+
+    Raises:
+        ValueError: if the query is not valid"""
+    return QueryPlanner(source).evaluate(parse(query))
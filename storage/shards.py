@@ -0,0 +1,125 @@
+import os
+from zlib import crc32
+from pathlib import Path
+from typing import Tuple
+from storage import compression
+
+SHARDS_SUFFIX = ".shards"
+"""Suffix of the files that are saved as a manifest with shard files next to it"""
+
+SHARD_COUNT = 64
+"""Number of shards of a new sharded file"""
+
+VERSION = 1
+"""Version of the manifest format written by Shards.write"""
+
+class Shards:
+    """Layout of a storage saved as a small manifest file and shard files next to it.
+
+    Every key is hashed into one of the shards, and a save only rewrites the shards
+    with keys that changed since the previous save. Shard files of a save get a new
+    generation in their names and are written through temporary files, then the
+    manifest that lists them replaces the old one atomically, so a crash leaves
+    either the old or the new files in use. Files of replaced shards are removed last."""
+    def __init__(self, file_path: Path, count: int = SHARD_COUNT):
+        self.file_path = file_path
+        self.count = count
+        self.generation = 0
+        self.files: list[str | None] = [None] * count
+        self.dirty: set[int] = set()
+
+    def shard(self, key: str) -> int:
+        """Get the shard of a key. The hash does not depend on the process, unlike hash()"""
+        return crc32(key.encode('utf-8')) % self.count
+
+    def touch(self, key: str):
+        """Mark the shard of a changed key to be rewritten by the next save"""
+        self.dirty.add(self.shard(key))
+
+    def touch_all(self):
+        """Mark every shard to be rewritten by the next save"""
+        self.dirty = set(range(self.count))
+
+    def take_dirty(self) -> set[int]:
+        """Get the shards to rewrite and start marking the next changes from scratch"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def restore_dirty(self, dirty: set[int]):
+        """Mark the shards of a failed save to be rewritten again"""
+        self.dirty |= dirty
+
+    def split(self, dirty: set[int], items) -> dict[int, dict]:
+        """Group the items whose keys are in the dirty shards by shard
+
+        Args:
+            dirty: set[int]: shards to rewrite
+            items: Iterable[tuple[str, object]]: keys and values of the storage
+
+        Returns:
+            dict[int, dict]: keys and values of every dirty shard"""
+        payloads = {index: {} for index in dirty}
+        for key, value in items:
+            payload = payloads.get(self.shard(key))
+            if payload is not None:
+                payload[key] = value
+        return payloads
+
+    def shard_path(self, name: str) -> Path:
+        """Get the path of a shard file, which is kept next to the manifest"""
+        return self.file_path.with_name(name)
+
+    def write(self, payloads: dict[int, dict], state: dict, codec: str = None):
+        """Write the dirty shards and the manifest
+
+        Args:
+            payloads: dict[int, dict]: keys and values of every dirty shard, empty shards are dropped
+            state: dict: the rest of the storage, kept in the manifest
+            codec: str: codec of the shard files, None to write plain pickles"""
+        generation = self.generation + 1
+        files = list(self.files)
+        for index, payload in payloads.items():
+            files[index] = None
+            if not payload:
+                continue
+            files[index] = f"{self.file_path.stem}.{index:03}.{generation}.shard"
+            path = self.shard_path(files[index])
+            temp_path = path.with_name(path.name + '.tmp')
+            with open(temp_path, 'wb') as file:
+                compression.dump(payload, file, codec)
+            os.replace(temp_path, path)
+        manifest = {'version': VERSION, 'count': self.count, 'generation': generation, 'files': files, 'state': state}
+        temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+        with open(temp_path, 'wb') as file:
+            compression.dump(manifest, file)
+        os.replace(temp_path, self.file_path)
+        replaced = [self.files[index] for index in payloads if self.files[index] not in (None, files[index])]
+        self.files, self.generation = files, generation
+        for name in replaced:
+            self.shard_path(name).unlink(missing_ok=True)
+
+    @staticmethod
+    def load(file_path: Path) -> Tuple['Shards', dict, list[dict]]:
+        """Read the manifest and the shards of a sharded file
+
+        Args:
+            file_path: Path: the manifest file
+
+        Returns:
+            Tuple[Shards, dict, list[dict]]: the layout, the state kept in the manifest, None
+            for an empty file, and the keys and values of every shard"""
+        if not file_path.exists() or file_path.stat().st_size == 0:
+            return Shards(file_path), None, []
+        with open(file_path, 'rb') as file:
+            manifest = compression.load(file)
+        if manifest.get('version') != VERSION:
+            raise ValueError(f"Unsupported shards format: {file_path}")
+        shards = Shards(file_path, manifest['count'])
+        shards.generation = manifest['generation']
+        shards.files = manifest['files']
+        payloads = []
+        for name in shards.files:
+            if name is not None:
+                with open(shards.shard_path(name), 'rb') as file:
+                    payloads.append(compression.load(file))
+        return shards, manifest['state'], payloads
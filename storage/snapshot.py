@@ -0,0 +1,352 @@
+import os
+import mmap
+import threading
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from datetime import date
+from typing import Callable, Iterable, Iterator, NamedTuple
+from collections.abc import MutableMapping
+from storage.birthday_index import DAYS_IN_YEAR, birthday_slot
+
+MAGIC = b'PCAB'
+"""First bytes of an address book snapshot file"""
+
+VERSION = 1
+"""Version of the snapshot format written by write_snapshot"""
+
+HEADER = struct.Struct('<4sHHQQQ')
+"""Magic, version, number of sections, journal sequence number, number of records, number of phones"""
+
+SECTION = struct.Struct('<QQ')
+"""Offset and length in bytes of a section"""
+
+SECTIONS = (
+    ('string_offsets', 'Q'),
+    ('strings', 'B'),
+    ('names', 'I'),
+    ('emails', 'I'),
+    ('addresses', 'I'),
+    ('birthdays', 'i'),
+    ('phone_starts', 'I'),
+    ('phones', 'I'),
+    ('phone_order', 'I'),
+    ('email_order', 'I'),
+    ('birthday_starts', 'I'),
+    ('birthday_rows', 'I'),
+)
+"""Sections of the snapshot in file order, with the array type code of their items.
+Records are stored in rows sorted by name; every column holds one item per row.
+Text columns hold ids in the string table, NO_STRING if the field is not set.
+Birthdays are stored as date ordinals, 0 if the field is not set.
+The order sections hold row or phone positions sorted by the value they index."""
+
+NO_STRING = 0xFFFFFFFF
+"""String id of a field that is not set"""
+
+class RecordValues(NamedTuple):
+    """Plain values of the fields of a contact, as stored in a snapshot"""
+    name: str
+    phones: list[str]
+    email: str | None
+    address: str | None
+    birthday: int
+    """Date ordinal of the birthday, 0 if the contact has no birthday"""
+
+def is_snapshot(file_path: Path) -> bool:
+    """Check if the file is an address book snapshot"""
+    with open(file_path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+class Snapshot:
+    """Read-only address book snapshot mapped into memory.
+
+    Only the header is read when the snapshot is opened; records are decoded
+    from the mapped columns when they are accessed. The mapping and the file stay
+    open until close is called, or until the end of a with block."""
+    def __init__(self, file_path: Path):
+        self.file = open(file_path, 'rb')
+        self.views: list[memoryview] = []
+        try:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, sections, self.journal_seq, self.count, self.phones_count = HEADER.unpack_from(self.mmap, 0)
+            if magic != MAGIC or version != VERSION or sections != len(SECTIONS):
+                raise ValueError(f"Unsupported snapshot format: {file_path}")
+        except Exception:
+            self.close()
+            raise
+        view = memoryview(self.mmap)
+        self.views.append(view)
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(self.mmap, HEADER.size + i * SECTION.size)
+            section = view[offset:offset + length].cast(typecode)
+            self.views.append(section)
+            setattr(self, name, section)
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def close(self):
+        """Release the columns, unmap the file and close it. Closing twice does nothing"""
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        if getattr(self, 'mmap', None) is not None:
+            self.mmap.close()
+        self.file.close()
+
+    def string(self, string_id: int) -> str | None:
+        """Decode a string of the string table"""
+        if string_id == NO_STRING:
+            return None
+        return self.raw_string(string_id).decode('utf-8')
+
+    def raw_string(self, string_id: int) -> bytes:
+        """Get the UTF-8 bytes of a string of the string table"""
+        return bytes(self.strings[self.string_offsets[string_id]:self.string_offsets[string_id + 1]])
+
+    def name(self, row: int) -> str:
+        """Get the name of the contact in the row"""
+        return self.string(self.names[row])
+
+    def values(self, row: int) -> RecordValues:
+        """Decode all fields of the contact in the row"""
+        phones = self.phones[self.phone_starts[row]:self.phone_starts[row + 1]]
+        return RecordValues(self.name(row),
+                            [self.string(phone) for phone in phones],
+                            self.string(self.emails[row]),
+                            self.string(self.addresses[row]),
+                            self.birthdays[row])
+
+    def find_row(self, name: str) -> int | None:
+        """Find the row of the contact by name with a binary search"""
+        key = name.encode('utf-8')
+        row = bisect_left(self.names, key, key=self.raw_string)
+        if row < self.count and self.raw_string(self.names[row]) == key:
+            return row
+        return None
+
+    def find_phone_row(self, phone: str) -> int | None:
+        """Find the row of the contact that has the phone"""
+        key = phone.encode('utf-8')
+        i = bisect_left(self.phone_order, key, key=lambda position: self.raw_string(self.phones[position]))
+        if i < self.phones_count and self.raw_string(self.phones[self.phone_order[i]]) == key:
+            return bisect_right(self.phone_starts, self.phone_order[i]) - 1
+        return None
+
+    def find_email_row(self, email: str) -> int | None:
+        """Find the row of the contact that has the email"""
+        key = email.encode('utf-8')
+        i = bisect_left(self.email_order, key, key=lambda row: self.raw_string(self.emails[row]))
+        if i < len(self.email_order) and self.raw_string(self.emails[self.email_order[i]]) == key:
+            return self.email_order[i]
+        return None
+
+    def birthday_slot_rows(self, slot: int) -> memoryview:
+        """Get the rows of the contacts whose birthday is in the slot of the birthday index"""
+        return self.birthday_rows[self.birthday_starts[slot]:self.birthday_starts[slot + 1]]
+
+def write_snapshot(file_path: Path, rows: Iterable[RecordValues], journal_seq: int,
+                   before_replace: Callable[[], None] = None):
+    """Write contacts to a snapshot file, replacing it atomically.
+
+    Args:
+        file_path (Path): the snapshot file
+        rows (Iterable[RecordValues]): contacts sorted by name
+        journal_seq (int): sequence number of the last journaled operation included in the snapshot
+        before_replace (Callable[[], None]): called once the rows are written, to close a mapping
+            of the file, which can't be replaced while it is mapped on some systems"""
+    columns = {name: array(typecode) for name, typecode in SECTIONS}
+    strings = bytearray()
+    string_offsets = columns['string_offsets']
+    string_offsets.append(0)
+
+    def add_string(value: str | None) -> int:
+        if value is None:
+            return NO_STRING
+        strings.extend(value.encode('utf-8'))
+        string_offsets.append(len(strings))
+        return len(string_offsets) - 2
+
+    slots: list[list[int]] = [[] for _ in range(DAYS_IN_YEAR)]
+    columns['phone_starts'].append(0)
+    count = 0
+    for row, values in enumerate(rows):
+        count += 1
+        columns['names'].append(add_string(values.name))
+        columns['emails'].append(add_string(values.email))
+        columns['addresses'].append(add_string(values.address))
+        columns['birthdays'].append(values.birthday)
+        columns['phones'].extend(add_string(phone) for phone in values.phones)
+        columns['phone_starts'].append(len(columns['phones']))
+        if values.birthday:
+            slots[birthday_slot(date.fromordinal(values.birthday))].append(row)
+
+    def raw_string(string_id: int) -> bytes:
+        return bytes(strings[string_offsets[string_id]:string_offsets[string_id + 1]])
+
+    phones = columns['phones']
+    emails = columns['emails']
+    columns['phone_order'].extend(sorted(range(len(phones)), key=lambda position: raw_string(phones[position])))
+    columns['email_order'].extend(sorted((row for row in range(count) if emails[row] != NO_STRING),
+                                         key=lambda row: raw_string(emails[row])))
+    columns['birthday_starts'].append(0)
+    for slot_rows in slots:
+        columns['birthday_rows'].extend(slot_rows)
+        columns['birthday_starts'].append(len(columns['birthday_rows']))
+    columns['strings'] = array('B', strings)
+
+    temp_path = file_path.with_name(file_path.name + '.tmp')
+    with open(temp_path, 'wb') as file:
+        offset = HEADER.size + SECTION.size * len(SECTIONS)
+        table = []
+        for name, _ in SECTIONS:
+            offset += -offset % 8
+            length = len(columns[name]) * columns[name].itemsize
+            table.append((offset, length))
+            offset += length
+        file.write(HEADER.pack(MAGIC, VERSION, len(SECTIONS), journal_seq, count, len(phones)))
+        for section in table:
+            file.write(SECTION.pack(*section))
+        for (name, _), (offset, _) in zip(SECTIONS, table):
+            file.write(b'\0' * (offset - file.tell()))
+            columns[name].tofile(file)
+    if before_replace is not None:
+        before_replace()
+    os.replace(temp_path, file_path)
+
+class SnapshotRecords(MutableMapping):
+    """Records of the address book backed by a snapshot.
+
+    Records are materialized from the snapshot the first time they are accessed
+    and kept in memory from then on, so changes to them are not lost. The rows of
+    materialized and deleted records are hidden, so lookups in the snapshot only
+    return contacts that have not been touched since it was written.
+    Materializing is done under a lock, as concurrent readers may look up the same record."""
+    def __init__(self, snapshot: Snapshot, make_record: Callable[[RecordValues], object]):
+        self.snapshot = snapshot
+        self.make_record = make_record
+        self.records: dict = {}
+        self.hidden: set[int] = set()
+        self.size = snapshot.count
+        self.lock = threading.Lock()
+
+    def visible_row(self, row: int | None) -> int | None:
+        """Get the row if it is in the snapshot and has not been materialized or deleted"""
+        return row if row is not None and row not in self.hidden else None
+
+    def __getitem__(self, name: str):
+        record = self.records.get(name)
+        if record is not None:
+            return record
+        with self.lock:
+            record = self.records.get(name)
+            if record is not None:
+                return record
+            row = self.visible_row(self.snapshot.find_row(name))
+            if row is None:
+                raise KeyError(name)
+            record = self.make_record(self.snapshot.values(row))
+            self.hidden.add(row)
+            self.records[name] = record
+            return record
+
+    def __contains__(self, name) -> bool:
+        return name in self.records or self.visible_row(self.snapshot.find_row(name)) is not None
+
+    def __setitem__(self, name: str, record):
+        if name in self.records:
+            self.records[name] = record
+            return
+        row = self.visible_row(self.snapshot.find_row(name))
+        if row is not None:
+            self.hidden.add(row)
+        else:
+            self.size += 1
+        self.records[name] = record
+
+    def __delitem__(self, name: str):
+        self[name]
+        del self.records[name]
+        self.size -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(self.snapshot.count):
+            name = self.snapshot.name(row)
+            if row not in self.hidden or name in self.records:
+                yield name
+        for name in list(self.records):
+            if self.snapshot.find_row(name) is None:
+                yield name
+
+    def __len__(self):
+        return self.size
+
+    def visible_names(self) -> set[bytes]:
+        """Get the UTF-8 names of the contacts that are still only in the snapshot"""
+        return {self.snapshot.raw_string(self.snapshot.names[row])
+                for row in range(self.snapshot.count) if row not in self.hidden}
+
+    def swap(self, snapshot: Snapshot, visible: set[bytes]):
+        """Move onto a new snapshot of the same contacts and close the old one.
+
+        Rows of the new snapshot are hidden unless their contact was still only in the old
+        one, which the save copied unchanged. Materialized and deleted contacts stay as
+        they are, so the contents do not change even if the new snapshot was written
+        before the latest changes, or is the old file again after a failed save.
+
+        Args:
+            snapshot: Snapshot: the new snapshot
+            visible: set[bytes]: visible_names, taken before the old snapshot was closed"""
+        with self.lock:
+            old, self.snapshot = self.snapshot, snapshot
+            self.hidden = {row for row in range(snapshot.count)
+                           if snapshot.raw_string(snapshot.names[row]) not in visible}
+        old.close()
+
+    def close(self):
+        """Close the snapshot. The records can't be used afterwards"""
+        self.snapshot.close()
+
+    def snapshot_values(self) -> Iterator[RecordValues]:
+        """Get the values of the contacts that are still only in the snapshot, sorted by name"""
+        for row in range(self.snapshot.count):
+            if row not in self.hidden:
+                yield self.snapshot.values(row)
+
+    def values_after(self, name: str | None) -> Iterator[RecordValues]:
+        """Get the values of the contacts that are still only in the snapshot, in name order, starting after the name"""
+        start = 0
+        if name is not None:
+            start = bisect_right(self.snapshot.names, name.encode('utf-8'), key=self.snapshot.raw_string)
+        for row in range(start, self.snapshot.count):
+            if row not in self.hidden:
+                yield self.snapshot.values(row)
+
+    def snapshot_names(self) -> Iterator[str]:
+        """Get the names of the contacts that are still only in the snapshot"""
+        for row in range(self.snapshot.count):
+            if row not in self.hidden:
+                yield self.snapshot.name(row)
+
+    def find_by_phone(self, phone: str) -> str | None:
+        """Find the name of the contact that has the phone among the contacts that are only in the snapshot"""
+        row = self.visible_row(self.snapshot.find_phone_row(phone))
+        return self.snapshot.name(row) if row is not None else None
+
+    def find_by_email(self, email: str) -> str | None:
+        """Find the name of the contact that has the email among the contacts that are only in the snapshot"""
+        row = self.visible_row(self.snapshot.find_email_row(email))
+        return self.snapshot.name(row) if row is not None else None
+
+    def birthday_names(self, slot: int) -> list[str]:
+        """Get the names of the contacts that are only in the snapshot and have a birthday in the slot"""
+        return [self.snapshot.name(row) for row in self.snapshot.birthday_slot_rows(slot) if row not in self.hidden]
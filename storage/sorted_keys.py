@@ -0,0 +1,117 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator
+
+class SortedKeys:
+    """Sorted set of keys kept in chunks of bounded size.
+
+    Adding or removing a key only moves the items of one chunk, and iterating
+    from a key finds its chunk with a binary search, so a page of keys after a
+    cursor costs O(log n + page) instead of sorting all keys."""
+    CHUNK = 1000
+
+    def __init__(self, keys: Iterable[str] = ()):
+        keys = sorted(set(keys))
+        self.chunks: list[list[str]] = [keys[i:i + self.CHUNK] for i in range(0, len(keys), self.CHUNK)]
+        self.maxes: list[str] = [chunk[-1] for chunk in self.chunks]
+        self.size = len(keys)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self) -> Iterator[str]:
+        return self.after(None)
+
+    def __contains__(self, key) -> bool:
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return False
+        chunk = self.chunks[i]
+        j = bisect_left(chunk, key)
+        return j < len(chunk) and chunk[j] == key
+
+    def add(self, key: str):
+        """Add the key if it is not in the set yet"""
+        if not self.chunks:
+            self.chunks.append([key])
+            self.maxes.append(key)
+            self.size = 1
+            return
+        i = min(bisect_left(self.maxes, key), len(self.maxes) - 1)
+        chunk = self.chunks[i]
+        j = bisect_left(chunk, key)
+        if j < len(chunk) and chunk[j] == key:
+            return
+        chunk.insert(j, key)
+        self.maxes[i] = chunk[-1]
+        self.size += 1
+        if len(chunk) > 2 * self.CHUNK:
+            self.chunks[i:i + 1] = [chunk[:self.CHUNK], chunk[self.CHUNK:]]
+            self.maxes[i:i + 1] = [chunk[self.CHUNK - 1], chunk[-1]]
+
+    def update(self, keys: Iterable[str]):
+        """Add many keys at once. The new keys are sorted once and merged into the chunks
+        they fall in, so a batch costs one sort and one pass over the chunks instead of a
+        binary search and a list insert per key. Merged chunks are new lists, and chunks
+        that grow too large are split."""
+        keys = sorted(set(keys))
+        if not keys:
+            return
+        if not self.chunks:
+            self.__init__(keys)
+            return
+        chunks, maxes = [], []
+        start, last = 0, len(self.chunks) - 1
+        for i, chunk in enumerate(self.chunks):
+            end = len(keys) if i == last else bisect_right(keys, self.maxes[i], start)
+            if end > start:
+                added = keys[start:end]
+                present = set(added).intersection(chunk)
+                if present:
+                    added = [key for key in added if key not in present]
+                if added:
+                    chunk = sorted(chunk + added)
+                    self.size += len(added)
+                start = end
+            if len(chunk) > 2 * self.CHUNK:
+                pieces = [chunk[j:j + self.CHUNK] for j in range(0, len(chunk), self.CHUNK)]
+                chunks.extend(pieces)
+                maxes.extend(piece[-1] for piece in pieces)
+            else:
+                chunks.append(chunk)
+                maxes.append(chunk[-1])
+        self.chunks, self.maxes = chunks, maxes
+
+    def remove(self, key: str):
+        """Remove the key if it is in the set"""
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return
+        chunk = self.chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            return
+        del chunk[j]
+        self.size -= 1
+        if chunk:
+            self.maxes[i] = chunk[-1]
+        else:
+            del self.chunks[i]
+            del self.maxes[i]
+
+    def after(self, key: str | None) -> Iterator[str]:
+        """Iterate the keys in order, starting after the given key.
+        The set must not be changed while the iterator is in use.
+
+        Args:
+            key (str | None): the cursor, None to start from the first key
+
+        Returns:
+            Iterator[str]: the keys greater than the cursor"""
+        if key is None:
+            i, j = 0, 0
+        else:
+            i = bisect_right(self.maxes, key)
+            j = bisect_right(self.chunks[i], key) if i < len(self.chunks) else 0
+        for chunk in self.chunks[i:]:
+            yield from chunk[j:] if j else chunk
+            j = 0
@@ -0,0 +1,428 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Tuple
+from datetime import datetime, date
+from collections.abc import Mapping
+from storage.address_book import AddressBook, Record, Name
+from storage.birthday_index import birthday_slot, upcoming_slots
+from storage.journal import Journal
+from storage.bk_tree import BKTree
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    name TEXT PRIMARY KEY,
+    birthday TEXT,
+    birthday_slot INTEGER,
+    email TEXT UNIQUE,
+    address TEXT
+);
+CREATE TABLE IF NOT EXISTS phones (
+    phone TEXT PRIMARY KEY,
+    name TEXT NOT NULL REFERENCES records(name) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS phones_name ON phones(name);
+CREATE INDEX IF NOT EXISTS records_birthday_slot ON records(birthday_slot) WHERE birthday_slot IS NOT NULL;
+CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(name, content='records', tokenize="trigram case_sensitive 1");
+CREATE TRIGGER IF NOT EXISTS records_names_insert AFTER INSERT ON records BEGIN
+    INSERT INTO names(rowid, name) VALUES (new.rowid, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS records_names_delete AFTER DELETE ON records BEGIN
+    INSERT INTO names(names, rowid, name) VALUES ('delete', old.rowid, old.name);
+END;
+"""
+
+SELECT_RECORDS = """
+SELECT records.*, (
+    SELECT json_group_array(phone) FROM (SELECT phone FROM phones WHERE phones.name = records.name ORDER BY rowid)
+) AS phones FROM records
+"""
+
+class RecordsView:
+    """Sized and iterable view of the records of the SQLite address book"""
+    def __init__(self, address_book: 'SqliteAddressBook'):
+        self.address_book = address_book
+
+    def __len__(self):
+        return len(self.address_book)
+
+    def __iter__(self) -> Iterator[Record]:
+        cursor = self.address_book.connection.execute(SELECT_RECORDS + "ORDER BY rowid")
+        for row in cursor:
+            yield self.address_book.make_record(row)
+
+class SqliteAddressBook(Mapping):
+    """Address book stored in an SQLite database.
+
+    Has the same methods as AddressBook, but keeps only the records that are in use
+    in memory. Records returned by the address book write their changes through to
+    the database."""
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.file_path: Path = None
+        self.name_tree: BKTree = None
+        self.name_tree_lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Record:
+        record = self.find(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __iter__(self) -> Iterator[str]:
+        for (name,) in self.connection.execute("SELECT name FROM records ORDER BY rowid"):
+            yield name
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM records").fetchone()[0]
+
+    def __contains__(self, name) -> bool:
+        return self.has_record(name)
+
+    def values(self) -> RecordsView:
+        return RecordsView(self)
+
+    def make_record(self, row: sqlite3.Row) -> Record:
+        """Create a record from a row of the records table
+
+        Args:
+            row: sqlite3.Row: the row with the contact fields, selected with SELECT_RECORDS
+
+        Returns:
+            Record: record object attached to the address book"""
+        record = Record(row['name'])
+        record.phone_values = tuple(json.loads(row['phones']))
+        if row['birthday']:
+            record.birthday_ordinal = date.fromisoformat(row['birthday']).toordinal()
+        record.email_value = row['email']
+        record.address_value = row['address']
+        record.address_book = self
+        return record
+
+    def add_record(self, record: Record) -> bool:
+        """Add record to the address book
+
+        Args:
+            record: Record: record object
+
+        Returns:
+            bool: True if record was added, False if record already exists"""
+        if self.has_record(record.name_value):
+            return False
+        birthday = record.birthday_date()
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO records (name, birthday, birthday_slot, email, address) VALUES (?, ?, ?, ?, ?)",
+                (record.name_value,
+                 birthday.isoformat() if birthday else None,
+                 birthday_slot(birthday) if birthday else None,
+                 record.email_value,
+                 record.address_value))
+            self.connection.executemany("INSERT INTO phones (phone, name) VALUES (?, ?)",
+                                        [(phone, record.name_value) for phone in record.phone_values])
+        record.address_book = self
+        if self.name_tree is not None:
+            self.name_tree.add(record.name_value.lower(), record.name_value)
+        return True
+
+    import_records = AddressBook.import_records
+    accept_records = AddressBook.accept_records
+
+    def add_records(self, records: list[Record], rows: list[dict] = None):
+        """Insert a batch of new records with unique fields in one transaction
+        
+        Args:
+            records: list[Record]: records accepted by accept_records
+            rows: list[dict]: the imported rows, unused as the database has no journal"""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO records (name, birthday, birthday_slot, email, address) VALUES (?, ?, ?, ?, ?)",
+                ((record.name_value,
+                  birthday.isoformat() if birthday else None,
+                  birthday_slot(birthday) if birthday else None,
+                  record.email_value,
+                  record.address_value)
+                 for record in records
+                 for birthday in (record.birthday_date(),)))
+            self.connection.executemany("INSERT INTO phones (phone, name) VALUES (?, ?)",
+                                        ((phone, record.name_value)
+                                         for record in records for phone in record.phone_values))
+        for record in records:
+            record.address_book = self
+            if self.name_tree is not None:
+                self.name_tree.add(record.name_value.lower(), record.name_value)
+
+    def iter_records(self, after: str = None) -> Iterator[Record]:
+        """Iterate the records in name order, starting after the given name
+        
+        Args:
+            after: str: name of the last record of the previous page, None to start from the first record
+            
+        Returns:
+            Iterator[Record]: records with names greater than the cursor"""
+        if after is None:
+            cursor = self.connection.execute(SELECT_RECORDS + "ORDER BY name")
+        else:
+            cursor = self.connection.execute(SELECT_RECORDS + "WHERE name > ? ORDER BY name", (after,))
+        return (self.make_record(row) for row in cursor)
+
+    def export_records(self) -> Iterator[dict]:
+        """Get the values of all records one by one in the format of Record.to_dict"""
+        return (record.to_dict() for record in self.values())
+
+    def delete(self, name: str) -> bool:
+        """Delete record from the address book
+
+        Args:
+            name: str: name of the contact
+
+        Returns:
+            bool: True if record was deleted, False if record not found"""
+        with self.connection:
+            deleted = self.connection.execute("DELETE FROM records WHERE name = ?", (name,)).rowcount > 0
+        if deleted and self.name_tree is not None:
+            self.name_tree.remove(name.lower(), name)
+        return deleted
+
+    def record_changing(self, record: Record):
+        """Changes are written through to the database, so nothing is kept before a record changes"""
+
+    def record_changed(self, record: Record, field: str, old_value, new_value):
+        """Write a changed field of the record to the database
+
+        Args:
+            record: Record: the changed record
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed"""
+        name = record.name_value
+        with self.connection:
+            match field:
+                case 'phone' if old_value is None:
+                    self.connection.execute("INSERT INTO phones (phone, name) VALUES (?, ?)", (new_value, name))
+                case 'phone' if new_value is None:
+                    self.connection.execute("DELETE FROM phones WHERE phone = ? AND name = ?", (old_value, name))
+                case 'phone':
+                    self.connection.execute("UPDATE phones SET phone = ? WHERE phone = ? AND name = ?",
+                                            (new_value, old_value, name))
+                case 'email' | 'address':
+                    self.connection.execute(f"UPDATE records SET {field} = ? WHERE name = ?", (new_value, name))
+                case 'birthday':
+                    self.connection.execute(
+                        "UPDATE records SET birthday = ?, birthday_slot = ? WHERE name = ?",
+                        (new_value.isoformat() if new_value else None,
+                         birthday_slot(new_value) if new_value else None,
+                         name))
+
+    def reads_change_indexes(self) -> bool:
+        """Check if reading a contact can change the indexes. Never, as the database keeps them"""
+        return False
+
+    def find(self, name: str) -> Record:
+        """Find record in the address book
+
+        Args:
+            name: str: name of the contact
+
+        Returns:
+            Record: record object if record was found, None if record not found"""
+        row = self.connection.execute(SELECT_RECORDS + "WHERE name = ?", (name,)).fetchone()
+        return self.make_record(row) if row else None
+
+    def has_record(self, name: str) -> bool:
+        """Check if record exists in the address book
+
+        Args:
+            name: str: name of the contact
+
+        Returns:
+            bool: True if record exists, False if record not found"""
+        return self.connection.execute("SELECT 1 FROM records WHERE name = ?", (name,)).fetchone() is not None
+
+    def find_by_phone(self, phone: str) -> Record:
+        """Find record by phone number
+
+        Args:
+            phone: str: phone number
+
+        Returns:
+            Record: record object if phone was found, None if phone not found"""
+        row = self.connection.execute("SELECT name FROM phones WHERE phone = ?", (phone,)).fetchone()
+        return self.find(row['name']) if row else None
+
+    def find_by_email(self, email: str) -> Record:
+        """Find record by email
+
+        Args:
+            email: str: email
+
+        Returns:
+            Record: record object if email was found, None if email not found"""
+        row = self.connection.execute(SELECT_RECORDS + "WHERE email = ?", (email,)).fetchone()
+        return self.make_record(row) if row else None
+
+    def find_names(self, substring: str) -> list[str]:
+        """Find names of the contacts that contain the substring
+
+        Args:
+            substring: str: part of the name
+
+        Returns:
+            list[str]: sorted names of the matching contacts"""
+        if len(substring) < 3:
+            cursor = self.connection.execute(
+                "SELECT name FROM records WHERE instr(name, ?) > 0 ORDER BY name", (substring,))
+        else:
+            cursor = self.connection.execute(
+                "SELECT name FROM names WHERE names MATCH ? ORDER BY name", (quote(substring),))
+        return [name for (name,) in cursor]
+
+    def find_similar_names(self, name: str, max_distance: int) -> list[tuple[int, str]]:
+        """Find names of the contacts within an edit distance of the name, ignoring the case.
+        The BK-tree of the names is built from the database on the first search and kept up to date from then on
+
+        Args:
+            name: str: the name with possible typos
+            max_distance: int: the largest number of changed characters
+
+        Returns:
+            list[tuple[int, str]]: edit distances and names of the matching contacts, nearest first"""
+        if self.name_tree is None:
+            with self.name_tree_lock:
+                if self.name_tree is None:
+                    name_tree = BKTree()
+                    for (contact,) in self.connection.execute("SELECT name FROM records"):
+                        name_tree.add(contact.lower(), contact)
+                    self.name_tree = name_tree
+        return self.name_tree.search(name.lower(), max_distance)
+
+    def taken_values(self, names: set[str], phones: set[str], emails: set[str]) -> tuple[set[str], set[str], set[str]]:
+        """Find which of the names, phones and emails already belong to contacts, with one query for each field
+        
+        Args:
+            names: set[str]: names to check
+            phones: set[str]: phone numbers to check
+            emails: set[str]: emails to check
+            
+        Returns:
+            tuple[set[str], set[str], set[str]]: the names, phones and emails that are taken"""
+        def taken(query: str, values: set[str]) -> set[str]:
+            if not values:
+                return set()
+            return {value for (value,) in self.connection.execute(
+                query + " IN (SELECT value FROM json_each(?))", (json.dumps(list(values)),))}
+        return (taken("SELECT name FROM records WHERE name", names),
+                taken("SELECT phone FROM phones WHERE phone", phones),
+                taken("SELECT email FROM records WHERE email", emails))
+
+    def is_email_unique(self, email: str) -> bool:
+        """Check if email is unique in the address book
+
+        Args:
+            email: str: email
+
+        Returns:
+            bool: True if email is unique, False if email already exists in the address book"""
+        return self.connection.execute("SELECT 1 FROM records WHERE email = ?", (email,)).fetchone() is None
+
+    def is_phone_unique(self, phone: str) -> bool:
+        """Check if phone is unique in the address book
+
+        Args:
+            phone: str: phone number
+
+        Returns:
+            bool: True if phone is unique, False if phone already exists in the address book"""
+        return self.connection.execute("SELECT 1 FROM phones WHERE phone = ?", (phone,)).fetchone() is None
+
+    get_next_birthday = staticmethod(AddressBook.get_next_birthday)
+    get_next_weekday = staticmethod(AddressBook.get_next_weekday)
+
+    def get_upcoming_birthdays(self, birthday_days:int=7):
+        """Get upcoming birthdays for the given number of days from the address book, sorted by date"""
+        days = upcoming_slots(datetime.today().date(), birthday_days)
+        slots = [slot for _, day_slots in days for slot in day_slots]
+        names: dict[int, list[str]] = {}
+        cursor = self.connection.execute(
+            f"SELECT birthday_slot, name FROM records WHERE birthday_slot IN ({', '.join('?' * len(slots))}) ORDER BY name",
+            slots)
+        for slot, name in cursor:
+            names.setdefault(slot, []).append(name)
+        return [{'name': Name(name), 'congratulation_date': congratulation_date.strftime("%Y.%m.%d")}
+                for congratulation_date, day_slots in days
+                for slot in day_slots
+                for name in names.get(slot, [])]
+
+    def open_journal(self, journal: Journal) -> str:
+        """SQLite commits every change on its own, so the address book does not use a journal"""
+        return None
+
+    def compact(self) -> str:
+        """Checkpoint the write-ahead log of the database
+
+        Returns:
+            str: error message if any"""
+        try:
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return None
+        except Exception as e:
+            return str(e)
+
+    def is_dirty(self) -> bool:
+        """SQLite commits every change on its own, so the address book never has unsaved changes"""
+        return False
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+
+    @staticmethod
+    def load_data(file_path: Path) -> Tuple['SqliteAddressBook', str]:
+        """Open the database file, creating the tables if needed
+
+        Args:
+            file_path: str: file path
+
+        Returns:
+            Tuple[SqliteAddressBook, str]: address book object and error message if any"""
+        try:
+            if not file_path.parent.exists():
+                return None, f"Can't find the directory: {file_path.parent}"
+            connection = connect(file_path)
+            connection.executescript(SCHEMA)
+            address_book = SqliteAddressBook(connection)
+            address_book.file_path = file_path
+            return address_book, None
+        except Exception as e:
+            return None, str(e)
+
+    def save_data(self, file_path: Path) -> str:
+        """Save data to file. The database file is always up to date, other files get a copy of it
+
+        Args:
+            file_path: str: file path
+
+        Returns:
+            str: error message if any"""
+        try:
+            if file_path != self.file_path:
+                with connect(file_path) as target:
+                    self.connection.backup(target)
+                target.close()
+            return None
+        except Exception as e:
+            return str(e)
+
+def connect(file_path: Path) -> sqlite3.Connection:
+    """Open an SQLite database tuned for a single writer"""
+    connection = sqlite3.connect(file_path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA foreign_keys = ON")
+    return connection
+
+def quote(text: str) -> str:
+    """Quote the text as an FTS5 phrase, so it is matched literally"""
+    return '"' + text.replace('"', '""') + '"'
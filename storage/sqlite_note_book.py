@@ -0,0 +1,434 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterator, Tuple
+from datetime import datetime
+from collections.abc import Mapping
+from storage.note_book import Note, NoteBook
+from storage.journal import Journal
+from storage import note_query
+from storage.sqlite_address_book import connect, quote
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    title TEXT PRIMARY KEY,
+    created TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    title TEXT NOT NULL REFERENCES notes(title) ON DELETE CASCADE ON UPDATE CASCADE,
+    tag TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    PRIMARY KEY (title, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_folded ON tags(folded, title);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_text USING fts5(title, body, content='notes', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS notes_text_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_text(rowid, title, body) VALUES (new.rowid, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_text_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_text(notes_text, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_text_update AFTER UPDATE ON notes BEGIN
+    INSERT INTO notes_text(notes_text, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);
+    INSERT INTO notes_text(rowid, title, body) VALUES (new.rowid, new.title, new.body);
+END;
+"""
+
+SELECT_NOTES = """
+SELECT notes.*, (
+    SELECT json_group_array(tag) FROM (SELECT tag FROM tags WHERE tags.title = notes.title ORDER BY rowid)
+) AS tags FROM notes
+"""
+
+class NotesView:
+    """Sized and iterable view of the notes of the SQLite notebook"""
+    def __init__(self, note_book: 'SqliteNoteBook'):
+        self.note_book = note_book
+
+    def __len__(self):
+        return len(self.note_book)
+
+    def __iter__(self) -> Iterator[Note]:
+        cursor = self.note_book.connection.execute(SELECT_NOTES + "ORDER BY rowid")
+        for row in cursor:
+            yield self.note_book.make_note(row)
+
+class SqliteNoteBook(Mapping):
+    """Notebook stored in an SQLite database.
+
+    Has the same methods as NoteBook. Titles and bodies are indexed with a
+    trigram FTS5 table, tags with a case-folded index. Notes returned by the
+    notebook write their changes through to the database."""
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.file_path: Path = None
+
+    def __getitem__(self, title):
+        note = self.find_note_by_title(title)
+        if note is None:
+            raise KeyError(title)
+        return note
+
+    def __iter__(self) -> Iterator[str]:
+        for (title,) in self.connection.execute("SELECT title FROM notes ORDER BY rowid"):
+            yield title
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+    def __contains__(self, title):
+        return self.connection.execute("SELECT 1 FROM notes WHERE title = ?", (title,)).fetchone() is not None
+
+    def values(self) -> NotesView:
+        return NotesView(self)
+
+    def make_note(self, row):
+        """Create a note from a row of the notes table
+
+        Args:
+            row: sqlite3.Row: the row with the note fields, selected with SELECT_NOTES
+
+        Returns:
+            Note: the note attached to the notebook
+        """
+        note = Note(row['title'], datetime.fromisoformat(row['created']), row['body'], json.loads(row['tags']))
+        note.note_book = self
+        return note
+
+    def note_changing(self, note):
+        """Changes are written through to the database, so nothing is kept before a note changes"""
+
+    def note_changed(self, note, field, old_value, new_value):
+        """Write a changed field of the note to the database
+
+        Args:
+            note: Note: the changed note
+            field: str: name of the changed field
+            old_value: previous value of the field, None if it was not set
+            new_value: new value of the field, None if it was removed
+        """
+        with self.connection:
+            match field:
+                case 'body':
+                    self.connection.execute("UPDATE notes SET body = ? WHERE title = ?", (new_value, note.title))
+                case 'tag' if old_value is not None:
+                    self.connection.execute("DELETE FROM tags WHERE title = ? AND tag = ?", (note.title, old_value))
+                case 'tag':
+                    self.connection.execute("INSERT OR IGNORE INTO tags (title, tag, folded) VALUES (?, ?, ?)",
+                                            (note.title, new_value, new_value.lower()))
+
+    def release_body(self, ref):
+        """Bodies are stored in the database rows, there is no body file to release them from"""
+
+    def add_note(self, note):
+        """Add a new note to the notebook. Title must be unique.
+
+        Args:
+            note: Note: the note to add
+
+        Returns:
+            bool: False if a note with the same title already exists, True otherwise
+        """
+        if note.title in self:
+            return False
+        with self.connection:
+            self.connection.execute("INSERT INTO notes (title, created, body) VALUES (?, ?, ?)",
+                                    (note.title, note.datetime.isoformat(), note.body))
+            self.connection.executemany("INSERT OR IGNORE INTO tags (title, tag, folded) VALUES (?, ?, ?)",
+                                        [(note.title, tag, tag.lower()) for tag in note.tags])
+        note.note_book = self
+        return True
+
+    import_notes = NoteBook.import_notes
+    accept_notes = NoteBook.accept_notes
+
+    def add_notes(self, notes):
+        """Insert a batch of new notes with unique titles in one transaction
+        
+        Args:
+            notes: list[Note]: notes accepted by accept_notes
+        """
+        with self.connection:
+            self.connection.executemany("INSERT INTO notes (title, created, body) VALUES (?, ?, ?)",
+                                        ((note.title, note.datetime.isoformat(), note.body) for note in notes))
+            self.connection.executemany("INSERT OR IGNORE INTO tags (title, tag, folded) VALUES (?, ?, ?)",
+                                        ((note.title, tag, tag.lower()) for note in notes for tag in note.tags))
+        for note in notes:
+            note.note_book = self
+
+    def iter_notes(self, after=None):
+        """Iterate the notes in title order, starting after the given title
+        
+        Args:
+            after: str: title of the last note of the previous page, None to start from the first note
+            
+        Returns:
+            Iterator[Note]: notes with titles greater than the cursor
+        """
+        if after is None:
+            cursor = self.connection.execute(SELECT_NOTES + "ORDER BY title")
+        else:
+            cursor = self.connection.execute(SELECT_NOTES + "WHERE title > ? ORDER BY title", (after,))
+        return (self.make_note(row) for row in cursor)
+
+    def export_notes(self):
+        """Get the values of all notes one by one in the format of Note.to_dict
+        
+        Returns:
+            Iterator[dict]: values of the notes
+        """
+        return (note.to_dict() for note in self.values())
+
+    def remove_note(self, title):
+        """Remove a note from the notebook by its title.
+
+        Args:
+            title: str: the title of the note to remove
+
+        Returns:
+            bool: False if a note with the given title is not found, True otherwise
+        """
+        with self.connection:
+            return self.connection.execute("DELETE FROM notes WHERE title = ?", (title,)).rowcount > 0
+
+    def rename_note(self, old_title, new_title):
+        """Rename a note in the notebook.
+
+        Args:
+            old_title: str: the title of the note to rename
+            new_title: str: the new title of the note
+
+        Returns:
+            bool: False if a note with the old title is not found or a note with the new title already exists, True otherwise
+        """
+        if old_title not in self or new_title in self:
+            return False
+        with self.connection:
+            self.connection.execute("UPDATE notes SET title = ? WHERE title = ?", (new_title, old_title))
+        return True
+
+    def update_note_body(self, title, body):
+        """Update the body of a note.
+
+        Args:
+            title: str: the title of the note to update
+            body: str: the new body of the note
+
+        Returns:
+            bool: False if a note with the given title is not found, True otherwise
+        """
+        with self.connection:
+            return self.connection.execute("UPDATE notes SET body = ? WHERE title = ?", (body, title)).rowcount > 0
+
+    def find_note_by_title(self, title):
+        """Find a note by its title.
+
+        Args:
+            title: str: the title of the note to find
+
+        Returns:
+            Note: the note with the given title, or None if not found
+        """
+        row = self.connection.execute(SELECT_NOTES + "WHERE title = ?", (title,)).fetchone()
+        return self.make_note(row) if row else None
+
+    def list_notes(self):
+        """List all notes in the notebook.
+
+        Returns:
+            list: a list of string representations of all notes
+        """
+        return list(self.stream_notes())
+
+    def stream_notes(self):
+        """Format the notes one by one, reading them from the database as they are needed.
+        
+        Returns:
+            Iterator[str]: string representations of all notes
+        """
+        return (str(note) for note in self.values())
+
+    def search_by_keyword(self, keyword):
+        """Search for notes containing the keyword in their title, body, or tags.
+
+        Args:
+            keyword: str: the keyword to search for
+
+        Returns:
+            list: a list of string representations of notes containing the keyword
+        """
+        keyword = keyword.lower()
+        if len(keyword) < 3:
+            text_query = "SELECT rowid FROM notes"
+            parameters = []
+        else:
+            text_query = "SELECT rowid FROM notes_text WHERE notes_text MATCH ?"
+            parameters = [quote(keyword)]
+        cursor = self.connection.execute(
+            SELECT_NOTES + f"WHERE rowid IN ({text_query}) OR title IN (SELECT title FROM tags WHERE folded = ?) "
+            "ORDER BY created",
+            parameters + [keyword])
+        notes = (self.make_note(row) for row in cursor)
+        return [str(note) for note in notes
+                if keyword in note.title.lower()
+                or keyword in note.body.lower()
+                or keyword in (tag.lower() for tag in note.tags)]
+
+    def search_by_tag(self, tag):
+        """Search for notes containing a specific tag.
+
+        Args:
+            tag: str: the tag to search for
+
+        Returns:
+            list: a list of string representations of notes containing the tag
+        """
+        return self.search_by_tags([tag])
+
+    def find_titles_by_tags(self, tags, match_all=True):
+        """Find titles of notes by a set of tags, ignoring case.
+
+        Args:
+            tags: list: the tags to search for
+            match_all: bool: True to find notes that have all tags, False to find notes that have any of them
+
+        Returns:
+            set: titles of the matching notes
+        """
+        folded = sorted({tag.lower() for tag in tags})
+        if not folded:
+            return set()
+        query = f"SELECT title FROM tags WHERE folded IN ({', '.join('?' * len(folded))}) GROUP BY title"
+        if match_all:
+            query += f" HAVING count(DISTINCT folded) = {len(folded)}"
+        return {title for (title,) in self.connection.execute(query, folded)}
+
+    def search_by_tags(self, tags, match_all=True):
+        """Search for notes by a set of tags.
+
+        Args:
+            tags: list: the tags to search for
+            match_all: bool: True to find notes that have all tags, False to find notes that have any of them
+
+        Returns:
+            list: a list of string representations of the matching notes
+        """
+        titles = self.find_titles_by_tags(tags, match_all)
+        notes = (self.find_note_by_title(title) for title in titles)
+        return [str(note) for note in sorted(notes, key=lambda note: note.datetime)]
+
+    def all_titles(self):
+        """Get the titles of all notes
+
+        Returns:
+            set: the titles
+        """
+        return {title for (title,) in self.connection.execute("SELECT title FROM notes")}
+
+    def text_candidates(self, text):
+        """Find the notes whose title or body contains the text, with the trigram full-text index
+
+        Args:
+            text: str: the lower case text
+
+        Returns:
+            set: titles of the matching notes, None if the text is too short for the index
+        """
+        if len(text) < 3:
+            return None
+        cursor = self.connection.execute(
+            "SELECT title FROM notes WHERE rowid IN (SELECT rowid FROM notes_text WHERE notes_text MATCH ?)",
+            [quote(text)])
+        return {title for (title,) in cursor}
+
+    def find_titles_by_query(self, query):
+        """Find titles of notes by a query of terms joined by AND, OR, NOT and parentheses.
+
+        Args:
+            query: str: the query, e.g. tag:work AND (body:deploy OR title:release) NOT tag:old
+
+        Returns:
+            set: titles of the matching notes
+
+        Raises:
+            ValueError: if the query is not valid
+        """
+        return note_query.find_titles(self, query)
+
+    def search_by_query(self, query):
+        """Search for notes by a query of terms joined by AND, OR, NOT and parentheses.
+
+        Args:
+            query: str: the query, see find_titles_by_query
+
+        Returns:
+            list: a list of string representations of the matching notes
+
+        Raises:
+            ValueError: if the query is not valid
+        """
+        titles = self.find_titles_by_query(query)
+        notes = (self.find_note_by_title(title) for title in titles)
+        return [str(note) for note in sorted(notes, key=lambda note: note.datetime)]
+
+    def open_journal(self, journal: Journal) -> str:
+        """SQLite commits every change on its own, so the notebook does not use a journal"""
+        return None
+
+    def compact(self) -> str:
+        """Checkpoint the write-ahead log of the database
+
+        Returns:
+            str: error message if any
+        """
+        try:
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return None
+        except Exception as e:
+            return str(e)
+
+    def is_dirty(self) -> bool:
+        """SQLite commits every change on its own, so the notebook never has unsaved changes"""
+        return False
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+
+    @staticmethod
+    def load_data(file_path: Path) -> Tuple['SqliteNoteBook', str]:
+        """Open the database file, creating the tables if needed
+
+        Args:
+            file_path: str: file path
+
+        Returns:
+            Tuple[SqliteNoteBook, str]: notebook object and error message if any"""
+        try:
+            if not file_path.parent.exists():
+                return None, f"Can't find the directory: {file_path.parent}"
+            connection = connect(file_path)
+            connection.executescript(SCHEMA)
+            note_book = SqliteNoteBook(connection)
+            note_book.file_path = file_path
+            return note_book, None
+        except Exception as e:
+            return None, str(e)
+
+    def save_data(self, file_path: Path) -> str:
+        """Save data to file. The database file is always up to date, other files get a copy of it
+
+        Args:
+            file_path: str: file path
+
+        Returns:
+            str: error message if any"""
+        try:
+            if file_path != self.file_path:
+                with connect(file_path) as target:
+                    self.connection.backup(target)
+                target.close()
+            return None
+        except Exception as e:
+            return str(e)
@@ -0,0 +1,123 @@
+import gc
+import os
+import csv
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from itertools import islice
+from typing import Iterable, Iterator
+
+FORMATS = ('.jsonl', '.csv')
+"""Extensions of the files that can be imported and exported"""
+
+CONTACT_FIELDS = ('name', 'phones', 'birthday', 'email', 'address')
+"""Columns of the exported contacts"""
+
+NOTE_FIELDS = ('title', 'datetime', 'body', 'tags')
+"""Columns of the exported notes"""
+
+LIST_FIELDS = ('phones', 'tags')
+"""Fields that hold lists, joined with LIST_SEPARATOR in CSV files"""
+
+LIST_SEPARATOR = ';'
+
+BATCH_SIZE = 10000
+"""Number of rows validated and added to a storage at once"""
+
+Row = tuple[int, dict | None]
+"""Line number and values of an imported row, None if the line could not be read"""
+
+class ImportReport:
+    """Numbers of imported and skipped rows, with the reasons of the first skipped rows"""
+    MAX_ERRORS = 10
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.errors: list[str] = []
+
+    def reject(self, number: int, reason: str):
+        """Count a skipped row, keeping its reason if there are not too many already"""
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f"line {number}: {reason}")
+
+def read_rows(file_path: Path) -> Iterator[Row]:
+    """Read the rows of a JSONL or CSV file one by one
+
+    Args:
+        file_path (Path): the file, its extension selects the format
+
+    Returns:
+        Iterator[Row]: line numbers and values of the rows"""
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        if file_path.suffix == '.csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                for field in LIST_FIELDS:
+                    if field in row:
+                        row[field] = [value for value in (row[field] or '').split(LIST_SEPARATOR) if value]
+                yield reader.line_num, row
+            return
+        # raw_decode skips the checks of json.loads, so lines with leading or trailing
+        # whitespace or text are left to json.loads
+        decode = json.JSONDecoder().raw_decode
+        for number, line in enumerate(file, 1):
+            try:
+                row, end = decode(line)
+                if line[end:] not in ('\n', '', '\r\n'):
+                    raise ValueError()
+            except ValueError:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+            yield number, row
+
+def write_rows(file_path: Path, fields: tuple[str, ...], rows: Iterable[dict]) -> int:
+    """Write rows one by one to a JSONL or CSV file, replacing it atomically
+
+    Args:
+        file_path (Path): the file, its extension selects the format
+        fields (tuple[str, ...]): the columns of the rows
+        rows (Iterable[dict]): the rows
+
+    Returns:
+        int: number of written rows"""
+    count = 0
+    temp_path = file_path.with_name(file_path.name + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024) as file:
+        if file_path.suffix == '.csv':
+            writer = csv.writer(file)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow([LIST_SEPARATOR.join(row[field]) if field in LIST_FIELDS else row[field]
+                                 for field in fields])
+                count += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+    os.replace(temp_path, file_path)
+    return count
+
+@contextmanager
+def paused_gc():
+    """Turn off the cyclic garbage collector while importing. Every imported row stays
+    alive, so the collections triggered by their allocations find nothing to free, and
+    each full collection walks the whole growing storage again"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def batches(rows: Iterable, size: int = BATCH_SIZE) -> Iterator[list]:
+    """Split the rows into lists of at most the given size"""
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch